@@ -1,14 +1,32 @@
+from typing import List, Optional
+
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-from modules.context_service import get_context
+from modules.context_service import get_context, get_contexts
 
 app = FastAPI()
 
+# Upper bound on prompts per /retrieve-context/batch request
+MAX_BATCH_SIZE = 256
+
 
 class Request(BaseModel):
     prompt: str
     top_k: int = 5
+    namespace: Optional[str] = None
+    # Write-time window, epoch seconds
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+
+class BatchRequest(BaseModel):
+    prompts: List[str]
+    top_k: int = 5
+    namespace: Optional[str] = None
+    # Write-time window, epoch seconds
+    since: Optional[float] = None
+    until: Optional[float] = None
 
 
 @app.post("/retrieve-context")
@@ -19,11 +37,44 @@ def retrieve_context_api(request: Request):
 
     context = get_context(
         prompt=prompt,
-        top_k=request.top_k
+        top_k=request.top_k,
+        namespace=request.namespace,
+        since=request.since,
+        until=request.until,
     )
 
     return {
         "prompt": prompt,
+        "namespace": request.namespace,
         "context": context
     }
 
+
+@app.post("/retrieve-context/batch")
+def retrieve_context_batch_api(request: BatchRequest):
+    if not request.prompts:
+        raise HTTPException(status_code=400, detail="Prompts cannot be empty")
+    if len(request.prompts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} prompts per batch")
+
+    prompts = [prompt.strip() for prompt in request.prompts]
+    results = get_contexts(
+        prompts=prompts,
+        top_k=request.top_k,
+        namespace=request.namespace,
+        since=request.since,
+        until=request.until,
+    )
+
+    return {
+        "namespace": request.namespace,
+        "results": [
+            {
+                "prompt": prompt,
+                "context": result.context,
+                "memory_ids": result.ids,
+                "error": result.error,
+            }
+            for prompt, result in zip(prompts, results)
+        ],
+    }
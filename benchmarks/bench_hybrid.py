@@ -0,0 +1,128 @@
+"""
+bench_hybrid.py
+Latency and recall of vector-only vs. BM25 vs. hybrid (RRF) retrieval, plus
+how often the lexical fast path skips the query embedding.
+
+The corpus is synthetic: each memory belongs to a topic and carries a unique
+order code. Embeddings are simulated as topic centroid + noise, so they
+separate topics but not codes — the situation exact-token queries hit with
+real embedding models. Two query sets are scored:
+
+- code queries ("where is order ZX-10417"): the embedding only knows the topic
+- paraphrase queries: close to the target's embedding, no shared tokens
+
+Usage:
+    python -m benchmarks.bench_hybrid --docs 100000 --queries 500 --embed-ms 120
+
+--embed-ms is the assumed cost of one embedding API call; it is added to the
+measured compute time of every query that needs an embedding.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from modules import lexical_index, similarity
+
+FAST_PATH = {"fast_path_min_score": 4.0, "fast_path_min_coverage": 1.0, "fast_path_margin": 1.5}
+WORDS = ("shipment", "invoice", "refund", "delivery", "warranty", "upgrade", "billing", "account",
+         "password", "subscription", "return", "exchange", "coupon", "address", "schedule", "repair")
+
+
+def build_corpus(n_docs: int, dim: int, topics: int, rng):
+    centroids = similarity.normalize_rows(rng.standard_normal((topics, dim), dtype=np.float32))
+    topic_of = rng.integers(0, topics, n_docs)
+    vectors = similarity.normalize_rows(centroids[topic_of] + 0.35 * rng.standard_normal((n_docs, dim), dtype=np.float32))
+    texts = [
+        f"{WORDS[t % len(WORDS)]} note for order ZX-{10000 + i} {WORDS[(t * 7 + 3) % len(WORDS)]}"
+        for i, t in enumerate(topic_of.tolist())
+    ]
+    return centroids, topic_of, vectors, texts
+
+
+def build_queries(n: int, centroids, topic_of, vectors, rng):
+    targets = rng.integers(0, vectors.shape[0], n)
+    code_queries = [
+        (f"where is order ZX-{10000 + t}",
+         similarity.normalize_rows(centroids[topic_of[t]] + 0.35 * rng.standard_normal(centroids.shape[1], dtype=np.float32))[0],
+         t)
+        for t in targets.tolist()
+    ]
+    paraphrases = [
+        ("can you remind me what we discussed earlier",
+         similarity.normalize_rows(vectors[t] + 0.05 * rng.standard_normal(vectors.shape[1], dtype=np.float32))[0],
+         t)
+        for t in targets.tolist()
+    ]
+    return {"code": code_queries, "paraphrase": paraphrases}
+
+
+def run(queries, index, bm25, k, rrf_k, embed_ms):
+    hits = {"vector": 0, "lexical": 0, "hybrid": 0}
+    seconds = {"vector": 0.0, "lexical": 0.0, "hybrid": 0.0}
+    fast_paths = 0
+
+    for text, vector, target in queries:
+        start = time.perf_counter()
+        rows, _ = index.search(vector, k)
+        vector_ids = [str(r) for r in rows[0].tolist()]
+        vector_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lexical_ids, scores, coverage = bm25.search(text, k + 1)
+        lexical_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fused = lexical_index.reciprocal_rank_fusion([vector_ids, lexical_ids[:k]], k=rrf_k)[:k]
+        fuse_time = time.perf_counter() - start
+
+        confident = lexical_index.is_confident(scores, coverage, FAST_PATH)
+        fast_paths += confident
+        seconds["vector"] += vector_time + embed_ms / 1000
+        seconds["lexical"] += lexical_time
+        # Hybrid: a confident lexical hit is answered before the embedding call
+        seconds["hybrid"] += lexical_time if confident else lexical_time + vector_time + fuse_time + embed_ms / 1000
+        result = lexical_ids[:k] if confident else fused
+
+        target = str(target)
+        hits["vector"] += target in vector_ids
+        hits["lexical"] += target in lexical_ids[:k]
+        hits["hybrid"] += target in result
+
+    n = len(queries)
+    return {name: (hits[name] / n, seconds[name] / n * 1000) for name in hits}, fast_paths / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=64)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--embed-ms", type=float, default=120.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centroids, topic_of, vectors, texts = build_corpus(args.docs, args.dim, args.topics, rng)
+
+    start = time.perf_counter()
+    bm25 = lexical_index.BM25Index()
+    bm25.add([str(i) for i in range(args.docs)], texts)
+    print(f"🔤 Indexed {args.docs} documents in {time.perf_counter() - start:.1f}s")
+    index = similarity.SimilarityIndex(vectors)
+
+    print(f"docs={args.docs} dim={args.dim} k={args.k} embed_ms={args.embed_ms:.0f}")
+    print(f"{'queries':>10} | {'method':>8} | {'recall@k':>8} | {'latency':>10} | {'fast path':>9}")
+    print("-" * 58)
+    for name, queries in build_queries(args.queries, centroids, topic_of, vectors, rng).items():
+        results, fast_rate = run(queries, index, bm25, args.k, args.rrf_k, args.embed_ms)
+        for method, (recall, latency_ms) in results.items():
+            fast = f"{fast_rate:>8.0%}" if method == "hybrid" else ""
+            print(f"{name:>10} | {method:>8} | {recall:>8.2f} | {latency_ms:>7.1f} ms | {fast:>9}")
+
+
+if __name__ == "__main__":
+    main()
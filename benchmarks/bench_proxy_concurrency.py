@@ -0,0 +1,101 @@
+"""
+bench_proxy_concurrency.py
+Requests per second of the proxy's /v1/chat/completions handler as the
+number of concurrent clients grows, with providers and retrieval stubbed.
+
+Nothing touches the network. Retrieval is replaced by a blocking sleep of
+--retrieve-ms, the way embedding and vector store calls block a thread.
+The provider is replaced by an async sleep of --llm-ms. Write-behind
+submission is a no-op. Each concurrency level sends --requests requests
+through router.chat_completions on one event loop.
+
+The "blocking provider" rows run the same handler with a provider stub
+that sleeps synchronously, like a sync SDK call made on the event loop
+(the behaviour before the async path). Its throughput stays flat however
+many clients there are.
+
+Usage:
+    python -m benchmarks.bench_proxy_concurrency --requests 200 --llm-ms 200 --retrieve-ms 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import retrieval
+from proxy_api import router
+from proxy_api.clients import provider_router
+from proxy_api.services import write_behind
+
+
+class _Request:
+    """Just enough of starlette's Request for chat_completions()."""
+
+    def __init__(self, body: dict):
+        self._body = body
+        self.headers = {}
+
+    async def json(self):
+        return self._body
+
+
+def _stub(llm_ms: float, retrieve_ms: float, blocking_provider: bool):
+    def retrieve(query, **kwargs):
+        time.sleep(retrieve_ms / 1000.0)
+        return retrieval.RetrievalResult(source="stub")
+
+    async def ask_async(prompt, api_key=None, model=None):
+        if blocking_provider:
+            time.sleep(llm_ms / 1000.0)
+        else:
+            await asyncio.sleep(llm_ms / 1000.0)
+        return "stub answer"
+
+    retrieval.retrieve = retrieve
+    provider_router.ask_async = ask_async
+    write_behind.submit = lambda *args, **kwargs: None
+
+
+async def _run(requests: int, concurrency: int, workers: int) -> float:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "what did we decide about the launch?"}]}
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            await router.chat_completions(_Request(body))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="simulated provider latency")
+    parser.add_argument("--retrieve-ms", type=float, default=20.0, help="simulated blocking retrieval time")
+    parser.add_argument("--workers", type=int, default=32, help="worker threads for blocking calls")
+    args = parser.parse_args()
+
+    print(f"{'provider':<18} {'clients':>8} {'req/s':>10} {'speedup':>9}")
+    for blocking in (False, True):
+        _stub(args.llm_ms, args.retrieve_ms, blocking)
+        # The blocking stub serializes every request; fewer of them keeps the run short
+        requests = max(args.concurrency) if blocking else args.requests
+        baseline = None
+        for concurrency in args.concurrency:
+            # The handler logs every request; keep that out of the table
+            with contextlib.redirect_stdout(io.StringIO()):
+                rps = asyncio.run(_run(requests, concurrency, args.workers))
+            baseline = baseline or rps
+            label = "blocking provider" if blocking else "async"
+            print(f"{label:<18} {concurrency:>8} {rps:>10.1f} {rps / baseline:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
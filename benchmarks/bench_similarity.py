@@ -0,0 +1,76 @@
+"""
+bench_similarity.py
+Microbenchmark: per-pair embedding.cosine_similarity vs. the vectorized
+top-k kernel in modules.similarity.
+
+Usage:
+    python -m benchmarks.bench_similarity --sizes 1000 100000 1000000 --dim 256
+
+The per-pair loop is timed on a sample of at most --loop-sample vectors and
+extrapolated linearly, since scoring 1M vectors one call at a time takes
+minutes.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from modules import similarity
+
+
+def legacy_cosine_similarity(a: list, b: list) -> float:
+    """Copy of embedding.cosine_similarity, so the benchmark has no API client side effects."""
+    a, b = np.array(a), np.array(b)
+    if np.all(a == 0) or np.all(b == 0):
+        return 0.0
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def bench_legacy(query: list, vectors: np.ndarray, k: int, sample: int) -> float:
+    """Seconds per full scan, extrapolated from `sample` vectors."""
+    rows = vectors[:sample].tolist()
+    start = time.perf_counter()
+    scores = [legacy_cosine_similarity(query, row) for row in rows]
+    sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k]
+    elapsed = time.perf_counter() - start
+    return elapsed * (vectors.shape[0] / len(rows))
+
+
+def bench_vectorized(query: np.ndarray, index: similarity.SimilarityIndex, k: int, repeats: int) -> float:
+    index.search(query, k)  # warm-up allocates the scoring buffer
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index.search(query, k)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--loop-sample", type=int, default=5_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"dim={args.dim} k={args.k} chunk_size={args.chunk_size}")
+    print(f"{'N':>10} | {'per-pair loop':>14} | {'vectorized':>11} | {'speedup':>8}")
+    print("-" * 54)
+
+    for n in args.sizes:
+        vectors = rng.standard_normal((n, args.dim), dtype=np.float32)
+        query = rng.standard_normal(args.dim, dtype=np.float32)
+        index = similarity.SimilarityIndex(vectors, chunk_size=args.chunk_size)
+
+        legacy = bench_legacy(query.tolist(), vectors, args.k, min(n, args.loop_sample))
+        fast = bench_vectorized(query, index, args.k, args.repeats)
+        print(f"{n:>10} | {legacy * 1000:>11.1f} ms | {fast * 1000:>8.2f} ms | {legacy / fast:>7.0f}x")
+
+        del vectors, index
+
+
+if __name__ == "__main__":
+    main()
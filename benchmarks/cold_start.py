@@ -0,0 +1,80 @@
+"""
+cold_start.py
+Measures the cold-start cost of importing the proxy app and checks it
+against a budget.
+
+Each run imports `proxy_api.app` in a fresh interpreter, so nothing is
+shared between samples. Importing must not touch the network: Chroma and
+API clients are created lazily by modules.resources on first use.
+
+Usage:
+    python -m benchmarks.cold_start --budget-ms 1500 --runs 5
+
+Exits non-zero when the median import time exceeds the budget, and prints
+the slowest modules from `python -X importtime` to show where time goes.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULE = "proxy_api.app"
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_TIMER = (
+    "import time; t = time.perf_counter(); "
+    f"import {MODULE}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def sample_import_ms() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", _TIMER], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 10) -> list:
+    """(cumulative_us, module) pairs from -X importtime, slowest first."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level packages; nested (indented) entries are already in their parent's cumulative time
+        if not name[1:].startswith(" "):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [sample_import_ms() for _ in range(args.runs)]
+    median = statistics.median(samples)
+
+    print(f"⏱️ import {MODULE}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(samples):.0f}, max {max(samples):.0f}), budget {args.budget_ms:.0f} ms")
+    print("\nSlowest top-level imports:")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    if median > args.budget_ms:
+        print(f"\n❌ Cold start over budget by {median - args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print("\n✅ Cold start within budget")
+
+
+if __name__ == "__main__":
+    main()
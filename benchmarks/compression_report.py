@@ -0,0 +1,96 @@
+"""
+compression_report.py
+Recall-vs-size report for vector compression settings.
+
+For each (dimensions, quantization) pair, measures how many of the exact
+full-precision top-k neighbours survive compression (recall@k) and how many
+bytes each stored vector needs.
+
+Usage:
+    python -m benchmarks.compression_report --vectors exported.npy
+    python -m benchmarks.compression_report --from-store
+
+Queries are a random sample of the stored vectors themselves (the query row
+is excluded from its own neighbour list). Use real embeddings: random
+vectors are not Matryoshka-trained and will understate truncation recall.
+"""
+
+import argparse
+import itertools
+
+import numpy as np
+
+from modules import similarity
+from modules.vector_compression import VectorCompressor
+
+
+def load_from_store() -> np.ndarray:
+    from modules import memory
+
+    data = memory.get_store().get(include=["embeddings"])
+    embeddings = data.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        raise SystemExit("⚠️ Memory store has no embeddings to evaluate.")
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def exact_neighbours(queries: np.ndarray, matrix: np.ndarray, query_rows: np.ndarray, k: int) -> np.ndarray:
+    idx, _ = similarity.top_k(queries, matrix, k + 1, chunk_size=65536)
+    return _drop_self(idx, query_rows, k)
+
+
+def _drop_self(idx: np.ndarray, query_rows: np.ndarray, k: int) -> np.ndarray:
+    keep = idx != query_rows[:, None]
+    return np.stack([row[mask][:k] for row, mask in zip(idx, keep)])
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--vectors", help="Path to an (N, D) float32 .npy file")
+    source.add_argument("--from-store", action="store_true", help="Read embeddings from the memory store")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512, 1024, 0],
+                        help="Truncation sizes to try (0 = full dimension)")
+    parser.add_argument("--quantizations", nargs="+", default=["none", "float16", "int8"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    vectors = load_from_store() if args.from_store else np.load(args.vectors, mmap_mode="r")
+    full = similarity.normalize_rows(vectors)
+    n, dim = full.shape
+    k = min(args.k, n - 1)
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(n, size=min(args.queries, n), replace=False)
+    truth = exact_neighbours(full[query_rows], full, query_rows, k)
+
+    print(f"📊 {n} vectors, dim={dim}, recall@{k} over {len(query_rows)} queries\n")
+    print(f"{'dims':>6} | {'quant':>8} | {'bytes/vec':>9} | {'size vs full':>12} | {'recall@k':>8}")
+    print("-" * 58)
+
+    baseline = VectorCompressor().bytes_per_vector(dim)
+    for dims, quant in itertools.product(args.dimensions, args.quantizations):
+        if dims and dims > dim:
+            continue
+        compressor = VectorCompressor(dimensions=dims or None, quantization=quant)
+        compressed = compressor.transform_many(full)
+        codes, scales = compressor.quantize(compressed)
+        searchable = similarity.normalize_rows(compressor.dequantize(codes, scales))
+
+        idx, _ = similarity.top_k(searchable[query_rows], searchable, k + 1, chunk_size=65536)
+        found = _drop_self(idx, query_rows, k)
+        size = compressor.bytes_per_vector(dim)
+        print(
+            f"{compressor.output_dimension(dim):>6} | {quant:>8} | {size:>9} | "
+            f"{size / baseline:>11.1%} | {recall_at_k(truth, found):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,8 @@ class CAMClient:
     Drop-in replacement for OpenAI with automatic memory.
     """
 
-    def __init__(self, api_key: str, base_url: str = "http://localhost:8080/v1", model: str = "gpt-4o-mini"):
+    def __init__(self, api_key: str, base_url: str = "http://localhost:8080/v1", model: str = "gpt-4o-mini",
+                 namespace: Optional[str] = None):
         """
         Initialize CAM client.
 
@@ -22,10 +23,12 @@ class CAMClient:
             api_key: Your OpenAI API key
             base_url: CAM proxy server URL (default: http://localhost:8080/v1)
             model: Model to use (default: gpt-4o-mini)
+            namespace: Memory namespace (tenant) to read and write (default: shared)
         """
         self.api_key = api_key
         self.base_url = base_url.rstrip('/v1')
         self.model = model
+        self.namespace = namespace
 
         # Check if CAM service is running
         self._check_service()
@@ -57,6 +60,8 @@ class CAMClient:
             "api_key": self.api_key,
             **{k: v for k, v in kwargs.items() if k != "model"}
         }
+        if self.namespace and "namespace" not in payload:
+            payload["namespace"] = self.namespace
 
         try:
             # Send request to CAM proxy
@@ -98,6 +103,7 @@ class CAMClient:
         """Clear stored memory (requires service restart)."""
         print("💡 To clear memory, restart the CAM service with './start_cam.sh'")
         print("   Or manually delete the './CAM_project/chroma_db' directory")
+        print("   Back it up first with 'python -m modules.maintenance.snapshot export <dir>'")
 
 
 class OpenAIWithMemory:
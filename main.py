@@ -13,23 +13,18 @@ FINAL VERSION:
 import os
 import datetime
 from uuid import uuid4
-from openai import OpenAI
 
 from modules import (
     embedding,
     memory,
     retrieval,
-    auto_tagger,
+    enrichment,
     intent_classifier,
-    config_manager,
+    local_classifier,
+    resources,
+    context_packer,
 )
 
-# --------------------------------------------------
-# Initialization
-# --------------------------------------------------
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-config = config_manager.load_config()
-
 print("🧠 Context-Augmented Memory System (CAM)")
 print("Type 'exit' to quit or 'clear memory' to reset stored context.\n")
 
@@ -61,8 +56,14 @@ def main():
 
         # --------------------------------------------------
         # Step 1 — Intent detection
+        # (keyword rules, then the local classifier; otherwise one enrichment
+        # call also yields the tag)
         # --------------------------------------------------
-        intent = intent_classifier.classify_intent(user_prompt)
+        labels = None
+        intent = intent_classifier.heuristic_intent(user_prompt) or local_classifier.classify("intent", user_prompt)
+        if intent is None:
+            labels = enrichment.enrich(user_prompt)
+            intent = labels.intent
         print(f"🎯 Detected intent: {intent}")
 
         # --------------------------------------------------
@@ -72,12 +73,16 @@ def main():
 
         if intent == "query":
             print("🔍 Query detected — searching memory globally...")
-            context = retrieval.retrieve_context(
+            result = retrieval.retrieve(
                 user_prompt,
                 n_results=1,
                 mode="global",
                 plain=True,
+                model="gpt-4o-mini",
             )
+            context = result.context
+            if context:
+                context_packer.record(result.tokens)
 
         should_use_context = bool(context)
 
@@ -86,7 +91,7 @@ def main():
         # --------------------------------------------------
 
         if intent == "query" and should_use_context:
-            print("📚 Retrieved context found — augmenting your prompt..\n")
+            print(f"📚 Retrieved context found — augmenting your prompt with {result.tokens} context tokens..\n")
 
             full_prompt = (
                 "You are answering using the following known facts.\n"
@@ -108,7 +113,7 @@ def main():
         # --------------------------------------------------
         print("💬 Sending prompt to LLM...\n")
         try:
-            response = client.responses.create(
+            response = resources.openai_client().responses.create(
                 model="gpt-4o-mini",
                 input=full_prompt,
             )
@@ -130,7 +135,7 @@ def main():
         # --------------------------------------------------
         # Step 6 — Store FACTS ONLY (USER INPUT)
         # --------------------------------------------------
-        tag = auto_tagger.auto_tag(user_prompt)
+        tag = (labels or enrichment.enrich(user_prompt)).tag
         episode_id = str(uuid4())[:12]
 
         meta = {
@@ -150,8 +155,16 @@ def main():
         try:
             # FACTS are stored EXACTLY as the user said them
             embedding_vector = embedding.get_embedding(user_prompt)
-            memory.store(user_prompt, meta, embedding_vector)
-            print(f"🧠 Stored fact: {episode_id} ({len(embedding_vector)} dims) ✅")
+            result = memory.store_many([{
+                "id": episode_id,
+                "document": user_prompt,
+                "metadata": meta,
+                "embedding": embedding_vector,
+            }])
+            if episode_id in result.written:
+                print(f"🧠 Stored fact: {episode_id} ({len(embedding_vector)} dims) ✅")
+            elif episode_id in result.merged:
+                print(f"♻️ Fact already known — merged into {result.merged[episode_id]}")
         except Exception as e:
             print(f"❌ Failed to store memory: {e}")
 
@@ -1,31 +1,36 @@
 # modules/auto_tagger.py
 
-import os, json
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from modules import llm_cache, local_classifier, resources
 
 ALLOWED_TAGS = ["refund", "complaint", "review", "fact", "question", "instruction", "NONE"]
 
 def auto_tag(text: str, tags=ALLOWED_TAGS) -> str:
     """
     Auto-tag text using allowed labels (fallbacks to 'NONE').
+    A confident local classifier answers without an LLM call.
     """
-    prompt = (
-        f"You are a precise tagger. Allowed tags: {tags}. "
-        "Choose one that clearly applies, or NONE. "
-        f"Output only the tag in plain text (no explanation).\n\nText:\n{text}"
-    )
+    if tags is ALLOWED_TAGS:
+        local_tag = local_classifier.classify("tag", text)
+        if local_tag is not None:
+            return local_tag
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-        )
-        raw_tag = response.choices[0].message.content.strip().upper()
+        raw_tag = _llm_tag(text, list(tags)).strip().upper()
         return raw_tag if raw_tag in tags else "NONE"
     except Exception:
         return "NONE"
+
+
+@llm_cache.memoize("auto_tag", model="gpt-3.5-turbo")
+def _llm_tag(text: str, tags: list) -> str:
+    prompt = (
+        f"You are a precise tagger. Allowed tags: {tags}. "
+        "Choose one that clearly applies, or NONE. "
+        f"Output only the tag in plain text (no explanation).\n\nText:\n{text}"
+    )
+    response = resources.openai_client().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+    )
+    return response.choices[0].message.content
@@ -1,16 +1,62 @@
 """
 config_manager.py
 Dynamic configuration system for CAM modules.
+
+- load_config(): parse config.json once (falls back to DEFAULT_CONFIG)
+- ConfigService: the live configuration. It re-checks config.json's mtime
+  at most every `config_reload.check_interval_seconds`, validates the new
+  file and swaps in a read-only snapshot in one assignment. An invalid
+  edit keeps the previous snapshot. Readers therefore always see a whole,
+  validated config and pick up changes without a restart.
 """
 
 import json
 import os
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Optional
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "../config.json")
 
 DEFAULT_CONFIG = {
     "retrieval": {
-        "max_distance": 0.6
+        "max_distance": 0.6,
+        "overfetch_factor": 1,
+        "max_candidates": 200,
+        "mmr_diversity": 0.0,
+        "recency_weight": 0.0,
+        "recency_half_life_days": 30
+    },
+    "enrichment": {
+        "enabled": True,
+        "model": "gpt-4o-mini"
+    },
+    "llm_cache": {
+        "enabled": True,
+        "memory_entries": 4096,
+        "ttl_seconds": 86400,
+        "disk_enabled": False,
+        "disk_path": "./CAM_project/llm_cache.sqlite",
+        "disk_max_rows": 100000
+    },
+    "local_classifier": {
+        "enabled": True,
+        "path": "./CAM_project/classifier/local_classifier.joblib",
+        "min_confidence": 0.8,
+        "min_examples_per_label": 10
+    },
+    "context_packing": {
+        "enabled": True,
+        "max_tokens": 1500,
+        "encoding": "o200k_base",
+        "min_truncated_tokens": 32,
+        "max_memory_share": 0.5
+    },
+    "config_reload": {
+        "enabled": True,
+        "check_interval_seconds": 1.0
     },
     "usefulness_filter": {
         "min_word_count": 3,
@@ -32,9 +78,113 @@ DEFAULT_CONFIG = {
             "idk"
         ]
     },
+    "intent_classifier": {
+        "query_prefixes": [
+            "what", "who", "when", "where", "why", "how",
+            "is", "are", "can", "do", "does", "did"
+        ],
+        "meta_phrases": [
+            "remember", "recall", "you said", "what did i", "when did i", "show me"
+        ]
+    },
     "context_decider": {
         "continuity_base": 0.45,
         "continuity_std_factor": 0.15
+    },
+    "embedding": {
+        "provider": "openai",
+        "model": "text-embedding-3-large",
+        "max_request_batch": 256,
+        "batching": {
+            "enabled": False,
+            "max_batch_size": 64,
+            "max_wait_ms": 5
+        },
+        "local": {
+            "model": "sentence-transformers/all-MiniLM-L6-v2",
+            "device": "cpu",
+            "batch_size": 32,
+            "normalize": True,
+            "backend": "torch",
+            "quantized": False,
+            "onnx_quantization": "avx2",
+            "pool": "none",
+            "workers": 2
+        }
+    },
+    "embedding_cache": {
+        "enabled": True,
+        "memory_entries": 2048,
+        "disk_enabled": True,
+        "disk_path": "./CAM_project/embedding_cache.sqlite3",
+        "disk_max_mb": 512
+    },
+    "memory": {
+        "write_chunk_size": 256
+    },
+    "dedup": {
+        "enabled": True,
+        "near_duplicate_similarity": 0.97
+    },
+    "namespaces": {
+        "partitioning": "tenant",
+        "buckets": 64,
+        "max_open_collections": 256
+    },
+    "vector_store": {
+        "backend": "chroma_http",
+        "host": "localhost",
+        "port": 8001,
+        "path": "./CAM_project/chroma_db",
+        "numpy_path": "./CAM_project/flat_index"
+    },
+    "vector_compression": {
+        "dimensions": None,
+        "quantization": "none"
+    },
+    "maintenance": {
+        "enabled": True,
+        "capacity_per_namespace": 10000,
+        "page_size": 500,
+        "interval_seconds": 600,
+        "page_delay_seconds": 0.05,
+        "access_flush_seconds": 30,
+        "default_decay": 0.02,
+        "archive": True,
+        "archive_path": "./CAM_project/archive"
+    },
+    "proxy": {
+        "blocking_workers": 32
+    },
+    "write_behind": {
+        "enabled": True,
+        "journal_path": "./CAM_project/write_behind",
+        "workers": 1,
+        "batch_size": 32,
+        "max_wait_ms": 200,
+        "max_retries": 3,
+        "fsync": False
+    },
+    "retrieval_cache": {
+        "enabled": True,
+        "max_entries": 1024,
+        "ttl_seconds": 300,
+        "semantic_enabled": False,
+        "semantic_similarity": 0.98,
+        "semantic_entries": 256,
+        "shared_generation_path": "./CAM_project/retrieval_cache.generation"
+    },
+    "lexical": {
+        "enabled": True,
+        "path": "./CAM_project/lexical_index",
+        "k1": 1.2,
+        "b": 0.75,
+        "rrf_k": 60,
+        "hybrid_min_score": 2.0,
+        "fast_path": True,
+        "fast_path_min_score": 4.0,
+        "fast_path_min_coverage": 1.0,
+        "fast_path_margin": 1.5
     }
 }
 
@@ -54,3 +204,135 @@ def save_config(config):
     os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
     with open(CONFIG_PATH, "w") as f:
         json.dump(config, f, indent=4)
+
+
+def validate(config) -> dict:
+    """
+    Check a parsed config against DEFAULT_CONFIG and fill in missing sections.
+
+    Known sections must be objects, and known keys must keep the type of
+    their default (ints and floats are interchangeable). Raises ValueError
+    with the first problem found.
+    """
+    if not isinstance(config, Mapping):
+        raise ValueError("config must be a JSON object")
+
+    merged = dict(config)
+    for section, defaults in DEFAULT_CONFIG.items():
+        values = config.get(section)
+        if values is None:
+            merged[section] = defaults
+            continue
+        if not isinstance(values, Mapping):
+            raise ValueError(f"'{section}' must be an object")
+        for key, default in defaults.items():
+            if key in values and not _same_type(values[key], default):
+                raise ValueError(f"'{section}.{key}' must be {_type_name(default)}, got {values[key]!r}")
+        merged[section] = {**defaults, **values}
+    return merged
+
+
+def _same_type(value, default) -> bool:
+    if default is None or value is None:
+        return True
+    if isinstance(default, bool) or isinstance(value, bool):
+        return isinstance(value, bool) and isinstance(default, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float))
+    if isinstance(default, dict):
+        return isinstance(value, Mapping)
+    if isinstance(default, list):
+        return isinstance(value, (list, tuple))
+    return isinstance(value, type(default))
+
+
+def _type_name(default) -> str:
+    if isinstance(default, bool):
+        return "true/false"
+    if isinstance(default, (int, float)):
+        return "a number"
+    return {str: "a string", list: "a list", dict: "an object"}.get(type(default), type(default).__name__)
+
+
+def freeze(value):
+    """Read-only copy of a parsed config: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ConfigService:
+    """Validated, read-only view of config.json that follows edits to the file."""
+
+    def __init__(self, path: Optional[str] = CONFIG_PATH, config: Optional[dict] = None):
+        """Follows `path`; pass `config` (and path=None) for a fixed config, e.g. in tests."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        if config is None:
+            config = load_config() if path == CONFIG_PATH else _read(path)
+        self._snapshot = freeze(validate(config))
+        self._signature = self._stat()
+        self.version = 1
+        self.loaded_at = time.time()
+        self.last_error = None
+
+    def current(self) -> Mapping:
+        """The latest valid snapshot (re-checks the file when the interval has passed)."""
+        if time.monotonic() >= self._next_check:
+            self._check()
+        return self._snapshot
+
+    def _stat(self) -> Optional[tuple]:
+        if self.path is None:
+            return None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _check(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already checking; keep serving the current snapshot
+        try:
+            if not self._snapshot.get("config_reload", {}).get("enabled", True):
+                return
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                return
+            # Remember the signature even when the file is invalid, so a
+            # half-saved edit is parsed once rather than on every check
+            self._signature = signature
+            self.reload()
+        finally:
+            interval = self._snapshot.get("config_reload", {}).get("check_interval_seconds", 1.0)
+            self._next_check = time.monotonic() + interval
+            self._lock.release()
+
+    def reload(self) -> bool:
+        """Re-read the file now; False (and the old snapshot kept) when it is invalid."""
+        if self.path is None:
+            return False
+        try:
+            snapshot = freeze(validate(_read(self.path)))
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            print(f"⚠️ Ignoring invalid {os.path.basename(self.path)} (keeping version {self.version}): {e}")
+            return False
+        self._snapshot = snapshot
+        self.version += 1
+        self.loaded_at = time.time()
+        self.last_error = None
+        print(f"🔄 Reloaded {os.path.basename(self.path)} (version {self.version})")
+        return True
+
+    def stats(self) -> dict:
+        return {"version": self.version, "loaded_at": self.loaded_at, "last_error": self.last_error}
+
+
+def _read(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
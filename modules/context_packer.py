@@ -0,0 +1,164 @@
+"""
+context_packer.py
+Token-budgeted assembly of retrieved memories into injected context.
+
+- counts tokens with tiktoken, using the encoding of the target model's
+  family (OpenAI models map directly; others use `context_packing.encoding`)
+- memories carry their token count in metadata, computed once at write time,
+  so packing doesn't re-encode stored documents
+- greedy packing: memories are taken in ranking order while they fit the
+  budget; one that doesn't fit is cut at a sentence boundary if enough
+  budget is left, otherwise skipped for the next (shorter) one. No single
+  memory takes more than `max_memory_share` of the budget, so one long
+  stored answer can't crowd out the rest
+- per-request injected token counts are reported and aggregated in stats()
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import tiktoken
+
+from modules import resources
+
+TOKEN_COUNT_KEY = "token_count"
+TOKEN_ENCODING_KEY = "token_encoding"
+
+# Rough size of a token when no encoding can be loaded (e.g. offline first run)
+_CHARS_PER_TOKEN = 4
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "injected_tokens": 0, "truncated": 0, "dropped": 0}
+
+
+def _settings() -> dict:
+    return resources.config().get("context_packing", {})
+
+
+def enabled() -> bool:
+    return _settings().get("enabled", True)
+
+
+def encoding_name(model: Optional[str] = None) -> str:
+    """tiktoken encoding for a model family; non-OpenAI models use the configured default."""
+    default = _settings().get("encoding", "o200k_base")
+    if not model:
+        return default
+    try:
+        return tiktoken.encoding_for_model(model).name
+    except KeyError:
+        return default
+
+
+@lru_cache(maxsize=8)
+def _encoding(name: str):
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"⚠️ Could not load tokenizer '{name}' ({e}) — estimating tokens from length")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _encoding(encoding_name(model))
+    if encoding is None:
+        return -(-len(text or "") // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def write_metadata(document: str) -> dict:
+    """Token count metadata for a memory about to be stored."""
+    name = encoding_name()
+    encoding = _encoding(name)
+    if encoding is None:
+        return {}
+    return {TOKEN_COUNT_KEY: len(encoding.encode(document or "", disallowed_special=())), TOKEN_ENCODING_KEY: name}
+
+
+def document_tokens(document: str, metadata: Optional[dict], model: Optional[str] = None) -> int:
+    """Token count of a stored memory, from its metadata when it was counted with the same encoding."""
+    metadata = metadata or {}
+    if metadata.get(TOKEN_ENCODING_KEY) == encoding_name(model) and isinstance(metadata.get(TOKEN_COUNT_KEY), int):
+        return metadata[TOKEN_COUNT_KEY]
+    return count_tokens(document, model)
+
+
+def truncate(text: str, max_tokens: int, model: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Longest prefix of whole sentences within `max_tokens`.
+    Returns (text, tokens); ("", 0) when not even the first sentence fits.
+    """
+    kept, used = [], 0
+    for sentence in _SENTENCE_END.split(text or ""):
+        if not sentence.strip():
+            continue
+        # Counted with its joining space, so the sum matches the joined text closely
+        cost = count_tokens((" " if kept else "") + sentence, model)
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(kept), used
+
+
+def pack(
+    blocks: Sequence[Tuple[str, str, Optional[int]]],
+    budget: Optional[int] = None,
+    model: Optional[str] = None,
+    separator: str = "\n---\n",
+) -> Tuple[List[str], List[int], int]:
+    """
+    Greedily fit (header, body, body_tokens) blocks, best first, into `budget` tokens.
+    body_tokens may be None to count the body here.
+    Returns (rendered blocks, indices of the blocks kept, tokens used).
+    """
+    settings = _settings()
+    budget = settings.get("max_tokens", 1500) if budget is None else budget
+    min_tokens = settings.get("min_truncated_tokens", 32)
+    # A lone block may use the whole budget
+    cap = budget if len(blocks) <= 1 else budget * settings.get("max_memory_share", 0.5)
+    separator_tokens = count_tokens(separator, model)
+
+    rendered, kept, used = [], [], 0
+    for i, (header, body, body_tokens) in enumerate(blocks):
+        overhead = count_tokens(header, model) + (separator_tokens if rendered else 0)
+        if body_tokens is None:
+            body_tokens = count_tokens(body, model)
+
+        room = min(budget - used, cap) - overhead
+        if body_tokens > room:
+            if room < min_tokens:
+                _count("dropped")
+                continue
+            body, body_tokens = truncate(body, room, model)
+            if not body:
+                _count("dropped")
+                continue
+            _count("truncated")
+
+        rendered.append(header + body)
+        kept.append(i)
+        used += overhead + body_tokens
+    return rendered, kept, used
+
+
+def _count(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def record(tokens: int):
+    """Account the context tokens injected into one request."""
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["injected_tokens"] += tokens
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    result["avg_injected_tokens"] = result["injected_tokens"] / result["requests"] if result["requests"] else 0.0
+    return result
@@ -1,12 +1,33 @@
-from modules.retrieval import retrieve_context
+from typing import List
 
+from modules.retrieval import RetrievalResult, retrieve_context, retrieve_many
 
-def get_context(prompt: str, top_k: int = 5) -> str:
+
+def get_context(prompt: str, top_k: int = 5, namespace: str = None, since: float = None,
+                until: float = None) -> str:
     """
     Core context retrieval logic.
     Returns a formatted context string from memory.
     """
     return retrieve_context(
         query=prompt,
-        n_results=top_k
+        n_results=top_k,
+        namespace=namespace,
+        since=since,
+        until=until,
+    )
+
+
+def get_contexts(prompts: List[str], top_k: int = 5, namespace: str = None, since: float = None,
+                 until: float = None) -> List[RetrievalResult]:
+    """
+    Batch variant of get_context().
+    Returns one result (context, memory IDs, error) per prompt, in order.
+    """
+    return retrieve_many(
+        queries=prompts,
+        n_results=top_k,
+        namespace=namespace,
+        since=since,
+        until=until,
     )
@@ -0,0 +1,169 @@
+"""
+dedup.py
+Write-time duplicate suppression for memories.
+
+Before records are inserted, each one is checked against:
+- other records in the same batch and stored records with the same
+  content hash (exact duplicates)
+- earlier records in the same batch and its nearest stored neighbour, when
+  their cosine similarity is above `dedup.near_duplicate_similarity`
+  (near duplicates)
+
+A duplicate is merged into the existing record: its `occurrences` count
+goes up and its timestamp is refreshed, and no new vector is inserted.
+
+The nearest stored neighbour comes from the store's squared-L2 search,
+which ranks by cosine only for unit-length vectors (what the embedding
+models and the vector compressor produce). The threshold itself is
+checked on the cosine of the returned vectors, so a stored vector of
+another length can be missed as a duplicate but never wrongly merged.
+"""
+
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from modules import similarity
+from modules.embedding_cache import normalize_text
+
+_lock = threading.Lock()
+_stats = {"checked": 0, "exact_duplicates": 0, "near_duplicates": 0}
+
+
+def content_hash(text: str) -> str:
+    """Hash of the case- and whitespace-normalized text."""
+    return hashlib.sha256(normalize_text(text or "").lower().encode("utf-8")).hexdigest()[:32]
+
+
+def stats() -> dict:
+    """Dedup counters, including the share of checked writes that were merged."""
+    with _lock:
+        result = dict(_stats)
+    merged = result["exact_duplicates"] + result["near_duplicates"]
+    result["dedup_rate"] = merged / result["checked"] if result["checked"] else 0.0
+    return result
+
+
+def _occurrences(meta: dict) -> int:
+    return int(meta.get("occurrences", 1))
+
+
+def _merged_metadata(existing: dict, incoming: dict) -> dict:
+    update = {"occurrences": _occurrences(existing) + _occurrences(incoming)}
+    for key in ("timestamp", "ts"):
+        if key in incoming:
+            update[key] = incoming[key]
+    return update
+
+
+def deduplicate(store, records: List[dict], where: Optional[dict], near_similarity: float) -> Tuple[List[dict], Dict[str, str]]:
+    """
+    Split `records` (memory.store_many's prepared dicts) into new records and merges.
+
+    Existing records that absorb duplicates are updated in place with one
+    batched update call. Returns (records_to_insert, {incoming_id: existing_id}).
+    """
+    if not records:
+        return [], {}
+
+    merges: Dict[str, str] = {}
+    updates: Dict[str, dict] = {}
+    existing_meta: Dict[str, dict] = {}
+
+    # Exact duplicates within the batch collapse into their first occurrence
+    first_by_hash: Dict[str, dict] = {}
+    candidates = []
+    for record in records:
+        digest = content_hash(record["document"])
+        record["metadata"]["content_hash"] = digest
+        if digest in first_by_hash:
+            merges[record["id"]] = first_by_hash[digest]["id"]
+            first = first_by_hash[digest]["metadata"]
+            first["occurrences"] = _occurrences(first) + 1
+        else:
+            first_by_hash[digest] = record
+            candidates.append(record)
+    exact_count = len(merges)
+
+    # Exact duplicates already in the store: one lookup for the whole batch
+    hash_clause = {"content_hash": {"$in": list(first_by_hash)}}
+    found = store.get(where={"$and": [hash_clause, where]} if where else hash_clause, include=["metadatas"])
+    stored_by_hash = {}
+    for id_, meta in zip(found.get("ids") or [], found.get("metadatas") or []):
+        stored_by_hash.setdefault((meta or {}).get("content_hash"), (id_, meta or {}))
+
+    remaining = []
+    for record in candidates:
+        match = stored_by_hash.get(record["metadata"]["content_hash"])
+        if match and match[0] != record["id"]:
+            existing_id, meta = match
+            merges[record["id"]] = existing_id
+            existing_meta.setdefault(existing_id, dict(meta))
+            existing_meta[existing_id].update(_merged_metadata(existing_meta[existing_id], record["metadata"]))
+            updates[existing_id] = existing_meta[existing_id]
+            exact_count += 1
+        else:
+            remaining.append(record)
+
+    near_count = 0
+    inserts = remaining
+    if remaining and near_similarity < 1.0:
+        # Near duplicates within the batch collapse into their first occurrence
+        unit = similarity.normalize_rows([r["embedding"] for r in remaining])
+        kept = []
+        for i, record in enumerate(remaining):
+            if kept:
+                scores = unit[kept] @ unit[i]
+                best = int(np.argmax(scores))
+                if scores[best] >= near_similarity:
+                    first = remaining[kept[best]]
+                    merges[record["id"]] = first["id"]
+                    first["metadata"]["occurrences"] = _occurrences(first["metadata"]) + _occurrences(record["metadata"])
+                    near_count += 1
+                    continue
+            kept.append(i)
+        remaining = [remaining[i] for i in kept]
+
+        # Nearest stored neighbour per record, one batched query; an empty store returns no ids
+        neighbours = store.query(
+            query_embeddings=[r["embedding"] for r in remaining],
+            n_results=1,
+            where=where,
+            include=["metadatas", "embeddings"],
+        )
+        inserts = []
+        for record, query, ids, metas, embeddings in zip(
+            remaining, unit[kept], neighbours["ids"], neighbours["metadatas"], neighbours["embeddings"]
+        ):
+            if not ids or ids[0] == record["id"]:
+                inserts.append(record)
+                continue
+            if float(similarity.normalize_rows(embeddings[0])[0] @ query) >= near_similarity:
+                existing_id = ids[0]
+                merges[record["id"]] = existing_id
+                existing_meta.setdefault(existing_id, dict(metas[0] or {}))
+                existing_meta[existing_id].update(_merged_metadata(existing_meta[existing_id], record["metadata"]))
+                updates[existing_id] = existing_meta[existing_id]
+                near_count += 1
+            else:
+                inserts.append(record)
+
+    # A record merged into a batch-mate that was itself merged points at the final target
+    for id_, target in merges.items():
+        while target in merges:
+            target = merges[target]
+        merges[id_] = target
+
+    if updates:
+        store.update(ids=list(updates), metadatas=list(updates.values()))
+
+    with _lock:
+        _stats["checked"] += len(records)
+        _stats["exact_duplicates"] += exact_count
+        _stats["near_duplicates"] += near_count
+
+    if merges:
+        print(f"♻️ Merged {len(merges)} duplicate memories ({exact_count} exact, {near_count} near)")
+    return inserts, merges
@@ -1,37 +1,229 @@
 """
 embedding.py
 Handles embeddings and similarity calculations.
+
+Supports:
+- single-text and batched embedding requests
+- optional micro-batching of concurrent single-text calls
+- two-level (memory + disk) cache keyed by model and normalized text
+- pluggable providers (OpenAI API or local sentence-transformers / ONNX)
 """
 
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
 import numpy as np
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from modules import embedding_providers, resources
+
+_extra_providers = {}
+
+
+def _settings() -> dict:
+    return resources.config().get("embedding", {})
+
+
+def get_provider() -> embedding_providers.EmbeddingProvider:
+    """Active backend (OpenAI or local sentence-transformers), chosen in config.json."""
+    return resources.get("embedding_provider")
+
+
+def get_cache():
+    """Shared embedding cache, or None when disabled."""
+    return resources.get("embedding_cache")
+
+
+def _provider_for(model: Optional[str]) -> embedding_providers.EmbeddingProvider:
+    """The configured provider, or an OpenAI provider for an explicitly requested model."""
+    provider = get_provider()
+    if model is None or model == provider.model:
+        return provider
+    if model not in _extra_providers:
+        _extra_providers[model] = embedding_providers.OpenAIEmbeddingProvider(
+            model=model, max_request_batch=_settings().get("max_request_batch", 256)
+        )
+    return _extra_providers[model]
+
+
+def get_dimension(model: Optional[str] = None) -> int:
+    """Vector dimension of the active provider, known without an embedding call."""
+    return _provider_for(model).dimension
+
+
+def get_embeddings(texts: List[str], model: Optional[str] = None) -> List[list]:
+    """
+    Returns one embedding vector per input text.
+    Cached vectors are served locally; only the misses go to the provider, in one batch.
+    """
+    backend = _provider_for(model)
+    cache = get_cache()
+    if cache is None:
+        return backend.embed(texts)
+
+    results = cache.get_many(backend.cache_id, texts)
+    missing = [i for i, vec in enumerate(results) if vec is None and texts[i].strip()]
+    if missing:
+        fetched = backend.embed([texts[i] for i in missing])
+        cache.put_many(backend.cache_id, [texts[i] for i in missing], fetched)
+        for i, vec in zip(missing, fetched):
+            results[i] = vec
+
+    return [vec if vec is not None else [] for vec in results]
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for the embedding cache (empty when disabled)."""
+    if not resources.is_initialized("embedding_cache"):
+        return {}
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
 
-def get_embedding(text: str, model: str = "text-embedding-3-large") -> list:
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding calls into batched requests.
+
+    Callers block on their own result while a worker thread waits up to
+    `max_wait_ms` for more texts (or until `max_batch_size` is reached) and
+    then sends them together in one provider call.
+    """
+
+    def __init__(self, backend: embedding_providers.EmbeddingProvider, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def embed(self, text: str) -> list:
+        """Queue one text and wait for its embedding; raises if its batch failed."""
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        self._ensure_worker()
+        return future.result()
+
+    def stats(self) -> dict:
+        """Snapshot of batch size and queue wait counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            sent_at = time.perf_counter()
+
+            try:
+                vectors = self.backend.embed([text for text, _, _ in batch])
+                if len(vectors) != len(batch):
+                    raise ValueError(f"embedding backend returned {len(vectors)} vectors for {len(batch)} texts")
+            except Exception as e:
+                print(f"⚠️ Batched embedding failed: {e}")
+                # Every caller is waiting on its future; none may be left unresolved
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), vector in zip(batch, vectors):
+                    future.set_result(vector)
+
+            waits = [(sent_at - queued_at) * 1000.0 for _, _, queued_at in batch]
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+                self._stats["total_wait_ms"] += sum(waits)
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], max(waits))
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    """Return the shared batcher, creating it from config on first use."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            batching = _settings().get("batching", {})
+            _batcher = EmbeddingBatcher(
+                get_provider(),
+                max_batch_size=batching.get("max_batch_size", 64),
+                max_wait_ms=batching.get("max_wait_ms", 5),
+            )
+        return _batcher
+
+
+def batching_stats() -> dict:
+    """Counters for the micro-batcher (empty when batching has not been used)."""
+    return _batcher.stats() if _batcher is not None else {}
+
+
+def get_embedding(text: str, model: Optional[str] = None) -> list:
     """
     Returns embedding vector for a given text.
+    Checks the cache first, then goes through the micro-batcher when
+    `embedding.batching.enabled` is set.
     """
     if not text.strip():
         return []
 
+    provider = get_provider()
+    batching = _settings().get("batching", {})
+    if not batching.get("enabled", False) or _provider_for(model) is not provider:
+        return get_embeddings([text], model=model)[0]
+
+    cache = get_cache()
+    if cache is not None:
+        cached = cache.get_many(provider.cache_id, [text])[0]
+        if cached is not None:
+            return cached
+
     try:
-        response = client.embeddings.create(
-            model=model,
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"⚠️ Embedding generation failed: {e}")
+        vector = get_batcher().embed(text)
+    except Exception:
+        # Same as an unbatched failure: an empty vector the caller already checks for
         return []
+    if cache is not None:
+        cache.put_many(provider.cache_id, [text], [vector])
+    return vector
 
 
 def cosine_similarity(a: list, b: list) -> float:
     """
     Compute cosine similarity between two embedding vectors.
+    For scoring many vectors at once use modules.similarity instead.
     """
     a, b = np.array(a), np.array(b)
     if np.all(a == 0) or np.all(b == 0):
@@ -0,0 +1,261 @@
+"""
+embedding_cache.py
+Two-level cache for embedding vectors.
+
+- level 1: in-process LRU of float32 arrays
+- level 2: SQLite store of packed float32 blobs, survives restarts
+- keys are content hashes of (model, normalized text)
+- size-bounded eviction (least recently used first) and hit/miss stats
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (NFC, trimmed, single spaces)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content address for an embedding of `text` under `model`."""
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list:
+        """Snapshot of (key, value) pairs, least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskVectorCache:
+    """SQLite-backed vector store keyed by content hash."""
+
+    # Size check runs every N writes rather than on every insert
+    EVICT_CHECK_INTERVAL = 256
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_access ON vectors(last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> dict:
+        """Return {key: float32 array} for the keys present on disk."""
+        if not keys:
+            return {}
+
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE vectors SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: dict):
+        """Insert {key: float32 array} entries, evicting old ones when over budget."""
+        if not items:
+            return
+
+        now = time.time()
+        rows = [
+            (key, model, int(vec.shape[0]), np.asarray(vec, dtype=np.float32).tobytes(), now)
+            for key, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, model, dim, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._writes += len(rows)
+            if self._writes >= self.EVICT_CHECK_INTERVAL:
+                self._writes = 0
+                self._evict_locked()
+
+    def _evict_locked(self):
+        total, count = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM vectors"
+        ).fetchone()
+        if total <= self.max_bytes or not count:
+            return
+
+        # Drop the least recently used rows down to ~90% of the budget
+        avg = total / count
+        excess = int((total - 0.9 * self.max_bytes) / avg) + 1
+        self._conn.execute(
+            "DELETE FROM vectors WHERE key IN "
+            "(SELECT key FROM vectors ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        print(f"🧹 Embedding cache evicted {excess} vectors (budget {self.max_bytes / 1e6:.0f} MB)")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM vectors")
+            self._conn.commit()
+
+
+class EmbeddingCache:
+    """In-process LRU in front of an optional on-disk vector store."""
+
+    def __init__(self, memory_entries: int = 2048, disk: Optional[DiskVectorCache] = None):
+        self.memory = LRUCache(memory_entries)
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[list]]:
+        """Cached vectors for `texts` (None where missing)."""
+        keys = [cache_key(model, text) for text in texts]
+        results = [None] * len(texts)
+        pending = {}
+
+        for i, key in enumerate(keys):
+            vec = self.memory.get(key)
+            if vec is not None:
+                results[i] = vec
+            else:
+                pending.setdefault(key, []).append(i)
+
+        memory_hits = len(texts) - sum(len(v) for v in pending.values())
+        disk_hits = 0
+        if pending and self.disk is not None:
+            for key, vec in self.disk.get_many(list(pending)).items():
+                self.memory.put(key, vec)
+                for i in pending.pop(key):
+                    results[i] = vec
+                    disk_hits += 1
+
+        with self._lock:
+            self._stats["memory_hits"] += memory_hits
+            self._stats["disk_hits"] += disk_hits
+            self._stats["misses"] += sum(len(v) for v in pending.values())
+
+        return [vec.tolist() if vec is not None else None for vec in results]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[list]):
+        """Cache freshly computed vectors; empty vectors are ignored."""
+        items = {}
+        for text, vector in zip(texts, vectors):
+            if not vector:
+                continue
+            key = cache_key(model, text)
+            vec = np.asarray(vector, dtype=np.float32)
+            self.memory.put(key, vec)
+            items[key] = vec
+
+        if items and self.disk is not None:
+            try:
+                self.disk.put_many(model, items)
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding disk cache write failed: {e}")
+
+        with self._lock:
+            self._stats["writes"] += len(items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+def from_config(cfg: dict) -> Optional[EmbeddingCache]:
+    """Build a cache from the `embedding_cache` config section (None when disabled)."""
+    if not cfg.get("enabled", True):
+        return None
+
+    disk = None
+    if cfg.get("disk_enabled", True):
+        path = os.path.abspath(cfg.get("disk_path", "./CAM_project/embedding_cache.sqlite3"))
+        try:
+            disk = DiskVectorCache(path, max_bytes=int(cfg.get("disk_max_mb", 512) * 1024 * 1024))
+        except sqlite3.Error as e:
+            print(f"⚠️ Embedding disk cache unavailable, using memory only: {e}")
+
+    return EmbeddingCache(memory_entries=cfg.get("memory_entries", 2048), disk=disk)
@@ -0,0 +1,279 @@
+"""
+embedding_providers.py
+Embedding backends behind a common interface.
+
+Providers:
+- openai: hosted `text-embedding-3-*` models (network call per batch)
+- local:  sentence-transformers on CPU, optional thread/process pool
+          and optional int8-quantized ONNX runtime path
+
+Every provider reports its vector dimension without a probe call.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class EmbeddingProvider:
+    """Interface every embedding backend implements."""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def cache_id(self) -> str:
+        """Identifier used to key cached vectors for this backend + model."""
+        return f"{self.name}:{self.model}"
+
+    @property
+    def dimension(self) -> int:
+        raise NotImplementedError
+
+    def embed(self, texts: List[str]) -> List[list]:
+        """Return one vector per text; blank texts map to an empty list."""
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (or any compatible endpoint via EMBEDDING_BASE_URL)."""
+
+    name = "openai"
+
+    KNOWN_DIMENSIONS = {
+        "text-embedding-3-large": 3072,
+        "text-embedding-3-small": 1536,
+        "text-embedding-ada-002": 1536,
+    }
+
+    def __init__(self, model: str = "text-embedding-3-large", max_request_batch: int = 256):
+        super().__init__(model)
+        self.max_request_batch = max_request_batch
+        self._dimension = self.KNOWN_DIMENSIONS.get(model)
+        self._client = None
+
+    @property
+    def client(self):
+        """Shared OpenAI client, or a dedicated one when EMBEDDING_BASE_URL is set."""
+        if self._client is None:
+            base_url = os.getenv("EMBEDDING_BASE_URL")
+            if base_url:
+                # Lets tests and local setups point at a fake embeddings endpoint
+                from openai import OpenAI
+                self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url)
+            else:
+                from modules import resources
+                self._client = resources.openai_client()
+        return self._client
+
+    @property
+    def cache_id(self) -> str:
+        # Plain model name keeps vectors cached before providers existed valid
+        return self.model
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            # Unknown model: learn the size from the first real response instead of probing
+            return 0
+        return self._dimension
+
+    def embed(self, texts: List[str]) -> List[list]:
+        """
+        Fetches one embedding vector per input text, using as few API calls as possible.
+        Duplicate texts are only sent once.
+        """
+        results = [[] for _ in texts]
+        positions = {}
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                positions.setdefault(text, []).append(i)
+
+        unique = list(positions)
+        for start in range(0, len(unique), self.max_request_batch):
+            chunk = unique[start:start + self.max_request_batch]
+            try:
+                response = self.client.embeddings.create(model=self.model, input=chunk)
+            except Exception as e:
+                print(f"⚠️ Embedding generation failed for batch of {len(chunk)}: {e}")
+                continue
+
+            for item in response.data:
+                if self._dimension is None:
+                    self._dimension = len(item.embedding)
+                for i in positions[chunk[item.index]]:
+                    results[i] = item.embedding
+
+        return results
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model running on CPU.
+
+    pool="thread" splits large batches across a thread pool (torch and
+    onnxruntime release the GIL); pool="process" uses the library's
+    multi-process pool. quantized=True loads an int8 ONNX export, creating
+    it on first use when the model repo does not ship one.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        device: str = "cpu",
+        batch_size: int = 32,
+        normalize: bool = True,
+        backend: str = "torch",
+        quantized: bool = False,
+        onnx_quantization: str = "avx2",
+        onnx_cache_dir: str = "./CAM_project/onnx",
+        pool: str = "none",
+        workers: int = 2,
+    ):
+        super().__init__(model)
+        self.device = device
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.backend = "onnx" if quantized else backend
+        self.quantized = quantized
+        self.onnx_quantization = onnx_quantization
+        self.onnx_cache_dir = os.path.abspath(onnx_cache_dir)
+        self.pool = pool
+        self.workers = max(1, workers)
+        self._model = None
+        self._executor = None
+        self._process_pool = None
+
+    @property
+    def cache_id(self) -> str:
+        suffix = f"+onnx-q8-{self.onnx_quantization}" if self.quantized else ""
+        return f"{self.name}:{self.model}{suffix}"
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+
+        from sentence_transformers import SentenceTransformer
+
+        if not self.quantized:
+            self._model = SentenceTransformer(self.model, device=self.device, backend=self.backend)
+        else:
+            self._model = self._load_quantized(SentenceTransformer)
+
+        print(
+            f"🧩 Loaded local embedding model {self.model} "
+            f"({self.backend}{', int8' if self.quantized else ''}, dim={self._model.get_sentence_embedding_dimension()})"
+        )
+        return self._model
+
+    def _load_quantized(self, model_cls):
+        file_name = f"onnx/model_qint8_{self.onnx_quantization}.onnx"
+        try:
+            return model_cls(
+                self.model, device=self.device, backend="onnx", model_kwargs={"file_name": file_name}
+            )
+        except Exception:
+            pass
+
+        # The model repo has no int8 export: quantize once and reuse the local copy
+        local_dir = os.path.join(self.onnx_cache_dir, self.model.replace("/", "__"))
+        if not os.path.exists(os.path.join(local_dir, file_name)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"⚙️ Exporting int8 ONNX model for {self.model} → {local_dir}")
+            base = model_cls(self.model, device=self.device, backend="onnx")
+            base.save_pretrained(local_dir)
+            export_dynamic_quantized_onnx_model(base, self.onnx_quantization, local_dir)
+
+        return model_cls(local_dir, device=self.device, backend="onnx", model_kwargs={"file_name": file_name})
+
+    @property
+    def dimension(self) -> int:
+        return int(self._load().get_sentence_embedding_dimension())
+
+    def _encode(self, texts: List[str]):
+        return self._load().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def embed(self, texts: List[str]) -> List[list]:
+        results = [[] for _ in texts]
+        index = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not index:
+            return results
+
+        batch = [texts[i] for i in index]
+        try:
+            vectors = self._encode_pooled(batch)
+        except Exception as e:
+            print(f"⚠️ Local embedding failed for batch of {len(batch)}: {e}")
+            return results
+
+        for i, vec in zip(index, vectors):
+            results[i] = vec.tolist()
+        return results
+
+    def _encode_pooled(self, batch: List[str]):
+        if self.pool == "process" and len(batch) > self.batch_size:
+            model = self._load()
+            if self._process_pool is None:
+                self._process_pool = model.start_multi_process_pool([self.device] * self.workers)
+            return model.encode_multi_process(
+                batch, self._process_pool, batch_size=self.batch_size, normalize_embeddings=self.normalize
+            )
+
+        if self.pool == "thread" and len(batch) > self.batch_size:
+            import numpy as np
+
+            self._load()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="local-embed")
+            chunks = [batch[i:i + self.batch_size] for i in range(0, len(batch), self.batch_size)]
+            return np.concatenate(list(self._executor.map(self._encode, chunks)))
+
+        return self._encode(batch)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._process_pool is not None:
+            self._model.stop_multi_process_pool(self._process_pool)
+            self._process_pool = None
+
+
+def from_config(cfg: dict) -> EmbeddingProvider:
+    """Build the provider selected by the `embedding` config section."""
+    provider = cfg.get("provider", "openai").lower()
+
+    if provider == "local":
+        local = cfg.get("local", {})
+        return LocalEmbeddingProvider(
+            model=local.get("model", "sentence-transformers/all-MiniLM-L6-v2"),
+            device=local.get("device", "cpu"),
+            batch_size=local.get("batch_size", 32),
+            normalize=local.get("normalize", True),
+            backend=local.get("backend", "torch"),
+            quantized=local.get("quantized", False),
+            onnx_quantization=local.get("onnx_quantization", "avx2"),
+            onnx_cache_dir=local.get("onnx_cache_dir", "./CAM_project/onnx"),
+            pool=local.get("pool", "none"),
+            workers=local.get("workers", 2),
+        )
+
+    return OpenAIEmbeddingProvider(
+        model=cfg.get("model", "text-embedding-3-large"),
+        max_request_batch=cfg.get("max_request_batch", 256),
+    )
@@ -0,0 +1,156 @@
+"""
+enrichment.py
+Tag, intent, topic and usefulness of a prompt from one LLM call.
+
+The separate helpers (auto_tagger, intent_classifier, topic_extractor,
+usefulness_filter) each make their own chat completion; a stored turn could
+pay for up to five. enrich() asks for all four labels at once as JSON and
+validates them against the allowed label sets:
+
+- the keyword rules of intent_classifier / usefulness_filter still run first
+  and win when they decide; prompts the rules reject as not useful skip the
+  LLM entirely
+- a confident local classifier (modules.local_classifier) supplies intent
+  and tag; when that and the rules settle everything, the LLM isn't asked
+  and the topic stays "unknown"
+- the LLM answer is memoized (modules.llm_cache), so every consumer of the
+  same prompt — normalizer, store_to_memory, write-behind worker, CLI —
+  reuses one call, and concurrent consumers share the in-flight one
+
+Config: `enrichment` in config.json; enabled=false falls back to the
+separate helpers.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from modules import (
+    auto_tagger, intent_classifier, llm_cache, local_classifier, resources, topic_extractor, usefulness_filter,
+)
+
+
+@dataclass(frozen=True)
+class Enrichment:
+    tag: str = "NONE"
+    intent: str = "fact"
+    topic: str = "unknown"
+    useful: bool = False
+    source: str = "rules"  # "rules", "local", "llm", "fallback" (LLM failed) or "separate" (enrichment disabled)
+
+
+def _settings() -> dict:
+    return resources.config().get("enrichment", {})
+
+
+def _prompt(text: str) -> str:
+    return (
+        "Label the message below. Reply with a JSON object with exactly these keys:\n"
+        f'- "tag": one of {auto_tagger.ALLOWED_TAGS} that clearly applies, or "NONE"\n'
+        f'- "intent": one of {intent_classifier.INTENTS} — a fact adds new personal or contextual info, '
+        "a query asks for knowledge, meta refers to previous messages or timestamps\n"
+        '- "topic": the main topic or subject in one lowercase word\n'
+        '- "useful": true if it conveys storable personal facts, relationships or properties; '
+        "false if it is trivial, meta or uninformative\n\n"
+        f"Message:\n{text}"
+    )
+
+
+def _validate(raw: dict) -> dict:
+    """Keep only labels from the allowed sets; anything else becomes None."""
+    tag = str(raw.get("tag", "")).strip()
+    tag = next((t for t in auto_tagger.ALLOWED_TAGS if t.upper() == tag.upper()), None)
+    intent = str(raw.get("intent", "")).strip().lower()
+    intent = intent if intent in intent_classifier.INTENTS else None
+    topic = str(raw.get("topic", "")).strip().lower().split()
+    useful = raw.get("useful")
+    if isinstance(useful, str):
+        useful = useful.strip().lower() == "true"
+    return {
+        "tag": tag,
+        "intent": intent,
+        "topic": topic[0].strip(".,;:!?\"'") if topic else None,
+        "useful": useful if isinstance(useful, bool) else None,
+    }
+
+
+def _ask(text: str) -> Optional[dict]:
+    try:
+        return _validate(json.loads(_request(text, _settings().get("model", "gpt-4o-mini"))))
+    except Exception as e:
+        print(f"⚠️ Enrichment call failed: {e}")
+        return None
+
+
+@llm_cache.memoize("enrichment")
+def _request(text: str, model: str) -> str:
+    response = resources.openai_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": _prompt(text)}],
+        response_format={"type": "json_object"},
+        temperature=0,
+    )
+    return response.choices[0].message.content
+
+
+def _separate(text: str) -> Enrichment:
+    """Legacy path: one helper (and possibly one LLM call) per label."""
+    return Enrichment(
+        tag=auto_tagger.auto_tag(text),
+        intent=intent_classifier.classify_intent(text),
+        topic=topic_extractor.extract_topic(text),
+        useful=usefulness_filter.is_useful(text),
+        source="separate",
+    )
+
+
+def _enrich(text: str) -> Enrichment:
+    intent = intent_classifier.heuristic_intent(text)
+    useful = usefulness_filter.heuristic_usefulness(text)
+    if useful is False:
+        # Won't be stored, so tag and topic aren't worth a call
+        return Enrichment(intent=intent or "fact", useful=False, source="rules")
+
+    intent = intent or local_classifier.classify("intent", text)
+    tag = local_classifier.classify("tag", text)
+    if intent is not None and tag is not None and useful is not None:
+        return Enrichment(tag=tag, intent=intent, useful=useful, source="local")
+
+    labels = _ask(text)
+    if labels is None:
+        # Same defaults the separate helpers fall back to on errors
+        return Enrichment(tag=tag or "NONE", intent=intent or "fact", useful=bool(useful), source="fallback")
+    return Enrichment(
+        tag=tag or labels["tag"] or "NONE",
+        intent=intent or labels["intent"] or "fact",
+        topic=labels["topic"] or "unknown",
+        useful=useful if useful is not None else bool(labels["useful"]),
+        source="llm",
+    )
+
+
+_stats_lock = threading.Lock()
+_stats = {"llm": 0, "rules": 0, "local": 0, "fallback": 0, "separate": 0}
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def enrich(text: str) -> Enrichment:
+    """Labels for `text`, from at most one (memoized) LLM call."""
+    if not _settings().get("enabled", True):
+        _count("separate")
+        return _separate(text)
+
+    result = _enrich(text or "")
+    _count(result.source)
+    return result
+
+
+def stats() -> dict:
+    """How enrichments were produced; repeats served from llm_cache count under `llm` too (see llm_cache.stats())."""
+    with _stats_lock:
+        return dict(_stats)
@@ -1,46 +1,43 @@
 # modules/intent_classifier.py
 
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from modules import keyword_rules, llm_cache, local_classifier, resources
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+INTENTS = ["fact", "query", "meta"]
 
-def classify_intent(prompt: str) -> str:
+
+def heuristic_intent(prompt: str):
     """
-    Classify a user prompt into:
-    - 'fact' → new personal/contextual info
-    - 'query' → asks for info
-    - 'meta' → refers to system memory/history
+    The keyword rules of classify_intent(): 'query' or 'meta' when they
+    fire, None when only the LLM can tell.
     """
     if not prompt or len(prompt.split()) < 2:
         return "meta"
 
     lowered = prompt.lower().strip()
+    rules = resources.config()["intent_classifier"]
 
-    if any(lowered.startswith(x) for x in ["what", "who", "when", "where", "why", "how", "is", "are", "can", "do", "does", "did"]):
+    if keyword_rules.starts_with_any(lowered, rules["query_prefixes"]):
         return "query"
-    if any(x in lowered for x in ["remember", "recall", "you said", "what did i", "when did i", "show me"]):
+    if keyword_rules.contains_any(lowered, rules["meta_phrases"]):
         return "meta"
     if lowered.endswith("?"):
         return "query"
+    return None
+
+
+def classify_intent(prompt: str) -> str:
+    """
+    Classify a user prompt into:
+    - 'fact' → new personal/contextual info
+    - 'query' → asks for info
+    - 'meta' → refers to system memory/history
+    """
+    intent = heuristic_intent(prompt) or local_classifier.classify("intent", prompt)
+    if intent is not None:
+        return intent
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": (
-                    "Classify this message strictly as one of: 'fact', 'query', or 'meta'. "
-                    "A 'fact' adds new personal or contextual info. "
-                    "A 'query' asks for knowledge. "
-                    "A 'meta' refers to previous messages or timestamps.\n\n"
-                    f"Message: {prompt}"
-                )}
-            ],
-            temperature=0,
-        )
-        result = response.choices[0].message.content.strip().lower()
+        result = _llm_intent(prompt).strip().lower()
         if "query" in result:
             return "query"
         elif "meta" in result:
@@ -49,3 +46,21 @@ def classify_intent(prompt: str) -> str:
             return "fact"
     except Exception:
         return "fact"
+
+
+@llm_cache.memoize("classify_intent", model="gpt-3.5-turbo")
+def _llm_intent(prompt: str) -> str:
+    response = resources.openai_client().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "user", "content": (
+                "Classify this message strictly as one of: 'fact', 'query', or 'meta'. "
+                "A 'fact' adds new personal or contextual info. "
+                "A 'query' asks for knowledge. "
+                "A 'meta' refers to previous messages or timestamps.\n\n"
+                f"Message: {prompt}"
+            )}
+        ],
+        temperature=0,
+    )
+    return response.choices[0].message.content
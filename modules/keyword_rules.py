@@ -0,0 +1,40 @@
+"""
+keyword_rules.py
+Compiled keyword rules for the heuristic filters (usefulness_filter,
+intent_classifier).
+
+A phrase list from config becomes one regex, so a prompt is scanned once
+instead of once per phrase. Phrases match whole words only ("no" does not
+match inside "know"), and the whitespace inside a phrase may be any run of
+spaces. Patterns are cached per phrase list, so a reloaded config compiles
+its new lists once.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    words = sorted({" ".join(p.lower().split()) for p in phrases if p and p.strip()}, key=len, reverse=True)
+    return "|".join(r"\s+".join(re.escape(w) for w in phrase.split(" ")) for phrase in words)
+
+
+@lru_cache(maxsize=64)
+def _compile(phrases: tuple, anchored: bool):
+    body = _alternation(phrases)
+    if not body:
+        return None
+    return re.compile(("^" if anchored else "") + rf"(?<!\w)(?:{body})(?!\w)", re.IGNORECASE)
+
+
+def contains_any(text: str, phrases: Iterable[str]) -> bool:
+    """True when any phrase occurs in `text` as whole words."""
+    pattern = _compile(tuple(phrases), False)
+    return pattern is not None and pattern.search(text) is not None
+
+
+def starts_with_any(text: str, phrases: Iterable[str]) -> bool:
+    """True when `text` (leading whitespace ignored) begins with one of the phrases as whole words."""
+    pattern = _compile(tuple(phrases), True)
+    return pattern is not None and pattern.match(text.lstrip()) is not None
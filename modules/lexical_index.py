@@ -0,0 +1,456 @@
+"""
+lexical_index.py
+In-process BM25 index over stored memories, one per namespace.
+
+- updated incrementally by memory.store_many (and on eviction)
+- persisted as an append-only JSONL log per namespace, replayed on load and
+  rewritten without superseded entries once it grows
+- the log is shared between processes: entries another process appends
+  (e.g. evictions by `python -m modules.maintenance.compaction --once`) are
+  picked up before the next search or write, and a rewritten log is reloaded
+- rebuilt from the vector store when no log exists yet (or on request)
+- reciprocal rank fusion helper for combining lexical and vector rankings
+
+Documents are indexed together with their `user_prompt`, so exact tokens
+such as names, IDs and product codes are found even when the embedding
+doesn't separate them.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from modules import resources
+
+DEFAULT_NAMESPACE = "default"
+
+# Keeps codes like "ab-1234", "v2.1" or "order_77" together as one token
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+STOPWORDS = frozenset("""
+a an and are as at be but by did do does for from had has have he her him his how i if in is it its me my
+no not of on or our she so that the their them they this to was we were what when where which who why
+will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased index terms of `text`, without stopwords."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def indexed_text(document: str, metadata: Optional[dict]) -> str:
+    """Text a memory is indexed under: its document plus the prompt that produced it."""
+    return f"{(metadata or {}).get('user_prompt', '')} {document or ''}"
+
+
+def _settings() -> dict:
+    return resources.config().get("lexical", {})
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring.
+
+    Documents get dense internal row numbers so a query scores into one
+    NumPy array; removed documents leave a hole until the log is rewritten.
+    """
+
+    # Rewrite the log once it holds this many times more lines than live documents
+    LOG_GROWTH = 2.0
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._log = None
+        self._reset_state()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _reset_state(self):
+        self._offset = 0       # bytes of the log already applied
+        self._log_inode = None
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: List[Optional[Dict[str, int]]] = []
+        self._doc_ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+        self._log_lines = 0
+
+    def __len__(self):
+        return len(self._row_of)
+
+    # --- Persistence ---
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            self._log_inode = os.fstat(f.fileno()).st_ino
+            self._apply_from(f)
+
+    def _apply_from(self, f):
+        """Apply log lines from self._offset on; a torn final line is left for next time."""
+        f.seek(self._offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written
+            self._offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn line from a crash mid-write
+            self._log_lines += 1
+            if entry["op"] == "add":
+                self._add_terms(entry["id"], entry["tf"])
+            else:
+                self._remove(entry["ids"])
+
+    def _sync(self):
+        """Catch up with log entries written by other processes (caller holds the lock)."""
+        if not self.path:
+            return
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_ino != self._log_inode or st.st_size < self._offset:
+            # Rewritten (save() elsewhere) or replaced: reload from scratch
+            self.close()
+            self._reset_state()
+            self._load()
+        elif st.st_size > self._offset:
+            with open(self.path, "rb") as f:
+                self._apply_from(f)
+
+    def _append_log(self, entries: List[dict]):
+        if not self.path:
+            return
+        if self._log is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._log = open(self.path, "ab")
+            self._log_inode = os.fstat(self._log.fileno()).st_ino
+        data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+        self._log.write(data)
+        self._log.flush()
+        # Skip our own lines on the next _sync(), unless another process appended in between
+        # (then they are re-read; re-applying an entry is harmless)
+        if self._log.tell() == self._offset + len(data):
+            self._offset += len(data)
+        self._log_lines += len(entries)
+        if self._log_lines > self.LOG_GROWTH * max(len(self._row_of), 1024):
+            self.save()
+
+    def save(self):
+        """Rewrite the log with one `add` entry per live document."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._sync()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                for id_, terms in zip(self._doc_ids, self._doc_terms):
+                    if id_ is not None:
+                        f.write((json.dumps({"op": "add", "id": id_, "tf": terms}) + "\n").encode("utf-8"))
+                self._offset = f.tell()
+                self._log_inode = os.fstat(f.fileno()).st_ino
+            os.replace(tmp, self.path)
+            self._log_lines = len(self._row_of)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # --- Updates ---
+
+    def _add_terms(self, id_: str, tf: Dict[str, int]):
+        if id_ in self._row_of:
+            self._remove([id_])
+        row = len(self._doc_ids)
+        self._doc_ids.append(id_)
+        self._doc_terms.append(tf)
+        self._row_of[id_] = row
+        if row >= self._lengths.shape[0]:
+            grown = np.zeros(max(1024, row * 2), dtype=np.float32)
+            grown[:self._lengths.shape[0]] = self._lengths
+            self._lengths = grown
+        length = sum(tf.values())
+        self._lengths[row] = length
+        self._total_length += length
+        for term, count in tf.items():
+            self._postings.setdefault(term, {})[row] = count
+
+    def _remove(self, ids: Iterable[str]):
+        for id_ in ids:
+            row = self._row_of.pop(id_, None)
+            if row is None:
+                continue
+            for term in self._doc_terms[row]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(row, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= int(self._lengths[row])
+            self._lengths[row] = 0
+            self._doc_ids[row] = None
+            self._doc_terms[row] = None
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index (or re-index) documents."""
+        entries = []
+        with self._lock:
+            self._sync()
+            for id_, text in zip(ids, texts):
+                tf = dict(Counter(tokenize(text)))
+                self._add_terms(id_, tf)
+                entries.append({"op": "add", "id": id_, "tf": tf})
+            self._append_log(entries)
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            self._sync()
+            ids = [id_ for id_ in ids if id_ in self._row_of]
+            if ids:
+                self._remove(ids)
+                self._append_log([{"op": "del", "ids": ids}])
+
+    def clear(self):
+        """Drop every document, including the on-disk log."""
+        with self._lock:
+            self.close()
+            self._reset_state()
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    # --- Search ---
+
+    def search(self, query: str, k: int = 10) -> Tuple[List[str], np.ndarray, float]:
+        """
+        Top-k documents for `query`.
+        Returns (ids, BM25 scores, share of the query terms the best hit contains).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._sync()
+            n_docs = len(self._row_of)
+            if not terms or n_docs == 0:
+                return [], np.zeros(0, dtype=np.float32), 0.0
+
+            n_rows = len(self._doc_ids)
+            lengths = self._lengths[:n_rows]
+            avg_length = max(self._total_length / n_docs, 1.0)
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+            scores = np.zeros(n_rows, dtype=np.float32)
+            matched = np.zeros(n_rows, dtype=np.int32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+                tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+                idf = math.log(1.0 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                scores[rows] += idf * tf * (self.k1 + 1.0) / (tf + norm[rows])
+                matched[rows] += 1
+
+            hits = np.flatnonzero(scores > 0)
+            if hits.size == 0:
+                return [], np.zeros(0, dtype=np.float32), 0.0
+            k = min(k, hits.size)
+            top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            # Coverage counts every query term, including ones no memory contains:
+            # a hit on one rare term ("france") must not pass for a match of the whole query
+            return [self._doc_ids[r] for r in top], scores[top], matched[top[0]] / len(terms)
+
+
+def is_confident(scores: np.ndarray, coverage: float, settings: dict) -> bool:
+    """
+    Whether the best hit can be served without vector search: it contains every
+    (non-stopword) query term, scores at least `fast_path_min_score` and beats the
+    runner-up by `fast_path_margin`.
+    """
+    if scores.size == 0 or coverage < settings.get("fast_path_min_coverage", 1.0):
+        return False
+    if scores[0] < settings.get("fast_path_min_score", 4.0):
+        return False
+    return scores.size == 1 or scores[0] >= settings.get("fast_path_margin", 1.5) * scores[1]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Merge several best-first id lists; ids ranked high in any list come first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# --- Per-namespace indexes ---
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+_build_locks: Dict[str, threading.Lock] = {}
+
+
+def enabled() -> bool:
+    return _settings().get("enabled", True)
+
+
+def _index_dir() -> str:
+    return os.path.abspath(_settings().get("path", "./CAM_project/lexical_index"))
+
+
+def _index_path(namespace: str) -> str:
+    from modules import memory
+    # Bucket collections hold many namespaces, so the file is per namespace, not per collection
+    digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(_index_dir(), f"{memory.collection_name(namespace)}__{digest}.jsonl")
+
+
+def _build_lock(namespace: str) -> threading.Lock:
+    with _indexes_lock:
+        return _build_locks.setdefault(namespace, threading.Lock())
+
+
+def _build(namespace: str, page_size: int = 1000) -> BM25Index:
+    """Index every memory in `namespace` from the vector store into a new log, moved into place when complete."""
+    from modules import memory
+
+    settings = _settings()
+    path = _index_path(namespace)
+    # Per-process name: two processes rebuilding at once don't write into each other's file
+    build_path = f"{path}.{os.getpid()}.build"
+    index = BM25Index(build_path, k1=settings.get("k1", 1.2), b=settings.get("b", 0.75))
+    index.clear()
+
+    store = memory.get_store(namespace)
+    where = memory.namespace_filter(namespace)
+    offset = 0
+    while True:
+        page = store.get(where=where, limit=page_size, offset=offset, include=["documents", "metadatas"])
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        metadatas = page.get("metadatas") or [{}] * len(ids)
+        index.add(ids, [indexed_text(d, m) for d, m in zip(page.get("documents") or [""] * len(ids), metadatas)])
+        offset += len(ids)
+
+    index.save()
+    index.close()
+    os.replace(build_path, path)  # a rename keeps the inode the index tracks
+    index.path = path
+    print(f"🔤 Rebuilt lexical index for '{namespace}' ({len(index)} documents)")
+    return index
+
+
+def get_index(namespace: Optional[str] = None) -> BM25Index:
+    """
+    Index for `namespace`, loaded from disk or rebuilt from the store on first use.
+
+    A rebuilt index is published only once it holds every stored memory;
+    searches and writes for that namespace wait for the build meanwhile.
+    """
+    namespace = namespace or DEFAULT_NAMESPACE
+    with _indexes_lock:
+        if namespace in _indexes:
+            return _indexes[namespace]
+    with _build_lock(namespace):
+        with _indexes_lock:
+            if namespace in _indexes:
+                return _indexes[namespace]
+        path = _index_path(namespace)
+        if os.path.exists(path):
+            settings = _settings()
+            index = BM25Index(path, k1=settings.get("k1", 1.2), b=settings.get("b", 0.75))
+        else:
+            index = _build(namespace)
+        with _indexes_lock:
+            _indexes[namespace] = index
+    return index
+
+
+def rebuild(namespace: Optional[str] = None, page_size: int = 1000) -> int:
+    """Re-index every memory in `namespace` from the vector store; returns the document count."""
+    namespace = namespace or DEFAULT_NAMESPACE
+    with _build_lock(namespace):
+        with _indexes_lock:
+            old = _indexes.pop(namespace, None)
+        if old is not None:
+            old.close()
+        index = _build(namespace, page_size)
+        with _indexes_lock:
+            _indexes[namespace] = index
+    return len(index)
+
+
+def index_records(namespace: Optional[str], records: List[dict]):
+    """Add freshly written memory records (memory.store_many's dicts) to the index."""
+    if not enabled() or not records:
+        return
+    get_index(namespace).add(
+        [r["id"] for r in records],
+        [indexed_text(r["document"], r["metadata"]) for r in records],
+    )
+
+
+def remove_ids(ids: List[str], collection: Optional[str] = None):
+    """
+    Drop deleted memories from the indexes of `collection` (every collection
+    when None); ids are unique across namespaces.
+
+    Loaded indexes are updated in place. For namespaces this process hasn't
+    loaded, the delete is appended to their log file, so it applies wherever
+    the index is loaded next — including in another running process.
+    """
+    if not ids:
+        return
+    with _indexes_lock:
+        loaded = {index.path: index for index in _indexes.values()}
+    for index in loaded.values():
+        index.remove(ids)
+
+    directory = _index_dir()
+    if not os.path.isdir(directory):
+        return
+    line = (json.dumps({"op": "del", "ids": list(ids)}) + "\n").encode("utf-8")
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith(".jsonl") or path in loaded:
+            continue
+        if collection is not None and name[:-len(".jsonl")].rsplit("__", 1)[0] != collection:
+            continue
+        with open(path, "ab") as f:
+            f.write(line)
+
+
+def drop_all():
+    """Forget every index, on disk too; each is rebuilt from the store on next use (e.g. after a snapshot import)."""
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+        path = _index_dir()
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.endswith(".jsonl"):
+                    os.remove(os.path.join(path, name))
+
+
+def search(namespace: Optional[str], query: str, k: int = 10) -> Tuple[List[str], np.ndarray, float]:
+    if not enabled():
+        return [], np.zeros(0, dtype=np.float32), 0.0
+    return get_index(namespace).search(query, k)
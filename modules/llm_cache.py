@@ -0,0 +1,238 @@
+"""
+llm_cache.py
+Memoization for auxiliary LLM calls (tagging, intent, topic, usefulness,
+enrichment, response recovery, temperature-0 completions).
+
+- @memoize(name, model) caches a function's results keyed by a hash of
+  (function, model, arguments)
+- level 1: in-process LRU; level 2 (optional): SQLite table of JSON values,
+  survives restarts
+- entries expire after `ttl_seconds`
+- single-flight: concurrent calls with the same key wait for the first one
+  instead of sending their own request
+- exceptions are never cached, so wrapped functions should raise on failure
+  and leave the fallback value to their caller
+- hit/miss counters per function (stats())
+
+Config: `llm_cache` in config.json.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+from modules import resources
+from modules.embedding_cache import LRUCache, normalize_text
+
+
+def cache_key(function: str, model: Optional[str], args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([list(args), sorted(kwargs.items())], default=str, ensure_ascii=False)
+    digest = hashlib.sha256(f"{function}\x00{model or ''}\x00{normalize_text(payload)}".encode("utf-8"))
+    return f"{function}:{digest.hexdigest()}"
+
+
+class DiskResultCache:
+    """SQLite table of JSON-encoded results keyed by cache_key()."""
+
+    # Size check runs every N writes rather than on every insert
+    EVICT_CHECK_INTERVAL = 256
+
+    def __init__(self, path: str, max_rows: int = 100_000):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results(created)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """(value, created) or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def put(self, key: str, value, created: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), created),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes >= self.EVICT_CHECK_INTERVAL:
+                self._writes = 0
+                self._evict_locked()
+
+    def _evict_locked(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count <= self.max_rows:
+            return
+        # Oldest first, down to ~90% of the budget
+        excess = count - int(0.9 * self.max_rows)
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created ASC LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMCache:
+    """In-process LRU in front of an optional disk tier, with TTL and single-flight."""
+
+    def __init__(self, memory_entries: int = 4096, ttl_seconds: float = 86400.0,
+                 disk: Optional[DiskResultCache] = None):
+        self.memory = LRUCache(memory_entries)
+        self.disk = disk
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = defaultdict(lambda: {"hits": 0, "disk_hits": 0, "shared": 0, "misses": 0})
+
+    def _count(self, function: str, name: str):
+        with self._lock:
+            self._stats[function][name] += 1
+
+    def _lookup(self, function: str, key: str):
+        """(found, value) from memory, then disk."""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            if now - entry[1] <= self.ttl:
+                self._count(function, "hits")
+                return True, entry[0]
+            self.memory.pop(key)
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self.memory.put(key, entry)
+                self._count(function, "disk_hits")
+                return True, entry[0]
+        return False, None
+
+    def call(self, function: str, key: str, compute: Callable[[], object], store_if: Optional[Callable] = None):
+        found, value = self._lookup(function, key)
+        if found:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            self._count(function, "shared")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._count(function, "misses")
+        try:
+            flight.value = compute()
+            if store_if is None or store_if(flight.value):
+                created = time.time()
+                self.memory.put(key, (flight.value, created))
+                if self.disk is not None:
+                    try:
+                        self.disk.put(key, flight.value, created)
+                    except (TypeError, ValueError, sqlite3.Error) as e:
+                        print(f"⚠️ LLM cache disk write failed for {function}: {e}")
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {name: dict(counts) for name, counts in self._stats.items()}
+        for counts in result.values():
+            calls = counts["hits"] + counts["disk_hits"] + counts["shared"] + counts["misses"]
+            counts["hit_rate"] = (calls - counts["misses"]) / calls if calls else 0.0
+        return result
+
+
+def from_config(settings: dict) -> Optional[LLMCache]:
+    if not settings.get("enabled", True):
+        return None
+    disk = None
+    if settings.get("disk_enabled", False):
+        disk = DiskResultCache(
+            os.path.abspath(settings.get("disk_path", "./CAM_project/llm_cache.sqlite")),
+            max_rows=settings.get("disk_max_rows", 100_000),
+        )
+    return LLMCache(
+        memory_entries=settings.get("memory_entries", 4096),
+        ttl_seconds=settings.get("ttl_seconds", 86400),
+        disk=disk,
+    )
+
+
+resources.register("llm_cache", lambda: from_config(resources.config().get("llm_cache", {})))
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Shared LLM result cache, or None when disabled."""
+    return resources.get("llm_cache")
+
+
+def memoize(name: str, model: Optional[str] = None, cacheable: Optional[Callable] = None,
+            store_if: Optional[Callable] = None):
+    """
+    Cache a function's results by (name, model, arguments).
+
+    cacheable(*args, **kwargs) -> bool can exclude calls (e.g. temperature > 0);
+    store_if(result) -> bool can keep failure placeholders out of the cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None or (cacheable is not None and not cacheable(*args, **kwargs)):
+                return func(*args, **kwargs)
+            key = cache_key(name, model, args, kwargs)
+            return cache.call(name, key, lambda: func(*args, **kwargs), store_if)
+        return wrapper
+    return decorator
+
+
+def stats() -> dict:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -1,29 +1,26 @@
 # modules/llm_client.py
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Initialize the OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from modules import llm_cache, resources
 
 def ask(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.7) -> str:
     """
     Send a prompt to the LLM and return the response text.
+    Temperature-0 answers are memoized (modules.llm_cache).
     """
     try:
-        response = client.responses.create(
-            model=model,
-            input=prompt,
-            temperature=temperature,
-        )
-
-        # Extract response text safely
-        output = response.output[0].content[0].text
-        return output
+        return _create(prompt, model=model, temperature=temperature)
 
     except Exception as e:
         print(f"❌ LLM request failed: {e}")
         return "(Error: LLM request failed)"
+
+
+@llm_cache.memoize("llm_client.ask", cacheable=lambda prompt, model="gpt-4o-mini", temperature=0.7: temperature == 0)
+def _create(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0.7) -> str:
+    response = resources.openai_client().responses.create(
+        model=model,
+        input=prompt,
+        temperature=temperature,
+    )
+
+    # Extract response text safely
+    return response.output[0].content[0].text
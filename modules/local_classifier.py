@@ -0,0 +1,95 @@
+"""
+local_classifier.py
+Local intent / tag classification over prompt embeddings.
+
+intent_classifier and auto_tagger fall back to a chat completion whenever
+their keyword rules don't fire. With a trained model, a logistic regression
+over the prompt embedding answers first, and the LLM is only asked when the
+model's confidence is below `local_classifier.min_confidence`.
+
+The model is trained from labelled memories already in the store
+(python -m modules.maintenance.train_classifier) and persisted with joblib,
+so startup only loads it. It is ignored if it was trained with a different
+embedding model than the one configured now.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from modules import embedding, resources
+
+HEADS = ("intent", "tag")
+
+
+def _settings() -> dict:
+    return resources.config().get("local_classifier", {})
+
+
+def model_path() -> str:
+    return os.path.abspath(_settings().get("path", "./CAM_project/classifier/local_classifier.joblib"))
+
+
+def _load():
+    """Persisted model bundle, or None when disabled, untrained or stale."""
+    if not _settings().get("enabled", True) or not os.path.exists(model_path()):
+        return None
+    try:
+        import joblib
+        bundle = joblib.load(model_path())
+    except Exception as e:
+        print(f"⚠️ Could not load local classifier ({e}) — using the LLM fallback")
+        return None
+    if bundle.get("embedding_model") != embedding.get_provider().cache_id:
+        print("⚠️ Local classifier was trained on another embedding model — retrain it")
+        return None
+    print(f"🧮 Loaded local classifier ({', '.join(bundle['models'])}, trained {bundle.get('trained_at')})")
+    return bundle
+
+
+resources.register("local_classifier", _load)
+
+
+def reload():
+    """Pick up a newly trained model."""
+    resources.reset("local_classifier")
+
+
+def features(vectors) -> np.ndarray:
+    """Unit-length float32 rows; the model sees directions, not magnitudes."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def predict(head: str, text: str, vector: Optional[list] = None) -> Optional[Tuple[str, float]]:
+    """(label, probability) from the local model, or None when there is no model for `head`."""
+    bundle = resources.get("local_classifier")
+    if bundle is None or head not in bundle["models"]:
+        return None
+    if vector is None:
+        # Usually a cache hit: retrieval embeds the same prompt
+        vector = embedding.get_embedding(text)
+    if not vector:
+        return None
+    model = bundle["models"][head]
+    probabilities = model.predict_proba(features(vector))[0]
+    best = int(np.argmax(probabilities))
+    return str(model.classes_[best]), float(probabilities[best])
+
+
+def classify(head: str, text: str, vector: Optional[list] = None) -> Optional[str]:
+    """Label when the local model is confident enough, else None (ask the LLM)."""
+    try:
+        prediction = predict(head, text, vector)
+    except Exception as e:
+        print(f"⚠️ Local {head} classification failed: {e}")
+        return None
+    if prediction is None:
+        return None
+    label, confidence = prediction
+    if confidence < _settings().get("min_confidence", 0.8):
+        return None
+    return label
@@ -0,0 +1,67 @@
+"""
+maintenance/access_tracker.py
+Counts how often memories are retrieved, without a write per read.
+
+Retrieval calls record() (in-memory, cheap); the maintenance worker calls
+flush() periodically, which adds the pending counts to each memory's
+`access_count` / `last_access` metadata with one get + one update per
+namespace.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+_lock = threading.Lock()
+_pending = defaultdict(Counter)
+
+
+def record(namespace: Optional[str], ids: Iterable[str]):
+    """Note that `ids` were returned by a retrieval in `namespace`."""
+    ids = list(ids)
+    if not ids:
+        return
+    with _lock:
+        _pending[namespace].update(ids)
+
+
+def pending() -> int:
+    with _lock:
+        return sum(len(c) for c in _pending.values())
+
+
+def flush() -> int:
+    """Write pending access counts to the store; returns the number of memories updated."""
+    from modules import memory
+
+    with _lock:
+        batches = dict(_pending)
+        _pending.clear()
+
+    now = time.time()
+    updated = 0
+    for namespace, counts in batches.items():
+        ids = list(counts)
+        try:
+            store = memory.get_store(namespace)
+            current = store.get(ids=ids, include=["metadatas"])
+            found_ids = current.get("ids") or []
+            metadatas = []
+            for id_, meta in zip(found_ids, current.get("metadatas") or []):
+                meta = dict(meta or {})
+                meta["access_count"] = int(meta.get("access_count", 0)) + counts[id_]
+                meta["last_access"] = now
+                metadatas.append(meta)
+            if found_ids:
+                store.update(ids=found_ids, metadatas=metadatas)
+            updated += len(found_ids)
+        except Exception as e:
+            print(f"⚠️ Failed to flush access counts for '{namespace or 'default'}': {e}")
+            # Keep the counts for the next flush
+            with _lock:
+                _pending[namespace].update(counts)
+
+    if updated:
+        print(f"📈 Flushed access counts for {updated} memories")
+    return updated
@@ -0,0 +1,292 @@
+"""
+maintenance/compaction.py
+Background decay scoring and capacity eviction for CAM memory.
+
+Every memory gets a decayed relevance score from its metadata:
+
+    score = confidence · exp(-relevance_decay · age_days)
+            · (1 + log1p(access_count) + log1p(occurrences - 1))
+            · (1 + reward)
+
+where age counts from the later of the write time and the last retrieval.
+`access_count` / `last_access` come from the access tracker and
+`occurrences` from dedup merges. Memories stored through the proxy
+(context_injector.memory_metadata) carry no `relevance_decay`,
+`confidence` or `reward`, so those fall back to `maintenance.default_decay`,
+1.0 and 0.0; memories are told apart by age and usage, and the factors
+only differ for records whose metadata sets them explicitly.
+
+When a namespace holds more than `maintenance.capacity_per_namespace`
+memories, the lowest-scoring ones are archived (optional) and deleted, and
+the index is compacted afterwards.
+
+The job is incremental: each step reads one page from one collection, and
+the background thread sleeps between steps, so the serving path never
+waits on a full scan.
+
+Usage:
+    python -m modules.maintenance.compaction --once
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from modules import lexical_index, memory, resources, retrieval_cache, vector_store
+from modules.maintenance import access_tracker
+
+DAY_SECONDS = 86400.0
+
+
+def _settings() -> dict:
+    return resources.config().get("maintenance", {})
+
+
+def _float(value, default: float) -> float:
+    try:
+        return default if value is None else float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _epoch(meta: dict) -> float:
+    epoch = memory.timestamp_epoch(meta)
+    return math.nan if epoch is None else epoch
+
+
+def decayed_scores(metadatas: List[dict], now: Optional[float] = None, default_decay: float = 0.02) -> np.ndarray:
+    """Decayed relevance score for each metadata dict (higher is more worth keeping)."""
+    now = time.time() if now is None else now
+    metadatas = [m or {} for m in metadatas]
+
+    written = np.array([_epoch(m) for m in metadatas], dtype=np.float64)
+    accessed = np.array([_float(m.get("last_access"), math.nan) for m in metadatas], dtype=np.float64)
+    decay = np.array([_float(m.get("relevance_decay"), default_decay) for m in metadatas], dtype=np.float64)
+    confidence = np.array([_float(m.get("confidence"), 1.0) for m in metadatas], dtype=np.float64)
+    reward = np.array([_float(m.get("reward"), 0.0) for m in metadatas], dtype=np.float64)
+    occurrences = np.array([_float(m.get("occurrences"), 1.0) for m in metadatas], dtype=np.float64)
+    access_count = np.array([_float(m.get("access_count"), 0.0) for m in metadatas], dtype=np.float64)
+
+    # Undated memories are treated as written now rather than evicted first
+    touched = np.fmax(written, accessed)
+    touched = np.where(np.isnan(touched), now, touched)
+    age_days = np.maximum(now - touched, 0.0) / DAY_SECONDS
+
+    usage = 1.0 + np.log1p(np.maximum(access_count, 0.0)) + np.log1p(np.maximum(occurrences - 1.0, 0.0))
+    return confidence * np.exp(-decay * age_days) * usage * (1.0 + reward)
+
+
+def _archive(store: vector_store.VectorStore, ids: List[str], archive_path: str):
+    data = store.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+    embeddings = data.get("embeddings")
+    if embeddings is None:
+        embeddings = [None] * len(data["ids"])
+
+    os.makedirs(archive_path, exist_ok=True)
+    archived_at = datetime.utcnow().isoformat() + "Z"
+    with open(os.path.join(archive_path, f"{store.name}.jsonl"), "a", encoding="utf-8") as f:
+        for id_, doc, meta, emb in zip(data["ids"], data["documents"], data["metadatas"], embeddings):
+            f.write(json.dumps({
+                "id": id_,
+                "document": doc,
+                "metadata": meta,
+                "embedding": None if emb is None else [float(x) for x in emb],
+                "archived_at": archived_at,
+            }) + "\n")
+
+
+def evict(store: vector_store.VectorStore, scores: Dict[str, List], capacity: int, settings: dict) -> int:
+    """
+    Trim every namespace in `store` to `capacity` memories.
+
+    `scores` maps namespace → [ids, scores] as collected by the scan.
+    Returns the number of memories removed.
+    """
+    victims = []
+    for namespace, (ids, values) in scores.items():
+        excess = len(ids) - capacity
+        if excess <= 0:
+            continue
+        values = np.asarray(values, dtype=np.float64)
+        lowest = np.argpartition(values, excess - 1)[:excess]
+        victims.extend(ids[i] for i in lowest.tolist())
+        print(f"🧹 '{namespace}' holds {len(ids)} memories (capacity {capacity}) — evicting {excess}")
+
+    if not victims:
+        return 0
+
+    chunk_size = settings.get("page_size", 500)
+    for start in range(0, len(victims), chunk_size):
+        chunk = victims[start:start + chunk_size]
+        if settings.get("archive", True):
+            _archive(store, chunk, settings.get("archive_path", "./CAM_project/archive"))
+        store.delete(ids=chunk)
+        lexical_index.remove_ids(chunk, collection=store.name)
+
+    store.compact()
+    memory.invalidate_counts()
+    retrieval_cache.bump_all()
+    return len(victims)
+
+
+class CompactionJob:
+    """
+    One compaction pass over every memory collection, run a page at a time.
+
+    step() does a bounded amount of work and returns False once the pass
+    has finished; the next step() starts a new pass.
+    """
+
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = settings if settings is not None else _settings()
+        self._pass = None
+        self.stats = {"passes": 0, "scanned": 0, "evicted": 0, "last_pass_seconds": None}
+
+    def _run_pass(self):
+        started = time.perf_counter()
+        page_size = self.settings.get("page_size", 500)
+        capacity = self.settings.get("capacity_per_namespace", 10000)
+        default_decay = self.settings.get("default_decay", 0.02)
+
+        for name in memory.collection_names():
+            store = resources.get("stores").get(name)
+            scores = defaultdict(lambda: [[], []])
+            offset = 0
+            now = time.time()
+            while True:
+                page = store.get(limit=page_size, offset=offset, include=["metadatas"])
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                metadatas = page.get("metadatas") or [{}] * len(ids)
+                page_scores = decayed_scores(metadatas, now=now, default_decay=default_decay)
+                for id_, meta, score in zip(ids, metadatas, page_scores.tolist()):
+                    # Bucket collections hold several namespaces; tenant collections hold one
+                    group = scores[(meta or {}).get("namespace", name)]
+                    group[0].append(id_)
+                    group[1].append(score)
+                offset += len(ids)
+                self.stats["scanned"] += len(ids)
+                yield
+            self.stats["evicted"] += evict(store, scores, capacity, self.settings)
+            yield
+
+        self.stats["passes"] += 1
+        self.stats["last_pass_seconds"] = round(time.perf_counter() - started, 3)
+
+    def step(self) -> bool:
+        if self._pass is None:
+            self._pass = self._run_pass()
+        try:
+            next(self._pass)
+            return True
+        except StopIteration:
+            self._pass = None
+            return False
+
+    def run_once(self, page_delay: float = 0.0):
+        """Run a full pass in the calling thread."""
+        access_tracker.flush()
+        while self.step():
+            if page_delay:
+                time.sleep(page_delay)
+        print(f"✅ Compaction pass done: {self.stats}")
+        return self.stats
+
+
+_job: Optional[CompactionJob] = None
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _worker(job: CompactionJob):
+    settings = job.settings
+    page_delay = settings.get("page_delay_seconds", 0.05)
+    interval = settings.get("interval_seconds", 600)
+    flush_every = settings.get("access_flush_seconds", 30)
+    next_pass = next_flush = time.monotonic()
+
+    while not _stop.is_set():
+        now = time.monotonic()
+        if now >= next_flush:
+            access_tracker.flush()
+            next_flush = now + flush_every
+
+        if now >= next_pass:
+            try:
+                if not job.step():
+                    print(f"🧹 Compaction pass done: {job.stats}")
+                    next_pass = time.monotonic() + interval
+            except Exception as e:
+                print(f"⚠️ Compaction step failed: {e}")
+                job._pass = None
+                next_pass = time.monotonic() + interval
+            _stop.wait(page_delay)
+        else:
+            _stop.wait(min(next_pass, next_flush) - now)
+
+    access_tracker.flush()
+
+
+def start_background() -> Optional[CompactionJob]:
+    """Start the maintenance thread (once) if `maintenance.enabled`."""
+    global _job, _thread
+    settings = _settings()
+    if not settings.get("enabled", True):
+        print("⏸️ Memory maintenance disabled.")
+        return None
+    if _thread is not None and _thread.is_alive():
+        return _job
+
+    _stop.clear()
+    _job = CompactionJob(settings)
+    _thread = threading.Thread(target=_worker, args=(_job,), name="cam-maintenance", daemon=True)
+    _thread.start()
+    print("🧹 Memory maintenance started.")
+    return _job
+
+
+def stop_background(timeout: float = 5.0):
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+
+
+def stats() -> dict:
+    return {
+        "running": _thread is not None and _thread.is_alive(),
+        "pending_access_counts": access_tracker.pending(),
+        **(_job.stats if _job else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--capacity", type=int, help="override maintenance.capacity_per_namespace")
+    args = parser.parse_args()
+
+    settings = dict(_settings())
+    if args.capacity is not None:
+        settings["capacity_per_namespace"] = args.capacity
+
+    job = CompactionJob(settings)
+    if args.once:
+        job.run_once()
+        return
+
+    while True:
+        job.run_once(settings.get("page_delay_seconds", 0.05))
+        time.sleep(settings.get("interval_seconds", 600))
+
+
+if __name__ == "__main__":
+    main()
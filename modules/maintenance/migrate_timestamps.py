@@ -0,0 +1,80 @@
+"""
+maintenance/migrate_timestamps.py
+One-time migration: add the numeric `ts` (epoch seconds) to memories
+written before store_many started recording it.
+
+`ts` is derived from the ISO `timestamp` string; memories without a
+parseable timestamp are left untouched and are reported. The migration is
+idempotent — records that already have a numeric `ts` are skipped — so it
+is safe to re-run after an interrupted pass.
+
+Usage:
+    python -m modules.maintenance.migrate_timestamps [--dry-run]
+"""
+
+import argparse
+from typing import Optional
+
+from modules import memory, resources, retrieval_cache
+
+
+def migrate_collection(name: str, page_size: int = 500, dry_run: bool = False) -> dict:
+    """Add `ts` to every memory of collection `name` that lacks it."""
+    store = resources.get("stores").get(name)
+    counts = {"scanned": 0, "migrated": 0, "undated": 0}
+    offset = 0
+    while True:
+        page = store.get(limit=page_size, offset=offset, include=["metadatas"])
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+        counts["scanned"] += len(ids)
+
+        update_ids, updates = [], []
+        for id_, meta in zip(ids, page.get("metadatas") or [{}] * len(ids)):
+            meta = meta or {}
+            if isinstance(meta.get("ts"), (int, float)):
+                continue
+            epoch = memory.timestamp_epoch(meta)
+            if epoch is None:
+                counts["undated"] += 1
+                continue
+            update_ids.append(id_)
+            updates.append({**meta, "ts": int(epoch)})
+
+        # Updating only changes metadata, so the pagination offsets stay valid
+        if update_ids and not dry_run:
+            store.update(ids=update_ids, metadatas=updates)
+        counts["migrated"] += len(update_ids)
+    return counts
+
+
+def migrate(page_size: Optional[int] = None, dry_run: bool = False) -> dict:
+    """Migrate every memory collection; returns totals."""
+    page_size = page_size or resources.config().get("maintenance", {}).get("page_size", 500)
+    totals = {"collections": 0, "scanned": 0, "migrated": 0, "undated": 0}
+    for name in memory.collection_names():
+        counts = migrate_collection(name, page_size, dry_run)
+        totals["collections"] += 1
+        for key, value in counts.items():
+            totals[key] += value
+        print(f"🕒 {name}: {counts['migrated']}/{counts['scanned']} memories "
+              f"{'would get' if dry_run else 'got'} a numeric ts ({counts['undated']} undated)")
+
+    if totals["migrated"] and not dry_run:
+        retrieval_cache.bump_all()
+    print(f"✅ Timestamp migration {'(dry run) ' if dry_run else ''}done: {totals}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the memories to migrate without writing")
+    parser.add_argument("--page-size", type=int, help="override maintenance.page_size")
+    args = parser.parse_args()
+    migrate(args.page_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
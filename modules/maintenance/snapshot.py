@@ -0,0 +1,273 @@
+"""
+maintenance/snapshot.py
+Snapshot export/import of the memory store.
+
+A snapshot is a directory with one sub-directory per collection:
+
+    <snapshot>/manifest.json             embedding model, compression, collections
+    <snapshot>/<collection>/records.parquet   id, document, metadata (JSON) columns
+    <snapshot>/<collection>/vectors.npy       float32 matrix, row i ↔ record i
+
+Export streams each collection out in pages, so memory use stays flat;
+vectors.npy can be memory-mapped by the loader. Without pyarrow the records
+are written as records.jsonl instead. Import bulk-loads with batched upserts
+and skips embedding entirely, so a new replica can warm-start from a
+snapshot.
+
+Usage:
+    python -m modules.maintenance.snapshot export ./CAM_project/snapshots/today
+    python -m modules.maintenance.snapshot import ./CAM_project/snapshots/today --if-empty
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from modules import embedding, lexical_index, memory, resources, retrieval_cache, vector_store
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def _model_info() -> dict:
+    return {
+        "embedding_model": embedding.get_provider().cache_id,
+        "vector_compression": dict(resources.config().get("vector_compression", {})),
+    }
+
+
+# --- Export ---
+
+class _RecordWriter:
+    """Appends pages of records to records.parquet (or records.jsonl without pyarrow)."""
+
+    def __init__(self, directory: str):
+        self.pa = _pyarrow()
+        self._writer = None
+        self._file = None
+        if self.pa is not None:
+            self.path = os.path.join(directory, "records.parquet")
+            self.schema = self.pa.schema([
+                ("id", self.pa.string()),
+                ("document", self.pa.string()),
+                ("metadata", self.pa.string()),
+            ])
+            self._writer = self.pa.parquet.ParquetWriter(self.path, self.schema, compression="zstd")
+        else:
+            self.path = os.path.join(directory, "records.jsonl")
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    @property
+    def format(self) -> str:
+        return "parquet" if self._writer is not None else "jsonl"
+
+    def write(self, ids: List[str], documents: List[str], metadatas: List[dict]):
+        metadata_json = [json.dumps(m or {}) for m in metadatas]
+        if self._writer is not None:
+            table = self.pa.table(
+                {"id": ids, "document": [d or "" for d in documents], "metadata": metadata_json},
+                schema=self.schema,
+            )
+            self._writer.write_table(table)
+        else:
+            for id_, doc, meta in zip(ids, documents, metadata_json):
+                self._file.write(json.dumps({"id": id_, "document": doc or "", "metadata": meta}) + "\n")
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def export_collection(store: vector_store.VectorStore, directory: str, page_size: int = 5000,
+                      where: Optional[dict] = None) -> dict:
+    """Stream one collection (or the rows matching `where`) into `directory`; returns its manifest entry."""
+    os.makedirs(directory, exist_ok=True)
+    # Rows written concurrently after this count are left for the next snapshot
+    total = store.count() if where is None else len(store.get(where=where, include=[]).get("ids") or [])
+    writer = _RecordWriter(directory)
+    vectors = None
+    dimension = None
+    rows = 0
+
+    try:
+        while rows < total:
+            page = store.get(where=where, limit=min(page_size, total - rows), offset=rows,
+                             include=["documents", "metadatas", "embeddings"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+
+            matrix = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                dimension = int(matrix.shape[1])
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(directory, "vectors.npy"), mode="w+", dtype=np.float32,
+                    shape=(total, matrix.shape[1]),
+                )
+            vectors[rows:rows + len(ids)] = matrix
+            writer.write(ids, page.get("documents") or [""] * len(ids), page.get("metadatas") or [{}] * len(ids))
+            rows += len(ids)
+    finally:
+        writer.close()
+        if vectors is not None:
+            vectors.flush()
+            del vectors
+
+    return {
+        "rows": rows,
+        "dimension": dimension,
+        "records": os.path.basename(writer.path),
+        "format": writer.format,
+    }
+
+
+def export_snapshot(path: str, namespace: Optional[str] = None, page_size: int = 5000) -> dict:
+    """
+    Write a snapshot of every memory collection (or just `namespace`'s) to `path`.
+    A namespace in a shared bucket collection is exported without the other tenants' memories.
+    """
+    started = time.perf_counter()
+    names = [memory.collection_name(namespace)] if namespace else memory.collection_names()
+    where = memory.namespace_filter(namespace) if namespace else None
+    os.makedirs(path, exist_ok=True)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        **_model_info(),
+        "collections": {},
+    }
+    for name in names:
+        store = resources.get("stores").get(name)
+        manifest["collections"][name] = export_collection(store, os.path.join(path, name), page_size, where)
+        print(f"📦 Exported {manifest['collections'][name]['rows']} memories from '{name}'")
+
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    total = sum(c["rows"] for c in manifest["collections"].values())
+    print(f"✅ Snapshot written to {path}: {total} memories in {time.perf_counter() - started:.1f}s")
+    return manifest
+
+
+# --- Import ---
+
+def _read_records(directory: str, entry: dict, batch_size: int) -> Iterator[Tuple[List[str], List[str], List[dict]]]:
+    records_path = os.path.join(directory, entry["records"])
+    if entry["format"] == "parquet":
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError("This snapshot was written as Parquet; install pyarrow to restore it")
+        for batch in pa.parquet.ParquetFile(records_path).iter_batches(batch_size=batch_size):
+            columns = batch.to_pydict()
+            yield columns["id"], columns["document"], [json.loads(m) for m in columns["metadata"]]
+        return
+
+    ids, documents, metadatas = [], [], []
+    with open(records_path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            ids.append(row["id"])
+            documents.append(row["document"])
+            metadatas.append(json.loads(row["metadata"]))
+            if len(ids) == batch_size:
+                yield ids, documents, metadatas
+                ids, documents, metadatas = [], [], []
+    if ids:
+        yield ids, documents, metadatas
+
+
+def import_collection(store: vector_store.VectorStore, directory: str, entry: dict, batch_size: int = 1000) -> int:
+    """Bulk-load one exported collection into `store`; returns the number of rows loaded."""
+    if entry["rows"] == 0:
+        return 0
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+    loaded = 0
+    for ids, documents, metadatas in _read_records(directory, entry, batch_size):
+        store.upsert(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=np.ascontiguousarray(vectors[loaded:loaded + len(ids)]).tolist(),
+        )
+        loaded += len(ids)
+    return loaded
+
+
+def import_snapshot(path: str, batch_size: int = 1000, force: bool = False, if_empty: bool = False) -> int:
+    """
+    Load a snapshot written by export_snapshot() into the configured store.
+
+    Vectors are loaded as-is, so the snapshot must come from the same
+    embedding model and compression settings unless force=True.
+    if_empty=True skips collections that already hold memories (warm start).
+    """
+    started = time.perf_counter()
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    current = _model_info()
+    for key in ("embedding_model", "vector_compression"):
+        if manifest.get(key) != current[key]:
+            message = f"snapshot {key} {manifest.get(key)!r} does not match current {current[key]!r}"
+            if not force:
+                raise ValueError(f"Refusing to import: {message} (use force=True to override)")
+            print(f"⚠️ Importing anyway: {message}")
+
+    loaded = 0
+    for name, entry in manifest["collections"].items():
+        store = resources.get("stores").get(name)
+        if if_empty and store.count() > 0:
+            print(f"⏭️ '{name}' already holds memories — skipping")
+            continue
+        count = import_collection(store, os.path.join(path, name), entry, batch_size)
+        print(f"📥 Imported {count} memories into '{name}'")
+        loaded += count
+
+    memory.invalidate_counts()
+    retrieval_cache.bump_all()
+    lexical_index.drop_all()
+    print(f"✅ Snapshot {path} restored: {loaded} memories in {time.perf_counter() - started:.1f}s")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="write a snapshot")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("--namespace", help="only this namespace's memories")
+    export_cmd.add_argument("--page-size", type=int, default=5000)
+
+    import_cmd = sub.add_parser("import", help="restore a snapshot")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--batch-size", type=int, default=1000)
+    import_cmd.add_argument("--force", action="store_true", help="ignore embedding model/compression mismatch")
+    import_cmd.add_argument("--if-empty", action="store_true", help="skip collections that already have data")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(args.path, namespace=args.namespace, page_size=args.page_size)
+    else:
+        import_snapshot(args.path, batch_size=args.batch_size, force=args.force, if_empty=args.if_empty)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+maintenance/train_classifier.py
+Train the local intent / tag classifier (modules.local_classifier) from the
+labelled memories already in the store.
+
+Each memory contributes its `user_prompt` (or its document when there is
+none) with the `intent` and `tag` in its metadata. Prompts are embedded in
+batches through the embedding cache, one logistic regression is fitted per
+label head, and the bundle is written with joblib. Heads with fewer than two
+labels of `local_classifier.min_examples_per_label` examples are skipped.
+
+Usage:
+    python -m modules.maintenance.train_classifier [--holdout 0.2]
+"""
+
+import argparse
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from modules import auto_tagger, embedding, intent_classifier, local_classifier, memory, resources
+
+LABELS = {"intent": intent_classifier.INTENTS, "tag": auto_tagger.ALLOWED_TAGS}
+
+
+def collect(page_size: int = 500) -> Dict[str, list]:
+    """Unique labelled prompts from every memory collection: {"text": [...], "intent": [...], "tag": [...]}."""
+    examples = {}
+    for name in memory.collection_names():
+        store = resources.get("stores").get(name)
+        offset = 0
+        while True:
+            page = store.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+            for doc, meta in zip(page.get("documents") or [""] * len(ids), page.get("metadatas") or [{}] * len(ids)):
+                meta = meta or {}
+                text = (meta.get("user_prompt") or doc or "").strip()
+                if text:
+                    examples[text] = {head: meta.get(head) for head in LABELS}
+
+    data = {"text": list(examples)}
+    for head, allowed in LABELS.items():
+        data[head] = [labels[head] if labels[head] in allowed else None for labels in examples.values()]
+    return data
+
+
+def _fit(vectors: np.ndarray, labels: List[str]):
+    from sklearn.linear_model import LogisticRegression
+
+    model = LogisticRegression(max_iter=1000, class_weight="balanced")
+    model.fit(vectors, labels)
+    return model
+
+
+def train(holdout: float = 0.0, settings: Optional[dict] = None) -> dict:
+    """Fit and save the classifier; returns per-head training stats."""
+    import joblib
+
+    settings = settings if settings is not None else resources.config().get("local_classifier", {})
+    min_examples = settings.get("min_examples_per_label", 10)
+    data = collect()
+    print(f"🧮 Collected {len(data['text'])} labelled prompts")
+    if not data["text"]:
+        return {}
+
+    vectors = local_classifier.features(embedding.get_embeddings(data["text"]))
+    rng = np.random.default_rng(0)
+    models, report = {}, {}
+    for head in LABELS:
+        counts = Counter(label for label in data[head] if label is not None)
+        usable = {label for label, n in counts.items() if n >= min_examples}
+        rows = np.array([i for i, label in enumerate(data[head]) if label in usable], dtype=np.int64)
+        if len(usable) < 2:
+            print(f"⏭️ Skipping '{head}': need 2+ labels with {min_examples}+ examples ({dict(counts)})")
+            continue
+
+        labels = np.array([data[head][i] for i in rows])
+        report[head] = {"examples": int(rows.size), "labels": {label: counts[label] for label in sorted(usable)}}
+        if holdout > 0:
+            test = rng.random(rows.size) < holdout
+            if test.any() and (~test).any():
+                scored = _fit(vectors[rows[~test]], labels[~test])
+                report[head]["holdout_accuracy"] = round(float(scored.score(vectors[rows[test]], labels[test])), 3)
+
+        models[head] = _fit(vectors[rows], labels)
+        print(f"✅ Trained '{head}' head: {report[head]}")
+
+    if not models:
+        print("⚠️ Nothing to train — store more labelled memories first.")
+        return report
+
+    path = local_classifier.model_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    joblib.dump({
+        "models": models,
+        "embedding_model": embedding.get_provider().cache_id,
+        "trained_at": datetime.utcnow().isoformat() + "Z",
+        "report": report,
+    }, tmp)
+    os.replace(tmp, path)
+    local_classifier.reload()
+    print(f"💾 Saved local classifier to {path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of examples held out to report accuracy")
+    args = parser.parse_args()
+    train(args.holdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,326 @@
 """
 memory.py
-Handles Chroma vector storage and retrieval for CAM.
-Clean version — uses OpenAI embeddings only (no Chroma auto-embedding).
+Handles vector storage and retrieval for CAM.
+Clean version — embeddings come from modules.embedding (no Chroma auto-embedding).
+The storage backend (Chroma HTTP, in-process Chroma or a NumPy flat index)
+is chosen by the `vector_store` config section.
 """
 
-import os
-import chromadb
-from chromadb.config import Settings
-from modules import embedding
-
-# --- Initialize Chroma client ---
-CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
-CHROMA_PORT = os.getenv("CHROMA_PORT", "8001")
-
-# Try to connect to Chroma server, fall back to embedded if server not available
-try:
-    client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
-    print(f"🌐 Connected to Chroma server at {CHROMA_HOST}:{CHROMA_PORT}")
-except Exception as e:
-    print(f"⚠️ Chroma server not available, using embedded client: {e}")
-    CHROMA_PATH = os.path.abspath("./CAM_project/chroma_db")
-    client = chromadb.Client(Settings(
-        persist_directory=CHROMA_PATH,
-        anonymized_telemetry=False
-    ))
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from modules import (
+    context_packer, dedup, embedding, lexical_index, rerank_features, resources, retrieval_cache, vector_compression,
+    vector_store,
+)
 
 COLLECTION_NAME = "cam_memory"
+DEFAULT_NAMESPACE = "default"
+
+_UNSAFE_NAME_CHARS = re.compile(r"[^a-z0-9._-]+")
+
+
+def _settings() -> dict:
+    return resources.config().get("namespaces", {})
+
+
+def _partitioning() -> str:
+    return _settings().get("partitioning", "tenant")
+
+
+def collection_name(namespace: Optional[str] = None) -> str:
+    """
+    Physical collection holding `namespace`.
+
+    partitioning="tenant": one collection per namespace.
+    partitioning="bucket": namespaces hashed into a fixed number of shared
+    collections, separated by a `namespace` metadata filter.
+    """
+    namespace = namespace or DEFAULT_NAMESPACE
+    if namespace == DEFAULT_NAMESPACE:
+        return COLLECTION_NAME
+
+    digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()
+    if _partitioning() == "bucket":
+        return f"{COLLECTION_NAME}__b{int(digest, 16) % _settings().get('buckets', 64):03d}"
+
+    slug = _UNSAFE_NAME_CHARS.sub("-", namespace.lower()).strip("-._")[:40]
+    return f"{COLLECTION_NAME}__{slug}_{digest[:8]}" if slug else f"{COLLECTION_NAME}__{digest[:16]}"
+
+
+def namespace_filter(namespace: Optional[str] = None) -> Optional[dict]:
+    """Metadata filter that isolates `namespace` inside a shared bucket collection."""
+    namespace = namespace or DEFAULT_NAMESPACE
+    if namespace == DEFAULT_NAMESPACE or _partitioning() != "bucket":
+        return None
+    return {"namespace": {"$eq": namespace}}
+
+
+def combine_where(*clauses: Optional[dict]) -> Optional[dict]:
+    """AND together the non-empty Chroma `where` clauses."""
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def timestamp_epoch(metadata: Optional[dict]) -> Optional[float]:
+    """Write time of a memory in epoch seconds: numeric `ts` if present, else the ISO `timestamp`."""
+    metadata = metadata or {}
+    if isinstance(metadata.get("ts"), (int, float)) and not isinstance(metadata.get("ts"), bool):
+        return float(metadata["ts"])
+    stamp = metadata.get("timestamp")
+    if not stamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        # Writers use utcnow() as well as local now(); naive stamps are read as UTC
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def time_filter(since: Optional[float] = None, until: Optional[float] = None) -> Optional[dict]:
+    """`where` clause restricting memories to a write-time window (epoch seconds, inclusive)."""
+    clauses = []
+    if since is not None:
+        clauses.append({"ts": {"$gte": since}})
+    if until is not None:
+        clauses.append({"ts": {"$lte": until}})
+    return combine_where(*clauses)
+
+
+class StoreRegistry:
+    """
+    Opens collections lazily and keeps at most `max_open` of them in an LRU,
+    so thousands of tenants don't each hold open client or file state.
+    """
+
+    def __init__(self, max_open: int = 256):
+        self.max_open = max_open
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> vector_store.VectorStore:
+        with self._lock:
+            if name in self._stores:
+                self._stores.move_to_end(name)
+                return self._stores[name]
+
+            store = self._open(name)
+            self._stores[name] = store
+            while len(self._stores) > self.max_open:
+                _, evicted = self._stores.popitem(last=False)
+                if hasattr(evicted, "close"):
+                    evicted.close()
+            return store
+
+    def _open(self, name: str) -> vector_store.VectorStore:
+        settings = resources.config().get("vector_store", {})
+        client = None if settings.get("backend") == "numpy" else resources.chroma_client()
+        store = vector_store.open_store(
+            name, settings, client=client, quantization=get_compressor().quantization
+        )
+        print(f"🔍 Using collection: {name} ({store.backend})")
+        return store
+
+    def open_names(self) -> List[str]:
+        return list(self._stores)
+
+
+def _build_compressor():
+    return vector_compression.from_config(resources.config().get("vector_compression", {}))
+
+
+resources.register("stores", lambda: StoreRegistry(_settings().get("max_open_collections", 256)))
+# Applied to every stored vector and (via retrieval) every query vector
+resources.register("vector_compressor", _build_compressor)
+
+
+def get_store(namespace: Optional[str] = None) -> vector_store.VectorStore:
+    """Collection holding `namespace` on the configured backend, opened on first use."""
+    return resources.get("stores").get(collection_name(namespace))
+
+
+# Older name, kept for callers written against the Chroma-only version
+get_collection = get_store
+
+
+def collection_names() -> List[str]:
+    """Every memory collection on the configured backend (the default one, tenant and bucket collections)."""
+    settings = resources.config().get("vector_store", {})
+    client = None if settings.get("backend") == "numpy" else resources.chroma_client()
+    return [
+        name for name in vector_store.list_collections(settings, client)
+        if name == COLLECTION_NAME or name.startswith(COLLECTION_NAME + "__")
+    ]
+
+
+def get_compressor() -> vector_compression.VectorCompressor:
+    return resources.get("vector_compressor")
+
+
+def __getattr__(name):
+    # Keeps `memory.collection` / `memory.client` / `memory.compressor` working without import-time connections
+    if name == "collection":
+        return get_store()
+    if name == "client":
+        return resources.chroma_client()
+    if name == "compressor":
+        return get_compressor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_embedding_dimension() -> int:
     """Return current embedding model's vector dimension."""
-    sample = embedding.get_embedding("dimension check")
-    dim = len(sample) if sample else 0
+    dim = embedding.get_dimension()
+    if not dim:
+        # Unknown hosted model: fall back to a (cached) probe embedding
+        sample = embedding.get_embedding("dimension check")
+        dim = len(sample) if sample else 0
+    dim = get_compressor().output_dimension(dim)
     print(f"🧮 Detected embedding dimension: {dim}")
     return dim
 
-# ✅ Disable Chroma's built-in embedding model since we use OpenAI embeddings
-collection = client.get_or_create_collection(
-    name=COLLECTION_NAME,
-    embedding_function=None
-)
+# --- Core memory functions ---
 
-print(f"🔍 Using collection: {COLLECTION_NAME}")
-print(f"📊 Current entries: {collection.count()}")
+# Row counts are queried once per namespace, then tracked locally so writes don't need a count() round-trip
+_row_counts = {}
 
-# --- Core memory functions ---
 
-def store(text: str, metadata: dict, embedding_vector: list):
-    """Store new memory record in Chroma."""
+@dataclass
+class StoreResult:
+    """Outcome of a bulk write: IDs written, duplicates merged ({id: existing id}) and {id: reason} for the rest."""
+    written: List[str] = field(default_factory=list)
+    merged: Dict[str, str] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+def count(namespace: Optional[str] = None) -> int:
+    """Number of stored memories in `namespace` (queried once, then maintained locally)."""
+    namespace = namespace or DEFAULT_NAMESPACE
+    if namespace not in _row_counts:
+        where = namespace_filter(namespace)
+        store = get_store(namespace)
+        _row_counts[namespace] = len(store.get(where=where, include=[])["ids"]) if where else store.count()
+        print(f"📊 Current entries ({namespace}): {_row_counts[namespace]}")
+    return _row_counts[namespace]
+
+
+def invalidate_counts(namespace: Optional[str] = None):
+    """Forget cached row counts (e.g. after eviction) so the next count() re-queries."""
+    if namespace is None:
+        _row_counts.clear()
+    else:
+        _row_counts.pop(namespace, None)
+
+
+def _upsert_chunk(store: vector_store.VectorStore, chunk: List[dict]):
+    store.upsert(
+        ids=[r["id"] for r in chunk],
+        documents=[r["document"] for r in chunk],
+        metadatas=[r["metadata"] for r in chunk],
+        embeddings=[r["embedding"] for r in chunk],
+    )
+
+
+def store_many(records: List[dict], chunk_size: int = None, namespace: Optional[str] = None,
+               dedup_enabled: Optional[bool] = None) -> StoreResult:
+    """
+    Upsert many memory records into `namespace` in chunks.
+
+    Each record is a dict with "id", "document", "metadata" and "embedding".
+    Records without an embedding are skipped; if a chunk is rejected its
+    records are retried one by one so a single bad record doesn't drop the rest.
+    Exact and near duplicates of stored memories are merged into them instead
+    of inserted (config: `dedup`).
+    """
+    namespace = namespace or DEFAULT_NAMESPACE
+    result = StoreResult()
+    chunk_size = chunk_size or resources.config().get("memory", {}).get("write_chunk_size", 256)
+    compressor = get_compressor()
+    store = get_store(namespace)
+    tag_namespace = namespace_filter(namespace) is not None
+
+    ready = []
+    for i, record in enumerate(records):
+        id_ = record.get("id") or (record.get("metadata") or {}).get("episode_id")
+        if not id_:
+            result.failed[f"record[{i}]"] = "missing id"
+            continue
+        if not record.get("embedding"):
+            result.failed[id_] = "empty embedding vector"
+            continue
+        metadata = dict(record.get("metadata") or {})
+        if tag_namespace:
+            metadata["namespace"] = namespace
+        # Numeric write time, so retrieval can range-filter and decay by age
+        ts = timestamp_epoch(metadata)
+        metadata["ts"] = int(time.time() if ts is None else ts)
+        metadata.update(rerank_features.extract(record.get("document", ""), metadata))
+        metadata.update(context_packer.write_metadata(record.get("document", "")))
+        ready.append({
+            "id": id_,
+            "document": record.get("document", ""),
+            "metadata": metadata,
+            "embedding": compressor.transform(record["embedding"]),
+        })
+
+    dedup_settings = resources.config().get("dedup", {})
+    if dedup_enabled is None:
+        dedup_enabled = dedup_settings.get("enabled", True)
+    if dedup_enabled and ready:
+        try:
+            ready, result.merged = dedup.deduplicate(
+                store, ready, namespace_filter(namespace),
+                near_similarity=dedup_settings.get("near_duplicate_similarity", 0.97),
+            )
+        except Exception as e:
+            print(f"⚠️ Duplicate check failed, storing all records: {e}")
+
+    for start in range(0, len(ready), chunk_size):
+        chunk = ready[start:start + chunk_size]
+        try:
+            _upsert_chunk(store, chunk)
+            result.written.extend(r["id"] for r in chunk)
+        except Exception as e:
+            print(f"⚠️ Chunk of {len(chunk)} rejected ({e}) — retrying records individually")
+            for record in chunk:
+                try:
+                    _upsert_chunk(store, [record])
+                    result.written.append(record["id"])
+                except Exception as record_error:
+                    result.failed[record["id"]] = str(record_error)
+
+    if result.written:
+        written = set(result.written)
+        try:
+            lexical_index.index_records(namespace, [r for r in ready if r["id"] in written])
+        except Exception as e:
+            print(f"⚠️ Lexical index update failed: {e}")
+    if result.written or result.merged:
+        retrieval_cache.bump(namespace)
+    if namespace in _row_counts:
+        # Upserts that overwrite an existing id make this an upper bound
+        _row_counts[namespace] += len(result.written)
+
+    if result.failed:
+        print(f"❌ Failed to store {len(result.failed)} memories: {result.failed}")
+    if result.written:
+        print(f"✅ Stored {len(result.written)} memories in '{namespace}'.")
+    return result
+
+
+def store(text: str, metadata: dict, embedding_vector: list, namespace: Optional[str] = None):
+    """Store new memory record in `namespace`."""
     if not embedding_vector:
         print("⚠️ Skipping storage — empty embedding vector.")
         return
@@ -54,33 +328,31 @@ def store(text: str, metadata: dict, embedding_vector: list):
     try:
         id_ = metadata.get("episode_id", "unknown")
         print(f"📝 Storing memory {id_} with {len(embedding_vector)} dims")
-
-        collection.add(
-            documents=[text],
-            metadatas=[metadata],
-            embeddings=[embedding_vector],
-            ids=[id_],
+        store_many(
+            [{"id": id_, "document": text, "metadata": metadata, "embedding": embedding_vector}],
+            namespace=namespace,
         )
 
-        # Verify it was stored
-        count = collection.count()
-        print(f"✅ Memory stored. Total entries: {count}")
-
     except Exception as e:
         print(f"❌ Failed to store memory: {e}")
         import traceback
         traceback.print_exc()
 
-def query(query_text: str, n_results: int = 5):
+def query(query_text: str, n_results: int = 5, namespace: Optional[str] = None):
     """Query similar memories."""
-    return collection.query(query_texts=[query_text], n_results=n_results)
+    query_vector = get_compressor().transform(embedding.get_embedding(query_text))
+    return get_store(namespace).query(
+        query_embeddings=[query_vector], n_results=n_results, where=namespace_filter(namespace)
+    )
 
-def get_recent_embeddings(n: int = 3):
+def get_recent_embeddings(n: int = 3, namespace: Optional[str] = None):
     """
     Returns the most recent n embeddings from memory for context comparison.
     """
     try:
-        data = collection.peek(n)
+        where = namespace_filter(namespace)
+        store = get_store(namespace)
+        data = store.get(where=where, limit=n, include=["embeddings"]) if where else store.peek(n)
         embeddings = data.get("embeddings", [])
 
         if embeddings is None or len(embeddings) == 0:
@@ -0,0 +1,103 @@
+"""
+rerank_features.py
+Rerank features computed once at write time and stored in memory metadata.
+
+- rr_flags:      bit 0 = naming/attribute pattern ("called", "named", "is", "has")
+                 bit 1 = title-case token in the document
+- rr_entity_sig: 62-bit signature of the capitalized names mentioned
+
+At query time the reranker turns the candidates' features into arrays and
+scores them in one pass, so its cost doesn't grow with per-document Python
+string work. Memories written before these features existed are featurized
+on the fly.
+"""
+
+import re
+import zlib
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from modules.lexical_index import STOPWORDS
+
+NAMING = 1
+TITLE = 2
+
+NAMING_KEYWORDS = ("called", "named", "is", "has")
+PRONOUNS = frozenset({"he", "she", "it", "they", "him", "her", "them"})
+
+NAMING_BOOST = 1.25
+TITLE_BOOST = 1.10
+ENTITY_BOOST = 1.20
+
+# Stays within a signed 64-bit metadata integer
+_SIGNATURE_BITS = 62
+_NAME = re.compile(r"\b[A-Z][a-z]+\b")
+_WORD = re.compile(r"\w+")
+
+
+def _bit(token: str) -> int:
+    return 1 << (zlib.crc32(token.lower().encode("utf-8")) % _SIGNATURE_BITS)
+
+
+def _signature(tokens) -> int:
+    signature = 0
+    for token in tokens:
+        signature |= _bit(token)
+    return signature
+
+
+def extract(document: str, metadata: Optional[dict] = None) -> dict:
+    """Feature metadata for a memory about to be stored."""
+    document = document or ""
+    text = ((metadata or {}).get("user_prompt", "") + " " + document).lower()
+
+    flags = 0
+    if any(kw in text for kw in NAMING_KEYWORDS):
+        flags |= NAMING
+    if any(word.istitle() for word in document.split()):
+        flags |= TITLE
+
+    names = [name for name in _NAME.findall(document) if name.lower() not in STOPWORDS]
+    return {"rr_flags": flags, "rr_entity_sig": _signature(names)}
+
+
+def query_signature(query: str) -> int:
+    return _signature(_WORD.findall(query or ""))
+
+
+def has_pronoun(query: str) -> bool:
+    return any(p in query.lower().split() for p in PRONOUNS)
+
+
+def feature_arrays(documents: Sequence[str], metadatas: Sequence[dict]):
+    """(flags, entity signatures) arrays for candidates, featurizing legacy memories on the fly."""
+    flags = np.zeros(len(documents), dtype=np.int64)
+    signatures = np.zeros(len(documents), dtype=np.int64)
+    for i, (doc, meta) in enumerate(zip(documents, metadatas)):
+        meta = meta or {}
+        if "rr_flags" not in meta:
+            meta = extract(doc, meta)
+        flags[i] = meta["rr_flags"]
+        signatures[i] = meta.get("rr_entity_sig", 0)
+    return flags, signatures
+
+
+def boosts(query: str, flags: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+    """Multiplicative rerank boost per candidate."""
+    result = np.where(flags & NAMING, NAMING_BOOST, 1.0)
+    result *= np.where(flags & TITLE, TITLE_BOOST, 1.0)
+    mentioned = (signatures & query_signature(query)) != 0
+    result *= np.where(mentioned, ENTITY_BOOST, 1.0)
+    return result
+
+
+def scores(query: str, distances, flags: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+    """Rerank score per candidate (higher is better)."""
+    return boosts(query, flags, signatures) / (1.0 + np.asarray(distances, dtype=np.float64))
+
+
+def rerank_order(query: str, distances, documents: Sequence[str], metadatas: Sequence[dict]) -> List[int]:
+    """Candidate indices, best first."""
+    flags, signatures = feature_arrays(documents, metadatas)
+    return np.argsort(-scores(query, distances, flags, signatures), kind="stable").tolist()
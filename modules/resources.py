@@ -0,0 +1,110 @@
+"""
+resources.py
+Lazily-initialized shared resources for CAM modules.
+
+Nothing here connects to a service at import time: each resource is built
+by its factory on first use and then shared by every module. Tests (or
+alternative deployments) can swap any resource with override().
+
+Resources:
+- config_service:     live, validated config.json (config() returns its snapshot)
+- openai:             shared OpenAI client
+- chroma:             Chroma client (HTTP server, in-process fallback)
+- embedding_provider: active embedding backend
+- embedding_cache:    two-level embedding cache (None when disabled)
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from modules import config_manager
+
+load_dotenv()
+
+_factories = {}
+_instances = {}
+_lock = threading.RLock()
+
+
+def register(name: str, factory):
+    """Register (or replace) the factory used to build a resource."""
+    with _lock:
+        _factories[name] = factory
+
+
+def get(name: str):
+    """Return the shared resource, building it on first use."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"Unknown resource '{name}'")
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def override(name: str, instance):
+    """Use `instance` for a resource instead of building it (e.g. a fake in tests)."""
+    with _lock:
+        _instances[name] = instance
+
+
+def reset(name: str = None):
+    """Drop one (or every) built resource so the next get() rebuilds it."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def is_initialized(name: str) -> bool:
+    return name in _instances
+
+
+# --- Default factories ---
+
+def _build_openai():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def _build_chroma():
+    from modules import vector_store
+    return vector_store.chroma_client(config().get("vector_store", {}))
+
+
+def _build_embedding_provider():
+    from modules import embedding_providers
+    return embedding_providers.from_config(config().get("embedding", {}))
+
+
+def _build_embedding_cache():
+    from modules import embedding_cache
+    return embedding_cache.from_config(config().get("embedding_cache", {}))
+
+
+register("config_service", config_manager.ConfigService)
+register("openai", _build_openai)
+register("chroma", _build_chroma)
+register("embedding_provider", _build_embedding_provider)
+register("embedding_cache", _build_embedding_cache)
+
+
+def config():
+    """Current read-only config snapshot; follows edits to config.json."""
+    return get("config_service").current()
+
+
+def openai_client():
+    return get("openai")
+
+
+def chroma_client():
+    return get("chroma")
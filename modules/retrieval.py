@@ -8,40 +8,76 @@ Supports:
 - pronoun-aware re-ranking
 - safe Chroma query filters
 - plain (fact-authoritative) retrieval for queries
+- result caching (modules.retrieval_cache)
+- hybrid lexical (BM25) + vector search with reciprocal rank fusion, and a
+  lexical fast path that skips the embedding call for confident matches
+- multi-stage selection: over-fetch candidates with their embeddings, then
+  threshold, rerank and MMR diversity selection in one vectorized pass
+- token-budgeted context assembly (modules.context_packer)
+- batched retrieval: one embedding call and one vector query for many queries
+- write-time windows (`since`/`until`, epoch seconds) as store pre-filters and
+  a time-decay blend that favours newer memories
 """
 
-from modules import memory, embedding, config_manager
-from typing import List, Tuple, Dict
-import numpy as np
-
-config = config_manager.load_config()
-BASE_DISTANCE = config["retrieval"]["max_distance"]
+import time
+from dataclasses import dataclass, field
 
-print("🔥 LOADED retrieval.py FROM:", __file__)
+from modules import memory, embedding, resources, retrieval_cache, lexical_index, rerank_features, similarity, context_packer
+from modules.maintenance import access_tracker
+from typing import List, Tuple, Dict, NamedTuple, Optional
+import numpy as np
 
 
-def _rerank_with_pronouns(query: str, results: List[Tuple[str, float, Dict]]):
+def _rerank_with_pronouns(query: str, results: List[tuple]):
     """
     Boost memories that likely resolve pronouns or named entities.
+    `results` are (document, distance, metadata, ...) tuples.
+    Uses the features stored at write time (modules.rerank_features), scored as arrays.
     """
-    pronouns = {"he", "she", "it", "they", "him", "her", "them"}
-    if not any(p in query.lower().split() for p in pronouns):
+    if not rerank_features.has_pronoun(query):
         return results
 
-    reranked = []
-    for doc, dist, meta in results:
-        score = 1.0 / (1.0 + dist)
-        text = (meta.get("user_prompt", "") + " " + doc).lower()
+    # Lexical fast-path hits have no distance; rank them as exact matches
+    distances = [0.0 if r[1] is None else r[1] for r in results]
+    order = rerank_features.rerank_order(
+        query, distances, [r[0] for r in results], [r[2] for r in results]
+    )
+    return [results[i] for i in order]
+
+
+@dataclass
+class RetrievalResult:
+    """Formatted context, the memory IDs it was built from, its token count, per-stage timings (ms) and where it came from."""
+    context: str = ""
+    ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    source: str = "none"
+    error: Optional[str] = None
+
+
+class _StageTimer:
+    def __init__(self):
+        self.timings = {}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + (now - self._last) * 1000, 3)
+        self._last = now
 
-        if any(kw in text for kw in ["called", "named", "is", "has"]):
-            score *= 1.25
-        if any(word.istitle() for word in doc.split()):
-            score *= 1.10
+    def skip(self):
+        """Start the next stage now, without charging the time since the last mark to any stage."""
+        self._last = time.perf_counter()
 
-        reranked.append((doc, dist, meta, score))
+    def done(self) -> Dict[str, float]:
+        self.timings["total"] = round((time.perf_counter() - self._start) * 1000, 3)
+        return self.timings
 
-    reranked.sort(key=lambda x: x[3], reverse=True)
-    return [(doc, dist, meta) for doc, dist, meta, _ in reranked]
+
+class _Packing(NamedTuple):
+    model: Optional[str]
+    token_budget: Optional[int]
 
 
 def retrieve_context(
@@ -50,120 +86,616 @@ def retrieve_context(
     include_meta: bool = False,
     mode: str = "contextual",
     plain: bool = False,
+    namespace: Optional[str] = None,
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
 ) -> str:
     """
     Retrieve relevant memory entries from Chroma.
+    Only memories stored under `namespace` are searched.
 
     plain=True:
       - returns ONLY the most relevant factual content
       - no decorations, no metadata
       - ideal for direct factual queries ("What is the color of my cat?")
+
+    The context is packed into `token_budget` tokens of `model`'s tokenizer
+    (default: `context_packing.max_tokens`).
+
+    since/until (epoch seconds) restrict the search to memories written in
+    that window.
+
+    Results are cached until the namespace is written to (see retrieval_cache).
     """
+    return retrieve(query, n_results, include_meta, mode, plain, namespace, model, token_budget, since, until).context
 
-    # --------------------------------------------------
-    # Build safe Chroma filter
-    # --------------------------------------------------
+
+def retrieve(
+    query: str,
+    n_results: int = 5,
+    include_meta: bool = False,
+    mode: str = "contextual",
+    plain: bool = False,
+    namespace: Optional[str] = None,
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> RetrievalResult:
+    """retrieve_context(), returning the memory IDs used, token count and per-stage timings as well."""
+    timer = _StageTimer()
+    packing = _Packing(model, token_budget)
+    cache = retrieval_cache.get_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(
+            namespace, query, (n_results, mode, plain, include_meta, context_packer.encoding_name(model), token_budget, since, until)
+        )
+        cached = cache.get(cache_key)
+        timer.mark("cache")
+        if cached is not None:
+            print("⚡ Retrieval cache hit")
+            return _cached_result(cached, namespace, timer, "cache")
+    # Read before querying, so a write that lands mid-query invalidates this result
+    generation = retrieval_cache.generation(namespace)
+
+    where_filter = _where_filter(mode, namespace, since, until)
+
+    fast = _lexical_fast_path(query, n_results, include_meta, mode, plain, namespace, where_filter, packing)
+    timer.mark("lexical_fast_path")
+    if fast is not None:
+        if cache is not None:
+            cache.miss()
+            cache.put(cache_key, fast, generation)
+        return RetrievalResult(*fast, timings=timer.done(), source="lexical")
+
+    query_vector = embedding.get_embedding(query)
+    timer.mark("embed")
+    if not query_vector:
+        print("⚠️ Failed to generate query embedding.")
+        return RetrievalResult(timings=timer.done())
+
+    if cache is not None:
+        cached = cache.get_similar(cache_key, query_vector)
+        timer.mark("cache")
+        if cached is not None:
+            print("⚡ Retrieval cache hit (similar query)")
+            return _cached_result(cached, namespace, timer, "semantic_cache")
+        cache.miss()
+
+    found = _search(query, query_vector, n_results, include_meta, mode, plain, namespace, where_filter, packing, timer)
+    if found is None:
+        return RetrievalResult(timings=timer.done(), source="error")
+    if cache is not None:
+        cache.put(cache_key, found, generation, query_vector)
+    return RetrievalResult(*found, timings=timer.done(), source="vector")
+
+
+def retrieve_context_many(
+    queries: List[str],
+    n_results: int = 5,
+    include_meta: bool = False,
+    mode: str = "contextual",
+    plain: bool = False,
+    namespace: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> List[str]:
+    """retrieve_context() for many queries at once; one context per query ("" for failed queries)."""
+    return [
+        r.context
+        for r in retrieve_many(queries, n_results, include_meta, mode, plain, namespace, since=since, until=until)
+    ]
+
+
+def retrieve_many(
+    queries: List[str],
+    n_results: int = 5,
+    include_meta: bool = False,
+    mode: str = "contextual",
+    plain: bool = False,
+    namespace: Optional[str] = None,
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> List[RetrievalResult]:
+    """
+    retrieve() for many queries at once, one result per query, in order.
+
+    Cache hits and lexical fast-path answers are served per query; the rest
+    share one batched embedding call and one vector query with many query
+    embeddings. A failing query gets `error` set instead of failing the batch.
+    Timings of the shared stages are reported on every result that took part.
+    """
+    packing = _Packing(model, token_budget)
+    cache = retrieval_cache.get_cache()
+    where_filter = _where_filter(mode, namespace, since, until)
+    generation = retrieval_cache.generation(namespace)
+    results: List[Optional[RetrievalResult]] = [None] * len(queries)
+    timers = [_StageTimer() for _ in queries]
+    keys = [None] * len(queries)
+    pending = []
+
+    for i, query in enumerate(queries):
+        timer = timers[i]
+        if not (query or "").strip():
+            results[i] = RetrievalResult(timings=timer.done(), source="error", error="empty query")
+            continue
+        if cache is not None:
+            keys[i] = cache.key(
+                namespace, query, (n_results, mode, plain, include_meta, context_packer.encoding_name(model), token_budget, since, until)
+            )
+            cached = cache.get(keys[i])
+            timer.mark("cache")
+            if cached is not None:
+                results[i] = _cached_result(cached, namespace, timer, "cache")
+                continue
+        try:
+            fast = _lexical_fast_path(query, n_results, include_meta, mode, plain, namespace, where_filter, packing)
+        except Exception as e:
+            results[i] = RetrievalResult(timings=timer.done(), source="error", error=str(e))
+            continue
+        timer.mark("lexical_fast_path")
+        if fast is not None:
+            if cache is not None:
+                cache.miss()
+                cache.put(keys[i], fast, generation)
+            results[i] = RetrievalResult(*fast, timings=timer.done(), source="lexical")
+            continue
+        pending.append(i)
+
+    if pending:
+        _search_many(queries, pending, results, timers, keys, generation, n_results, include_meta, mode, plain,
+                     namespace, where_filter, packing)
+
+    print(f"📦 Batch retrieval: {len(queries)} queries, {len(pending)} vector-searched")
+    return results
+
+
+def _search_many(
+    queries: List[str],
+    pending: List[int],
+    results: List[Optional[RetrievalResult]],
+    timers: List[_StageTimer],
+    keys: List[Optional[tuple]],
+    generation: Tuple[int, int],
+    n_results: int,
+    include_meta: bool,
+    mode: str,
+    plain: bool,
+    namespace: Optional[str],
+    where_filter: Optional[dict],
+    packing: _Packing,
+):
+    """Embed and vector-search the `pending` queries together, filling in `results`."""
+    cache = retrieval_cache.get_cache()
+    batch = _StageTimer()
+    try:
+        vectors = embedding.get_embeddings([queries[i] for i in pending])
+    except Exception as e:
+        vectors = [[] for _ in pending]
+        print(f"⚠️ Batch query embedding failed: {e}")
+    batch.mark("embed")
+
+    searched = []
+    for i, vector in zip(pending, vectors):
+        if not vector:
+            results[i] = RetrievalResult(timings=timers[i].done(), source="error",
+                                         error="failed to generate query embedding")
+            continue
+        if cache is not None:
+            cached = cache.get_similar(keys[i], vector)
+            if cached is not None:
+                results[i] = _cached_result(cached, namespace, timers[i], "semantic_cache")
+                continue
+            cache.miss()
+        searched.append((i, vector))
+    if not searched:
+        return
+
+    compressor = memory.get_compressor()
+    compressed = [compressor.transform(vector) for _, vector in searched]
+    try:
+        store_results = _vector_query(namespace, compressed, _fetch_k(n_results, _settings()), where_filter)
+    except Exception as e:
+        print(f"⚠️ Batch retrieval failed: {e}")
+        for i, _ in searched:
+            results[i] = RetrievalResult(timings={**batch.timings, **timers[i].done()}, source="error", error=str(e))
+        return
+    batch.mark("vector_query")
+
+    for row, ((i, vector), query_vector) in enumerate(zip(searched, compressed)):
+        timer = timers[i]
+        timer.skip()
+        try:
+            found = _assemble(
+                queries[i], query_vector, _row(store_results, row), n_results, include_meta, mode, plain,
+                namespace, where_filter, packing, timer,
+            )
+        except Exception as e:
+            print(f"⚠️ Retrieval failed for query {i}: {e}")
+            results[i] = RetrievalResult(timings={**batch.timings, **timer.done()}, source="error", error=str(e))
+            continue
+        if cache is not None:
+            cache.put(keys[i], found, generation, vector)
+        results[i] = RetrievalResult(*found, timings={**batch.timings, **timer.done()}, source="vector")
+
+
+def _cached_result(cached: Tuple[str, List[str], int], namespace: Optional[str], timer: _StageTimer,
+                   source: str) -> RetrievalResult:
+    context, ids, tokens = cached
+    access_tracker.record(namespace, ids)
+    return RetrievalResult(context, ids, tokens, timer.done(), source)
+
+
+def _where_filter(mode: str, namespace: Optional[str], since: Optional[float] = None,
+                  until: Optional[float] = None) -> Optional[dict]:
+    """Build safe Chroma filter."""
     if mode == "contextual":
         where_filter = {"intent": {"$eq": "fact"}}
     else:
         where_filter = None  # global search
+    return memory.combine_where(
+        where_filter, memory.namespace_filter(namespace), memory.time_filter(since, until)
+    )
 
-    query_vector = embedding.get_embedding(query)
-    if not query_vector:
-        print("⚠️ Failed to generate query embedding.")
-        return ""
+
+def _settings() -> dict:
+    return resources.config()["retrieval"]
+
+
+def _lexical_settings() -> dict:
+    return resources.config().get("lexical", {})
+
+
+def _fetch(namespace: Optional[str], ids: List[str], where_filter: Optional[dict], include: List[str]) -> dict:
+    """store.get() for `ids`, returned in the order of `ids` (missing/filtered ids dropped)."""
+    data = memory.get_store(namespace).get(ids=ids, where=where_filter, include=include)
+    position = {id_: i for i, id_ in enumerate(data.get("ids") or [])}
+    order = [position[id_] for id_ in ids if id_ in position]
+    return {
+        key: [values[i] for i in order] if values is not None else None
+        for key, values in data.items()
+        if key in ("ids", "documents", "metadatas", "embeddings")
+    }
+
+
+def _lexical_fast_path(
+    query: str,
+    n_results: int,
+    include_meta: bool,
+    mode: str,
+    plain: bool,
+    namespace: Optional[str],
+    where_filter: Optional[dict],
+    packing: _Packing,
+) -> Optional[Tuple[str, List[str], int]]:
+    """
+    Answer from the BM25 index alone when the best lexical hit is unambiguous
+    (see lexical_index.is_confident). Returns None to fall back to vector search.
+    """
+    settings = _lexical_settings()
+    if not settings.get("fast_path", True):
+        return None
+
+    try:
+        ids, scores, coverage = lexical_index.search(namespace, query, n_results + 1)
+    except Exception as e:
+        print(f"⚠️ Lexical search failed: {e}")
+        return None
+    if not lexical_index.is_confident(scores, coverage, settings):
+        return None
+
+    data = _fetch(namespace, ids[:n_results], where_filter, ["documents", "metadatas"])
+    if not data["ids"] or data["ids"][0] != ids[0]:
+        return None  # best hit excluded by the filter: let vector search decide
+
+    relevant = list(zip(data["documents"], [None] * len(data["ids"]), data["metadatas"], data["ids"]))
+    print(f"⚡ Lexical fast path (bm25={scores[0]:.2f}) — skipped query embedding")
+    relevant = _rerank_with_pronouns(query, relevant)
+    found = _format_context(
+        [r[:3] for r in relevant], [r[3] for r in relevant], include_meta, plain, mode, None, packing
+    )
+    access_tracker.record(namespace, found[1])
+    return found
+
+
+def _lexical_hits(
+    query: str,
+    query_vector: list,
+    n_results: int,
+    namespace: Optional[str],
+    where_filter: Optional[dict],
+) -> Tuple[List[str], Dict[str, Tuple[str, float, Dict, np.ndarray]]]:
+    """
+    BM25 hits above `lexical.hybrid_min_score`, best first, with their
+    documents, true vector distance to the query, metadata and embedding.
+    """
+    settings = _lexical_settings()
+    if not lexical_index.enabled():
+        return [], {}
+    try:
+        ids, scores, _ = lexical_index.search(namespace, query, n_results)
+    except Exception as e:
+        print(f"⚠️ Lexical search failed: {e}")
+        return [], {}
+    ids = [id_ for id_, score in zip(ids, scores.tolist()) if score >= settings.get("hybrid_min_score", 2.0)]
+    if not ids:
+        return [], {}
+
+    data = _fetch(namespace, ids, where_filter, ["documents", "metadatas", "embeddings"])
+    if not data["ids"]:
+        return [], {}
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    query_array = np.asarray(query_vector, dtype=np.float32)
+    # Squared L2, matching the vector store's distances
+    distances = np.sum((vectors - query_array) ** 2, axis=1).tolist()
+    hits = {
+        id_: (doc, dist, meta, vector)
+        for id_, doc, dist, meta, vector in zip(data["ids"], data["documents"], distances, data["metadatas"], vectors)
+    }
+    return data["ids"], hits
+
+
+def _fetch_k(n_results: int, settings: dict) -> int:
+    return max(n_results, min(n_results * settings.get("overfetch_factor", 1), settings.get("max_candidates", 200)))
+
+
+def _vector_query(namespace: Optional[str], query_vectors: List[list], fetch_k: int,
+                  where_filter: Optional[dict]) -> dict:
+    """One store query for all `query_vectors` (already compressed)."""
+    query_kwargs = dict(
+        query_embeddings=query_vectors,
+        n_results=fetch_k,
+        include=["documents", "distances", "metadatas", "embeddings"],
+    )
+    if where_filter:
+        query_kwargs["where"] = where_filter
+    return memory.get_store(namespace).query(**query_kwargs)
+
+
+def _row(results: Optional[dict], i: int) -> Dict[str, list]:
+    """Results of the i-th query embedding of a store query."""
+    def column(key):
+        values = results.get(key) if results else None
+        return values[i] if values is not None and len(values) > i else []
+
+    row = {key: column(key) for key in ("ids", "documents", "distances", "metadatas", "embeddings")}
+    if len(row["embeddings"]) != len(row["ids"]):
+        row["embeddings"] = [None] * len(row["ids"])
+    return row
+
+
+def _search(
+    query: str,
+    query_vector: list,
+    n_results: int,
+    include_meta: bool,
+    mode: str,
+    plain: bool,
+    namespace: Optional[str],
+    where_filter: Optional[dict],
+    packing: _Packing,
+    timer: _StageTimer,
+) -> Optional[Tuple[str, List[str], int]]:
+    """
+    Over-fetch candidates (vector + lexical), select n_results of them and
+    format the context.
+    Returns (context, ids of the memories used, context tokens), or None on
+    errors so they are not cached.
+    """
+    query_vector = memory.get_compressor().transform(query_vector)
 
     # --------------------------------------------------
     # Perform Chroma query
     # --------------------------------------------------
     try:
-        query_kwargs = dict(
-            query_embeddings=[query_vector],
-            n_results=n_results,
-            include=["documents", "distances", "metadatas"],
-        )
-        if where_filter:
-            query_kwargs["where"] = where_filter
-
-        results = memory.collection.query(**query_kwargs)
+        results = _vector_query(namespace, [query_vector], _fetch_k(n_results, _settings()), where_filter)
     except Exception as e:
         print(f"⚠️ Retrieval failed: {e}")
-        return ""
+        return None
+    timer.mark("vector_query")
+
+    return _assemble(
+        query, query_vector, _row(results, 0), n_results, include_meta, mode, plain, namespace, where_filter,
+        packing, timer,
+    )
 
-    if not results or not results.get("documents") or not results["documents"][0]:
+
+def _assemble(
+    query: str,
+    query_vector: list,
+    row: Dict[str, list],
+    n_results: int,
+    include_meta: bool,
+    mode: str,
+    plain: bool,
+    namespace: Optional[str],
+    where_filter: Optional[dict],
+    packing: _Packing,
+    timer: _StageTimer,
+) -> Tuple[str, List[str], int]:
+    """Threshold, fuse, select and format one query's vector results (`row`)."""
+    settings = _settings()
+    lexical_ids, lexical = _lexical_hits(query, query_vector, _fetch_k(n_results, settings), namespace, where_filter)
+    timer.mark("lexical")
+
+    if not row["documents"] and not lexical_ids:
         print("⚠️ No matching memory found.")
-        return ""
+        return "", [], 0
 
-    docs = results["documents"][0]
-    distances = results["distances"][0]
-    metadatas = results["metadatas"][0]
+    ids, docs, distances, metadatas = row["ids"], row["documents"], row["distances"], row["metadatas"]
+    embeddings = row["embeddings"]
 
     # --------------------------------------------------
     # Distance filtering (adaptive)
     # --------------------------------------------------
-    threshold = BASE_DISTANCE
-    relevant = [
-        (doc, dist, meta)
-        for doc, dist, meta in zip(docs, distances, metadatas)
-        if dist <= threshold
-    ]
+    threshold = settings["max_distance"]
+    distance_array = np.asarray(distances, dtype=np.float64)
+    keep = distance_array <= threshold
 
-    if not relevant and distances:
-        avg_dist = np.mean(distances)
+    if not keep.any() and distance_array.size and not lexical_ids:
+        # Relax against the top n_results, as if only those had been fetched
+        avg_dist = np.mean(distance_array[:n_results])
         new_threshold = min(avg_dist + 0.25, 1.2)
         print(
             f"⚙️ Relaxing threshold {threshold:.2f} → {new_threshold:.2f} "
             f"(avg_dist={avg_dist:.3f})"
         )
-        relevant = [
-            (doc, dist, meta)
-            for doc, dist, meta in zip(docs, distances, metadatas)
-            if dist <= new_threshold
-        ]
         threshold = new_threshold
+        keep = distance_array <= threshold
 
-    if not relevant:
-        print(f"⚠️ No relevant items under distance threshold ({threshold:.2f}).")
-        return ""
+    candidates = {
+        id_: (doc, dist, meta, vector)
+        for id_, doc, dist, meta, vector, kept in zip(ids, docs, distances, metadatas, embeddings, keep)
+        if kept
+    }
+    vector_ids = list(candidates)
 
     # --------------------------------------------------
-    # Re-ranking
+    # Hybrid fusion (lexical hits pass on exact-token match, not distance)
     # --------------------------------------------------
-    relevant = _rerank_with_pronouns(query, relevant)
+    order = vector_ids
+    if lexical_ids:
+        for id_ in lexical_ids:
+            candidates.setdefault(id_, lexical[id_])
+        order = lexical_index.reciprocal_rank_fusion(
+            [vector_ids, lexical_ids], k=_lexical_settings().get("rrf_k", 60)
+        )
+
+    if not order:
+        print(f"⚠️ No relevant items under distance threshold ({threshold:.2f}).")
+        return "", [], 0
+    timer.mark("threshold")
+
+    selected = _select(query, order, candidates, n_results, threshold, settings, timer)
+
+    relevant = [candidates[id_][:3] for id_ in selected]
+    context, used, tokens = _format_context(relevant, selected, include_meta, plain, mode, threshold, packing)
+    timer.mark("format")
+
+    # Counted in memory; the maintenance worker flushes them to metadata in batches
+    access_tracker.record(namespace, used)
+    return context, used, tokens
+
+
+def _select(
+    query: str,
+    order: List[str],
+    candidates: Dict[str, Tuple[str, float, Dict, np.ndarray]],
+    n_results: int,
+    threshold: float,
+    settings: dict,
+    timer: _StageTimer,
+) -> List[str]:
+    """
+    Rerank + MMR over the candidate set: relevance 1/(1+d) in fused order, times
+    the pronoun boosts, blended with recency, then picked by MMR.
+    """
+    distances = np.array([candidates[id_][1] for id_ in order], dtype=np.float64)
+    ranked = np.sort(1.0 / (1.0 + distances[np.isfinite(distances)]))[::-1]
+    # Lexical-only tail beyond the vector candidates counts as just relevant enough
+    floor = 1.0 / (1.0 + threshold)
+    relevance = np.array([ranked[r] if r < ranked.size else floor for r in range(len(order))])
+
+    if rerank_features.has_pronoun(query):
+        flags, signatures = rerank_features.feature_arrays(
+            [candidates[id_][0] for id_ in order], [candidates[id_][2] for id_ in order]
+        )
+        relevance *= rerank_features.boosts(query, flags, signatures)
+
+    recency_weight = settings.get("recency_weight", 0.0)
+    if recency_weight > 0:
+        # None (undated) becomes NaN
+        written = np.array([memory.timestamp_epoch(candidates[id_][2]) for id_ in order], dtype=np.float64)
+        age_days = np.maximum(time.time() - written, 0.0) / 86400.0
+        # Undated memories get no recency credit
+        recency = np.nan_to_num(np.exp2(-age_days / settings.get("recency_half_life_days", 30.0)), nan=0.0)
+        relevance = (1.0 - recency_weight) * relevance + recency_weight * recency
+    timer.mark("rerank")
+
+    diversity = settings.get("mmr_diversity", 0.0)
+    vectors = [candidates[id_][3] for id_ in order]
+    if diversity > 0 and all(v is not None for v in vectors):
+        picked = similarity.mmr_select(relevance, np.asarray(vectors, dtype=np.float32), n_results, diversity)
+    else:
+        picked = np.argsort(-relevance, kind="stable")[:n_results].tolist()
+    timer.mark("mmr")
+    return [order[i] for i in picked]
+
+
+def _format_context(
+    relevant: List[Tuple[str, Optional[float], Dict]],
+    ids: List[str],
+    include_meta: bool,
+    plain: bool,
+    mode: str,
+    threshold: Optional[float],
+    packing: _Packing,
+) -> Tuple[str, List[str], int]:
+    """
+    Pack the selected memories (best first) into the token budget.
+    Returns (context, ids of the memories that made it in, context tokens).
+    """
+    budget = packing.token_budget
+    if budget is None and not context_packer.enabled():
+        budget = float("inf")
 
     # --------------------------------------------------
     # Plain factual mode (TOP-1, authoritative)
     # --------------------------------------------------
     if plain:
-        top_doc, _, _ = relevant[0]
-        print("✅ Retrieved 1 authoritative fact (plain mode)")
-        return top_doc.strip()
+        top_doc, _, top_meta = relevant[0]
+        top_doc = top_doc.strip()
+        blocks, _, tokens = context_packer.pack(
+            [("", top_doc, context_packer.document_tokens(top_doc, top_meta, packing.model))],
+            budget, packing.model,
+        )
+        if not blocks:
+            print("⚠️ Top fact doesn't fit the context token budget.")
+            return "", [], 0
+        print(f"✅ Retrieved 1 authoritative fact (plain mode, {tokens} tokens)")
+        return blocks[0], ids[:1], tokens
 
     # --------------------------------------------------
     # Decorated / multi-context mode
     # --------------------------------------------------
     if include_meta:
-        context_lines = [
+        headers = [
             (
                 f"[Meta — tag: {meta.get('tag', 'NONE')} | "
                 f"date: {meta.get('timestamp', 'unknown')}]\n"
                 f"User said: {meta.get('user_prompt', 'N/A')}\n"
-                f"Stored output: {doc}\n"
+                f"Stored output: "
             )
-            for doc, _, meta in relevant
+            for _, _, meta in relevant
         ]
     else:
-        context_lines = [
+        headers = [
             (
                 f"[Memory — tag: {meta.get('tag', 'NONE')} | "
-                f"distance: {dist:.3f}]\n{doc}\n"
+                f"{'exact match' if dist is None else f'distance: {dist:.3f}'}]\n"
             )
-            for doc, dist, meta in relevant
+            for _, dist, meta in relevant
         ]
 
-    print(
-        f"✅ Retrieved {len(relevant)} relevant memories "
-        f"(mode={mode}, distance ≤ {threshold:.2f})"
+    blocks, kept, tokens = context_packer.pack(
+        [
+            (header, doc, context_packer.document_tokens(doc, meta, packing.model))
+            for header, (doc, _, meta) in zip(headers, relevant)
+        ],
+        budget, packing.model,
     )
 
-    return "\n---\n".join(context_lines)
+    if threshold is None:
+        print(f"✅ Retrieved {len(blocks)} relevant memories (mode={mode}, lexical, {tokens} tokens)")
+    else:
+        print(
+            f"✅ Retrieved {len(blocks)} relevant memories "
+            f"(mode={mode}, distance ≤ {threshold:.2f}, {tokens} tokens)"
+        )
+
+    return "\n---\n".join(block + "\n" for block in blocks), [ids[i] for i in kept], tokens
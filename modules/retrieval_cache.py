@@ -0,0 +1,219 @@
+"""
+retrieval_cache.py
+Cache of retrieve_context() results.
+
+- exact tier: keyed by (namespace, normalized query, n_results, mode, plain,
+  include_meta, tokenizer, token budget); a hit skips both the query embedding and the vector query
+- semantic tier (optional): a new query whose embedding is within
+  `semantic_similarity` of a cached query reuses its result, skipping the
+  vector query
+- every entry remembers the write generation of its namespace; memory writes
+  bump the generation, so stale entries are never served
+- writes in other processes (the API server, `compaction --once`, a snapshot
+  import) are seen through a shared file, `shared_generation_path`: every
+  bump appends a byte to it, and a size this process didn't produce
+  invalidates every namespace here
+- bounded size (LRU), TTL and hit/miss stats
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from modules import resources
+from modules.embedding_cache import LRUCache, normalize_text
+
+DEFAULT_NAMESPACE = "default"
+
+_lock = threading.Lock()
+_generations = {}
+# Bumped for store-wide changes (eviction, snapshot import) that touch every namespace
+_global_generation = 0
+# Size of the shared generation file when this process last looked (None: not yet)
+_shared_size = None
+# The shared file is emptied once it reaches this size; other processes just see one more change
+SHARED_FILE_LIMIT = 1 << 20
+
+
+def _shared_path() -> Optional[str]:
+    path = resources.config().get("retrieval_cache", {}).get("shared_generation_path")
+    return os.path.abspath(path) if path else None
+
+
+def _sync_shared(path: str):
+    """Invalidate everything if another process bumped since we last looked (caller holds _lock)."""
+    global _global_generation, _shared_size
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if _shared_size is not None and size != _shared_size:
+        _global_generation += 1
+    _shared_size = size
+
+
+def _publish(path: str):
+    """Tell other processes about a local bump (caller holds _lock)."""
+    global _global_generation, _shared_size
+    _sync_shared(path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(b".")
+            size = f.tell()
+        if size >= SHARED_FILE_LIMIT:
+            os.truncate(path, 0)
+    except OSError as e:
+        print(f"⚠️ Could not publish retrieval cache generation to {path}: {e}")
+        return
+    if size != _shared_size + 1:
+        # Another process appended between our check and our write
+        _global_generation += 1
+    _shared_size = 0 if size >= SHARED_FILE_LIMIT else size
+
+
+def bump(namespace: Optional[str] = None):
+    """Invalidate cached results for `namespace` here and everything in other processes (called after memory writes)."""
+    namespace = namespace or DEFAULT_NAMESPACE
+    path = _shared_path()
+    with _lock:
+        _generations[namespace] = _generations.get(namespace, 0) + 1
+        if path:
+            _publish(path)
+
+
+def bump_all():
+    """Invalidate every cached result, in every process."""
+    global _global_generation
+    path = _shared_path()
+    with _lock:
+        _global_generation += 1
+        if path:
+            _publish(path)
+
+
+def generation(namespace: Optional[str] = None) -> Tuple[int, int]:
+    path = _shared_path()
+    with _lock:
+        if path:
+            _sync_shared(path)
+        return _global_generation, _generations.get(namespace or DEFAULT_NAMESPACE, 0)
+
+
+class RetrievalCache:
+    """Exact + semantic result cache with generation and TTL checks."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, semantic: bool = False,
+                 semantic_similarity: float = 0.98, semantic_entries: int = 256):
+        self.ttl = ttl_seconds
+        self.semantic = semantic
+        self.semantic_similarity = semantic_similarity
+        self.semantic_entries = semantic_entries
+        self._exact = LRUCache(max_entries)
+        self._vectors = {}  # (namespace, params) -> LRUCache of exact key -> unit query vector
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "stale": 0}
+
+    @staticmethod
+    def key(namespace: Optional[str], query: str, params: tuple) -> tuple:
+        return (namespace or DEFAULT_NAMESPACE, normalize_text(query), params)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _fresh(self, key: tuple, entry) -> bool:
+        value, gen, created = entry
+        if gen == generation(key[0]) and time.time() - created <= self.ttl:
+            return True
+        self._exact.pop(key)
+        self._count("stale")
+        return False
+
+    def get(self, key: tuple):
+        """Cached (context, ids, tokens) for an exact key, or None."""
+        entry = self._exact.get(key)
+        if entry is not None and self._fresh(key, entry):
+            self._count("hits")
+            return entry[0]
+        return None
+
+    def get_similar(self, key: tuple, query_vector: list):
+        """Cached (context, ids, tokens) of a near-identical earlier query, or None."""
+        if not self.semantic:
+            return None
+        vectors = self._vectors.get((key[0], key[2]))
+        if vectors is None:
+            return None
+        candidates = vectors.items()
+        if not candidates:
+            return None
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        matrix = np.stack([v for _, v in candidates])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.semantic_similarity:
+            return None
+
+        similar_key = candidates[best][0]
+        entry = self._exact.get(similar_key)
+        if entry is None or not self._fresh(similar_key, entry):
+            vectors.pop(similar_key)
+            return None
+        self._count("semantic_hits")
+        return entry[0]
+
+    def put(self, key: tuple, value, gen: Tuple[int, int], query_vector: Optional[list] = None):
+        self._exact.put(key, (value, gen, time.time()))
+        if self.semantic and query_vector is not None:
+            vector = np.asarray(query_vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            with self._lock:
+                group = self._vectors.setdefault((key[0], key[2]), LRUCache(self.semantic_entries))
+            group.put(key, vector)
+
+    def miss(self):
+        self._count("misses")
+
+    def clear(self):
+        self._exact.clear()
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+        lookups = result["hits"] + result["semantic_hits"] + result["misses"]
+        result["entries"] = len(self._exact)
+        result["hit_rate"] = (result["hits"] + result["semantic_hits"]) / lookups if lookups else 0.0
+        return result
+
+
+def from_config(settings: dict) -> Optional[RetrievalCache]:
+    if not settings.get("enabled", True):
+        return None
+    return RetrievalCache(
+        max_entries=settings.get("max_entries", 1024),
+        ttl_seconds=settings.get("ttl_seconds", 300),
+        semantic=settings.get("semantic_enabled", False),
+        semantic_similarity=settings.get("semantic_similarity", 0.98),
+        semantic_entries=settings.get("semantic_entries", 256),
+    )
+
+
+resources.register("retrieval_cache", lambda: from_config(resources.config().get("retrieval_cache", {})))
+
+
+def get_cache() -> Optional[RetrievalCache]:
+    """Shared retrieval cache, or None when disabled."""
+    return resources.get("retrieval_cache")
+
+
+def stats() -> dict:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,154 @@
+"""
+similarity.py
+Vectorized cosine similarity and top-k search over float32 matrices.
+
+All functions expect row-normalized inputs (see normalize_rows), so cosine
+similarity is a single matrix product. Large matrices can be scored in
+chunks through a reusable output buffer to bound peak memory.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def as_matrix(vectors) -> np.ndarray:
+    """Return `vectors` as a C-contiguous 2-D float32 array (1-D input becomes one row)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return np.ascontiguousarray(matrix)
+
+
+def normalize_rows(vectors, copy: bool = True) -> np.ndarray:
+    """Scale every row to unit length; all-zero rows stay zero."""
+    matrix = as_matrix(vectors)
+    if copy and isinstance(vectors, np.ndarray) and np.may_share_memory(matrix, vectors):
+        matrix = matrix.copy()
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def cosine_scores(queries, matrix: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Similarity of every query against every row of `matrix` in one matmul.
+    Returns an array of shape (n_queries, n_rows), written into `out` if given.
+    """
+    queries = as_matrix(queries)
+    if out is not None:
+        return np.matmul(queries, matrix.T, out=out[:queries.shape[0], :matrix.shape[0]])
+    return queries @ matrix.T
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and values of the k largest scores per row, sorted descending."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def top_k(
+    queries,
+    matrix: np.ndarray,
+    k: int = 5,
+    chunk_size: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k rows of `matrix` for each query by cosine similarity.
+
+    With `chunk_size`, the matrix is scored `chunk_size` rows at a time and
+    only each chunk's top-k candidates are kept, so peak memory is
+    n_queries x chunk_size instead of n_queries x n_rows. `out` may be a
+    preallocated float32 buffer of at least that shape, reused across calls.
+
+    Returns (indices, scores), each of shape (n_queries, min(k, n_rows)).
+    """
+    queries = as_matrix(queries)
+    n_rows = matrix.shape[0]
+
+    if not chunk_size or chunk_size >= n_rows:
+        return top_k_rows(cosine_scores(queries, matrix, out=out), k)
+
+    if out is None:
+        out = np.empty((queries.shape[0], chunk_size), dtype=np.float32)
+
+    best_idx, best_scores = [], []
+    for start in range(0, n_rows, chunk_size):
+        chunk = matrix[start:start + chunk_size]
+        scores = cosine_scores(queries, chunk, out=out)
+        idx, vals = top_k_rows(scores, k)
+        best_idx.append(idx + start)
+        best_scores.append(vals)
+
+    merged_idx = np.concatenate(best_idx, axis=1)
+    merged_scores = np.concatenate(best_scores, axis=1)
+    pos, scores = top_k_rows(merged_scores, k)
+    return np.take_along_axis(merged_idx, pos, axis=1), scores
+
+
+def mmr_select(relevance, vectors, k: int, diversity_weight: float = 0.3) -> List[int]:
+    """
+    Maximal Marginal Relevance: pick k candidates, each maximizing
+    (1 - w) * relevance - w * (max cosine similarity to those already picked).
+    w = 0 keeps the relevance order. Returns candidate indices in pick order.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n = relevance.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+    if diversity_weight <= 0:
+        return np.argsort(-relevance, kind="stable")[:k].tolist()
+
+    unit = normalize_rows(vectors)
+    pairwise = unit @ unit.T
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    picked = []
+    for _ in range(k):
+        scores = (1.0 - diversity_weight) * relevance - diversity_weight * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return picked
+
+
+class SimilarityIndex:
+    """
+    Normalized float32 matrix with a reusable scoring buffer.
+    Build once, then call search() for one or many queries.
+    """
+
+    def __init__(self, vectors, chunk_size: Optional[int] = 65536):
+        self.matrix = normalize_rows(vectors)
+        self.chunk_size = chunk_size
+        self._buffer = None
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _buffer_for(self, n_queries: int) -> np.ndarray:
+        width = min(self.chunk_size or len(self), len(self))
+        if self._buffer is None or self._buffer.shape[0] < n_queries or self._buffer.shape[1] < width:
+            self._buffer = np.empty((n_queries, width), dtype=np.float32)
+        return self._buffer
+
+    def search(self, queries, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        if len(self) == 0:
+            return top_k_rows(np.empty((queries.shape[0], 0), dtype=np.float32), k)
+        return top_k(queries, self.matrix, k, chunk_size=self.chunk_size, out=self._buffer_for(queries.shape[0]))
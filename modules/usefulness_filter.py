@@ -1,20 +1,15 @@
 """
 usefulness_filter.py
 Determines whether a user prompt should be stored in long-term memory.
-Fully configurable — thresholds and blacklist loaded dynamically.
+Fully configurable — thresholds and blacklist are read from the live
+config, so edits to config.json apply without a restart.
 """
 
 import re
-from openai import OpenAI
-from modules import config_manager
+from modules import keyword_rules, llm_cache, resources
 
-client = OpenAI()
-
-# Load configuration dynamically
-config = config_manager.load_config()
-MIN_WORD_COUNT = config["usefulness_filter"]["min_word_count"]
-MIN_CHAR_COUNT = config["usefulness_filter"]["min_char_count"]
-BLACKLIST_PHRASES = config["usefulness_filter"]["blacklist_phrases"]
+_FILLER = re.compile(r"(yes|no|ok|okay|sure|maybe|hmm|thanks|thank you|cool)")
+_FACT_VERBS = re.compile(r"\b(is|am|are|was|were|have|has|called|named|lives|works|likes|owns|contains)\b")
 
 
 def is_useful(prompt: str) -> bool:
@@ -22,42 +17,56 @@ def is_useful(prompt: str) -> bool:
     Returns True if the user input contains meaningful factual information.
     Uses both heuristic and optional LLM-based checks.
     """
+    decision = heuristic_usefulness(prompt)
+    if decision is not None:
+        return decision
+
+    # 🧠 Optional fallback: use LLM for semantic judgment
+    try:
+        return _llm_useful(prompt)
+    except Exception:
+        return False
+
+
+@llm_cache.memoize("is_useful", model="gpt-4o-mini")
+def _llm_useful(prompt: str) -> bool:
+    response = resources.openai_client().responses.create(
+        model="gpt-4o-mini",
+        input=(
+            "Determine if the following text contains storable factual information. "
+            "Reply 'true' if it conveys personal facts, relationships, or properties. "
+            "Reply 'false' if it's trivial, meta, or uninformative.\n\n"
+            f"Text: {prompt}"
+        ),
+    )
+    return response.output_text.strip().lower().startswith("true")
+
+
+def heuristic_usefulness(prompt: str):
+    """
+    The rule-based part of is_useful(): True/False when the rules decide,
+    None when only the LLM can tell.
+    """
+    settings = resources.config()["usefulness_filter"]
 
-    if not prompt or len(prompt.strip()) < MIN_CHAR_COUNT:
+    if not prompt or len(prompt.strip()) < settings["min_char_count"]:
         return False
 
     prompt_lower = prompt.lower().strip()
 
     # 🚫 Skip trivial or blacklisted phrases
-    if any(phrase in prompt_lower for phrase in BLACKLIST_PHRASES):
+    if keyword_rules.contains_any(prompt_lower, settings["blacklist_phrases"]):
         return False
 
     # 🚫 Skip short or filler responses
-    if len(prompt.split()) < MIN_WORD_COUNT:
+    if len(prompt.split()) < settings["min_word_count"]:
         return False
 
-    if re.fullmatch(r"(yes|no|ok|okay|sure|maybe|hmm|thanks|thank you|cool)", prompt_lower):
+    if _FILLER.fullmatch(prompt_lower):
         return False
 
     # ✅ Allow descriptive / factual statements
-    if re.search(
-        r"\b(is|am|are|was|were|have|has|called|named|lives|works|likes|owns|contains)\b",
-        prompt_lower,
-    ):
+    if _FACT_VERBS.search(prompt_lower):
         return True
 
-    # 🧠 Optional fallback: use LLM for semantic judgment
-    try:
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=(
-                "Determine if the following text contains storable factual information. "
-                "Reply 'true' if it conveys personal facts, relationships, or properties. "
-                "Reply 'false' if it's trivial, meta, or uninformative.\n\n"
-                f"Text: {prompt}"
-            ),
-        )
-        decision = response.output_text.strip().lower()
-        return decision.startswith("true")
-    except Exception:
-        return False
+    return None
@@ -0,0 +1,94 @@
+"""
+vector_compression.py
+Shrinks embedding vectors before they are stored or searched.
+
+Supports:
+- Matryoshka-style truncation to the first N dimensions, re-normalized
+  (valid for text-embedding-3-* and other MRL-trained models)
+- float16 or int8 scalar quantization for client-side indexes
+
+The same compressor must be applied to stored vectors and query vectors.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+
+class VectorCompressor:
+    """Truncate + re-normalize vectors, and optionally quantize matrices."""
+
+    def __init__(self, dimensions: Optional[int] = None, quantization: str = "none"):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        self.dimensions = dimensions or None
+        self.quantization = quantization
+
+    @property
+    def enabled(self) -> bool:
+        return self.dimensions is not None or self.quantization != "none"
+
+    def output_dimension(self, input_dimension: int) -> int:
+        if self.dimensions is None:
+            return input_dimension
+        return min(self.dimensions, input_dimension)
+
+    def transform_many(self, vectors) -> np.ndarray:
+        """Truncate and re-normalize a batch; returns a float32 matrix."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if self.dimensions is not None and matrix.shape[1] > self.dimensions:
+            matrix = matrix[:, :self.dimensions]
+        matrix = np.array(matrix, dtype=np.float32, copy=True)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def transform(self, vector: list) -> list:
+        """Transform one vector for storage in / querying of the vector store."""
+        if not vector or self.dimensions is None:
+            return vector
+        return self.transform_many(vector)[0].tolist()
+
+    def quantize(self, matrix: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Encode a float32 matrix for compact client-side storage.
+        Returns (codes, scales); scales is None except for int8 (one per row).
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.quantization == "float16":
+            return matrix.astype(np.float16), None
+        if self.quantization == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return matrix, None
+
+    def dequantize(self, codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+        """Inverse of quantize(), back to float32."""
+        if scales is not None:
+            return codes.astype(np.float32) * scales[:, None]
+        return codes.astype(np.float32)
+
+    def bytes_per_vector(self, input_dimension: int) -> int:
+        dim = self.output_dimension(input_dimension)
+        if self.quantization == "float16":
+            return dim * 2
+        if self.quantization == "int8":
+            return dim + 4
+        return dim * 4
+
+    def __repr__(self):
+        return f"VectorCompressor(dimensions={self.dimensions}, quantization='{self.quantization}')"
+
+
+def from_config(cfg: dict) -> VectorCompressor:
+    """Build a compressor from the `vector_compression` config section."""
+    return VectorCompressor(
+        dimensions=cfg.get("dimensions"),
+        quantization=cfg.get("quantization", "none"),
+    )
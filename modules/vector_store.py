@@ -0,0 +1,720 @@
+"""
+vector_store.py
+Storage backends for CAM memories behind one collection-style interface.
+
+Backends (config: vector_store.backend):
+- chroma_http:       Chroma server over HTTP (default, shared between processes)
+- chroma_persistent: Chroma PersistentClient running in-process (no IPC)
+- numpy:             flat index over a memory-mapped vector matrix with a
+                     JSONL metadata sidecar; exact search, no server at all
+
+Every backend returns results in Chroma's dict layout, so callers can swap
+backends without changing how they read `ids`/`documents`/`metadatas`/
+`distances`/`embeddings`. Distances are squared L2, like Chroma's default.
+"""
+
+import json
+import operator
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from modules import similarity
+
+DEFAULT_INCLUDE_GET = ("documents", "metadatas")
+DEFAULT_INCLUDE_QUERY = ("documents", "metadatas", "distances")
+
+
+class VectorStore:
+    """One named collection of (id, document, metadata, embedding) records."""
+
+    backend = "base"
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: List[list]):
+        raise NotImplementedError
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: List[list]):
+        self.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def update(self, ids: List[str], metadatas: Optional[List[dict]] = None, documents: Optional[List[str]] = None,
+               embeddings: Optional[List[list]] = None):
+        raise NotImplementedError
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[dict] = None):
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include=DEFAULT_INCLUDE_GET) -> dict:
+        raise NotImplementedError
+
+    def query(self, query_embeddings: List[list], n_results: int = 10, where: Optional[dict] = None,
+              include=DEFAULT_INCLUDE_QUERY) -> dict:
+        raise NotImplementedError
+
+    def peek(self, limit: int = 10) -> dict:
+        return self.get(limit=limit, include=["documents", "metadatas", "embeddings"])
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def compact(self):
+        """Rebuild the index after bulk deletes (no-op where the backend manages this itself)."""
+
+
+class ChromaStore(VectorStore):
+    """Adapter over a Chroma collection (HTTP or in-process client)."""
+
+    def __init__(self, collection, backend: str):
+        super().__init__(collection.name)
+        self.collection = collection
+        self.backend = backend
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def add(self, ids, documents, metadatas, embeddings):
+        self.collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def update(self, ids, metadatas=None, documents=None, embeddings=None):
+        self.collection.update(ids=ids, metadatas=metadatas, documents=documents, embeddings=embeddings)
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=DEFAULT_INCLUDE_GET):
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+
+    def query(self, query_embeddings, n_results=10, where=None, include=DEFAULT_INCLUDE_QUERY):
+        kwargs = dict(query_embeddings=query_embeddings, n_results=n_results, include=list(include))
+        if where:
+            kwargs["where"] = where
+        return self.collection.query(**kwargs)
+
+    def peek(self, limit=10):
+        return self.collection.peek(limit)
+
+    def count(self):
+        return self.collection.count()
+
+
+# --- Metadata filters (Chroma `where` syntax) for the NumPy backend ---
+
+_COMPARATORS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    "$in": lambda value, options: value in options,
+    "$nin": lambda value, options: value not in options,
+}
+
+
+def _compare(column: list, op: str, target) -> np.ndarray:
+    compare = _COMPARATORS[op]
+
+    def test(value):
+        if value is None and op not in ("$ne", "$nin"):
+            return False
+        try:
+            return bool(compare(value, target))
+        except TypeError:
+            return False
+
+    return np.fromiter((test(v) for v in column), dtype=bool, count=len(column))
+
+
+class NumpyFlatStore(VectorStore):
+    """
+    Exact-search store kept in a directory:
+
+    - header.json:   dimension, storage dtype and row capacity
+    - vectors.bin:   (capacity, dim) matrix, memory-mapped (float32/float16/int8)
+    - scales.bin:    per-row float32 scales (int8 storage only)
+    - records.jsonl: append-only log of row writes, metadata updates and deletes
+    - .lock:         flock target for every process that opens the store
+
+    Rows are overwritten in place on upsert; deletes leave tombstones until
+    compact() rewrites the files. update() logs only the metadata keys it
+    changes, so the access tracker's flushes stay small.
+
+    Several processes may open the same store (the proxy, the compaction
+    CLI, a snapshot import). Reads hold a shared flock and writes an
+    exclusive one. Each call first replays the log entries other processes
+    appended since this one last looked, and reloads from scratch when the
+    log was replaced by a compaction. Without fcntl (Windows) only the
+    thread lock applies.
+    """
+
+    backend = "numpy"
+    SCAN_CHUNK = 65536
+
+    def __init__(self, path: str, name: str, quantization: str = "none"):
+        super().__init__(name)
+        self.path = os.path.join(path, name)
+        self.quantization = quantization
+        self.dtype = {"none": np.float32, "float16": np.float16, "int8": np.int8}[quantization]
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._log = None
+        self._compact_lock = threading.Lock()
+        self._dirty = None
+        self._reset_state()
+        os.makedirs(self.path, exist_ok=True)
+        with self._locked():
+            pass
+
+    def _reset_state(self):
+        self._dim = None
+        self._capacity = 0
+        self._vectors = None
+        self._scales = None
+        self._norms_sq = np.zeros(0, dtype=np.float32)
+        self._ids: List[Optional[str]] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[dict]] = []
+        self._row_of: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._columns = {}
+        # records.jsonl stays open so its inode cannot be reused by a later file
+        if self._log is not None:
+            self._log.close()
+        self._log = None
+        self._log_ino = None
+        self._log_offset = 0
+
+    # --- locking ---
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False):
+        """Thread lock plus the cross-process flock, with the in-memory state caught up."""
+        with self._lock:
+            outer = self._lock_depth == 0
+            if outer and fcntl is not None:
+                if self._lock_file is None:
+                    self._lock_file = open(self._file(".lock"), "a")
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                if outer:
+                    self._sync()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if outer and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Catch up with writes other processes made since this one last looked."""
+        try:
+            stat = os.stat(self._file("records.jsonl"))
+        except FileNotFoundError:
+            # No log: only a header written elsewhere (or a compaction down to nothing) is news
+            if self._log_ino is not None or (self._dim is None and os.path.exists(self._file("header.json"))):
+                self._reload()
+            return
+        if stat.st_ino != self._log_ino or stat.st_size < self._log_offset:
+            self._reload()
+        elif stat.st_size > self._log_offset:
+            self._replay_tail()
+
+    def _reload(self):
+        self._unmap()
+        self._reset_state()
+        self._load()
+
+    # --- files ---
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self._file("header.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        header = self._read_header()
+        if header is None:
+            return
+
+        self._dim = header["dim"]
+        self.dtype = np.dtype(header["dtype"]).type
+        # Files written earlier keep their storage type even if the config changed since
+        self.quantization = {np.float32: "none", np.float16: "float16", np.int8: "int8"}[self.dtype]
+        if not header["capacity"] or not os.path.exists(self._file("records.jsonl")):
+            return
+        self._open_matrix(header["capacity"])
+        self._apply(self._read_log())
+
+        self._free = [row for row, id_ in enumerate(self._ids) if id_ is None]
+        self._norms_sq = np.zeros(self._capacity, dtype=np.float32)
+        for start in range(0, len(self._ids), self.SCAN_CHUNK):
+            block = self._dequantized(start, min(start + self.SCAN_CHUNK, len(self._ids)))
+            self._norms_sq[start:start + block.shape[0]] = np.einsum("ij,ij->i", block, block)
+        print(f"📂 Loaded flat index '{self.name}' ({len(self._row_of)} rows, dim={self._dim})")
+
+    def _replay_tail(self):
+        """Apply log entries appended by another process, growing the maps if it grew the matrix."""
+        header = self._read_header()
+        if self._vectors is None or header is None or header["dim"] != self._dim:
+            self._reload()
+            return
+        if header["capacity"] > self._capacity:
+            self._unmap()
+            self._open_matrix(header["capacity"])
+            norms = np.zeros(self._capacity, dtype=np.float32)
+            norms[:self._norms_sq.shape[0]] = self._norms_sq
+            self._norms_sq = norms
+
+        rows = sorted(self._apply(self._read_log()))
+        if rows:
+            stored = self._dequantized_rows(rows)
+            self._norms_sq[rows] = np.einsum("ij,ij->i", stored, stored)
+        self._free = [row for row, id_ in enumerate(self._ids) if id_ is None]
+        self._columns.clear()
+
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self._file("records.jsonl"), "rb")
+            self._log_ino = os.fstat(self._log.fileno()).st_ino
+
+    def _read_log(self) -> List[dict]:
+        """Log entries past the last offset read; advances the offset."""
+        self._open_log()
+        self._log.seek(self._log_offset)
+        data = self._log.read()
+        # An unfinished last line is left for the next read
+        end = data.rfind(b"\n") + 1
+        self._log_offset += end
+        return [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+
+    def _apply(self, entries: List[dict]) -> set:
+        """Apply log entries to the row metadata; returns the rows whose vectors may have changed."""
+        written = set()
+        for entry in entries:
+            row = entry["row"]
+            while len(self._ids) <= row:
+                self._append_empty_row()
+            if entry.get("deleted"):
+                self._clear_row(row)
+                written.discard(row)
+            elif "update" in entry:
+                if self._ids[row] == entry["id"]:
+                    metadata = {**self._metadatas[row], **entry["update"]}
+                    self._set_row_meta(row, entry["id"], entry.get("document", self._documents[row]), metadata)
+                    written.add(row)
+            else:
+                self._set_row_meta(row, entry["id"], entry["document"], entry["metadata"])
+                written.add(row)
+        return written
+
+    def _write_header(self):
+        with open(self._file("header.json"), "w") as f:
+            json.dump({"dim": self._dim, "dtype": np.dtype(self.dtype).name, "capacity": self._capacity}, f)
+
+    def _open_matrix(self, capacity: int):
+        self._capacity = capacity
+        self._vectors = np.memmap(self._file("vectors.bin"), dtype=self.dtype,
+                                  mode="r+" if os.path.exists(self._file("vectors.bin")) else "w+",
+                                  shape=(capacity, self._dim))
+        if self.dtype == np.int8:
+            self._scales = np.memmap(self._file("scales.bin"), dtype=np.float32,
+                                     mode="r+" if os.path.exists(self._file("scales.bin")) else "w+",
+                                     shape=(capacity,))
+
+    def _unmap(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._scales is not None:
+            self._scales.flush()
+        self._vectors = None
+        self._scales = None
+
+    def _grow(self, needed: int):
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2, 1024)
+        self._unmap()
+        for name, itemsize in (("vectors.bin", np.dtype(self.dtype).itemsize * self._dim), ("scales.bin", 4)):
+            if name == "scales.bin" and self.dtype != np.int8:
+                continue
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * itemsize)
+        self._open_matrix(capacity)
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[:self._norms_sq.shape[0]] = self._norms_sq
+        self._norms_sq = norms
+        self._write_header()
+
+    def _append_log(self, entries: List[dict]):
+        if not entries:
+            return
+        with open(self._file("records.jsonl"), "ab") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8"))
+            # Writers hold the exclusive flock, so everything up to here has been applied
+            self._log_offset = f.tell()
+        self._open_log()
+
+    # --- rows ---
+
+    def _append_empty_row(self):
+        self._ids.append(None)
+        self._documents.append(None)
+        self._metadatas.append(None)
+
+    def _set_row_meta(self, row: int, id_: str, document: str, metadata: dict):
+        old = self._ids[row]
+        if self._dirty is not None:
+            self._dirty.update(x for x in (old, id_) if x is not None)
+        if old is not None and old != id_:
+            self._row_of.pop(old, None)
+        self._ids[row] = id_
+        self._documents[row] = document
+        self._metadatas[row] = metadata or {}
+        self._row_of[id_] = row
+
+    def _clear_row(self, row: int):
+        id_ = self._ids[row]
+        if id_ is not None:
+            self._row_of.pop(id_, None)
+            if self._dirty is not None:
+                self._dirty.add(id_)
+        self._ids[row] = None
+        self._documents[row] = None
+        self._metadatas[row] = None
+
+    def _write_vectors(self, rows: List[int], matrix: np.ndarray):
+        if self.dtype == np.int8:
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors[rows] = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            self._scales[rows] = scales
+        else:
+            self._vectors[rows] = matrix.astype(self.dtype)
+        stored = self._dequantized_rows(rows)
+        self._norms_sq[rows] = np.einsum("ij,ij->i", stored, stored)
+
+    def _dequantized(self, start: int, end: int) -> np.ndarray:
+        block = np.asarray(self._vectors[start:end], dtype=np.float32)
+        if self._scales is not None:
+            block = block * self._scales[start:end, None]
+        return block
+
+    def _dequantized_rows(self, rows) -> np.ndarray:
+        block = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            block = block * self._scales[rows, None]
+        return block
+
+    def _alive_rows(self) -> np.ndarray:
+        return np.fromiter((id_ is not None for id_ in self._ids), dtype=bool, count=len(self._ids))
+
+    def _column(self, key: str) -> list:
+        if key not in self._columns:
+            self._columns[key] = [meta.get(key) if meta is not None else None for meta in self._metadatas]
+        return self._columns[key]
+
+    def _where_mask(self, where: Optional[dict]) -> np.ndarray:
+        mask = self._alive_rows()
+        if not where:
+            return mask
+        return mask & self._evaluate(where)
+
+    def _evaluate(self, where: dict) -> np.ndarray:
+        result = np.ones(len(self._ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    result &= self._evaluate(clause)
+            elif key == "$or":
+                any_match = np.zeros(len(self._ids), dtype=bool)
+                for clause in condition:
+                    any_match |= self._evaluate(clause)
+                result &= any_match
+            elif isinstance(condition, dict):
+                for op, target in condition.items():
+                    result &= _compare(self._column(key), op, target)
+            else:
+                result &= _compare(self._column(key), "$eq", condition)
+        return result
+
+    # --- VectorStore API ---
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if not ids:
+            return
+        matrix = similarity.as_matrix(embeddings)
+        # An id repeated within the batch would get two rows; the last occurrence wins
+        last = {id_: i for i, id_ in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            matrix = matrix[keep]
+        with self._locked(exclusive=True):
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+                self._write_header()
+            if matrix.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match index dimension {self._dim}")
+
+            rows = []
+            for id_ in ids:
+                if id_ in self._row_of:
+                    rows.append(self._row_of[id_])
+                elif self._free:
+                    rows.append(self._free.pop())
+                else:
+                    self._append_empty_row()
+                    rows.append(len(self._ids) - 1)
+            self._grow(len(self._ids))
+
+            self._write_vectors(rows, matrix)
+            self._vectors.flush()
+
+            entries = []
+            for row, id_, document, metadata in zip(rows, ids, documents, metadatas):
+                self._set_row_meta(row, id_, document, metadata)
+                entries.append({"row": row, "id": id_, "document": document, "metadata": metadata or {}})
+            self._append_log(entries)
+            self._columns.clear()
+
+    def update(self, ids, metadatas=None, documents=None, embeddings=None):
+        with self._locked(exclusive=True):
+            entries, vector_rows, vectors = [], [], []
+            for i, id_ in enumerate(ids):
+                row = self._row_of.get(id_)
+                if row is None:
+                    continue
+                if embeddings is not None:
+                    vector_rows.append(row)
+                    vectors.append(embeddings[i])
+
+                delta = (metadatas[i] or {}) if metadatas is not None else {}
+                document = documents[i] if documents is not None else self._documents[row]
+                self._set_row_meta(row, id_, document, {**self._metadatas[row], **delta})
+                entry = {"row": row, "id": id_, "update": delta}
+                if documents is not None:
+                    entry["document"] = document
+                entries.append(entry)
+
+            if vector_rows:
+                self._write_vectors(vector_rows, similarity.as_matrix(vectors))
+                self._vectors.flush()
+            self._append_log(entries)
+            self._columns.clear()
+
+    def delete(self, ids=None, where=None):
+        with self._locked(exclusive=True):
+            if ids is not None:
+                rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of]
+            else:
+                rows = np.flatnonzero(self._where_mask(where)).tolist()
+            for row in rows:
+                self._clear_row(row)
+                self._free.append(row)
+            self._append_log([{"row": row, "deleted": True} for row in rows])
+            self._columns.clear()
+
+    def _rows_result(self, rows: List[int], include) -> dict:
+        result = {"ids": [self._ids[r] for r in rows]}
+        result["documents"] = [self._documents[r] for r in rows] if "documents" in include else None
+        result["metadatas"] = [self._metadatas[r] for r in rows] if "metadatas" in include else None
+        result["embeddings"] = self._dequantized_rows(rows) if "embeddings" in include else None
+        return result
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=DEFAULT_INCLUDE_GET):
+        with self._locked():
+            if ids is not None:
+                mask = self._where_mask(where)
+                rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of and mask[self._row_of[id_]]]
+            else:
+                rows = np.flatnonzero(self._where_mask(where)).tolist()
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return self._rows_result(rows, include)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=DEFAULT_INCLUDE_QUERY):
+        queries = similarity.as_matrix(query_embeddings)
+        with self._locked():
+            n = len(self._ids)
+            mask = self._where_mask(where)
+            candidates = np.flatnonzero(mask)
+
+            result = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+            if self._dim is None or candidates.size == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(queries.shape[0])]
+                return result
+
+            dots = np.empty((queries.shape[0], n), dtype=np.float32)
+            for start in range(0, n, self.SCAN_CHUNK):
+                end = min(start + self.SCAN_CHUNK, n)
+                np.matmul(queries, self._dequantized(start, end).T, out=dots[:, start:end])
+
+            # Squared L2, matching Chroma's default distance
+            distances = np.einsum("ij,ij->i", queries, queries)[:, None] + self._norms_sq[None, :n] - 2.0 * dots
+            distances[:, ~mask] = np.inf
+            idx, neg = similarity.top_k_rows(-distances, min(n_results, candidates.size))
+
+            for row_idx, row_neg in zip(idx, neg):
+                rows = row_idx.tolist()
+                chunk = self._rows_result(rows, include)
+                result["ids"].append(chunk["ids"])
+                result["documents"].append(chunk["documents"])
+                result["metadatas"].append(chunk["metadatas"])
+                result["embeddings"].append(chunk["embeddings"])
+                result["distances"].append(np.maximum(-row_neg, 0.0).tolist() if "distances" in include else None)
+            return result
+
+    def count(self) -> int:
+        with self._locked():
+            return len(self._row_of)
+
+    def compact(self):
+        """
+        Rewrite the matrix and log without tombstones, then swap the files in.
+
+        The copy runs without holding the lock, so reads and writes go on
+        meanwhile. Rows written during the copy are tracked and copied again
+        under the lock just before the swap.
+        """
+        with self._compact_lock:
+            with self._locked():
+                if self._dim is None:
+                    return
+                rows = [r for r, id_ in enumerate(self._ids) if id_ is not None]
+                ids = [self._ids[r] for r in rows]
+                documents = [self._documents[r] for r in rows]
+                metadatas = [self._metadatas[r] for r in rows]
+                vectors, scales, log_ino = self._vectors, self._scales, self._log_ino
+                self._dirty = set()
+
+            tmp_root = self.path + ".compact"
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            fresh = NumpyFlatStore(tmp_root, self.name, quantization=self.quantization)
+            try:
+                for start in range(0, len(rows), self.SCAN_CHUNK):
+                    chunk = rows[start:start + self.SCAN_CHUNK]
+                    block = np.asarray(vectors[chunk], dtype=np.float32)
+                    if scales is not None:
+                        block = block * scales[chunk, None]
+                    end = start + len(chunk)
+                    fresh.upsert(ids[start:end], documents[start:end], metadatas[start:end], block)
+
+                with self._locked(exclusive=True):
+                    dirty, self._dirty = self._dirty, None
+                    if self._log_ino != log_ino:
+                        print(f"⚠️ Flat index '{self.name}' was reloaded during compaction; skipping the swap")
+                        return
+                    alive = [id_ for id_ in dirty if id_ in self._row_of]
+                    if alive:
+                        again = [self._row_of[id_] for id_ in alive]
+                        fresh.upsert(
+                            alive,
+                            [self._documents[r] for r in again],
+                            [self._metadatas[r] for r in again],
+                            self._dequantized_rows(again),
+                        )
+                    fresh.delete(ids=[id_ for id_ in dirty if id_ not in self._row_of])
+                    fresh.close()
+                    self._unmap()
+
+                    for name in ("header.json", "vectors.bin", "scales.bin", "records.jsonl"):
+                        src = os.path.join(fresh.path, name)
+                        if os.path.exists(src):
+                            os.replace(src, self._file(name))
+                        elif os.path.exists(self._file(name)):
+                            os.remove(self._file(name))
+                    self._reload()
+                    print(f"🧱 Compacted flat index '{self.name}' to {len(self._row_of)} rows")
+            finally:
+                self._dirty = None
+                fresh.close()
+                shutil.rmtree(tmp_root, ignore_errors=True)
+
+    def close(self):
+        """Flush and release the memory maps and lock file; a later call reopens them."""
+        with self._lock:
+            self._unmap()
+            self._reset_state()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+
+# --- Factory ---
+
+def chroma_client(settings: dict):
+    """Chroma client for the configured backend (HTTP, falling back to in-process)."""
+    import chromadb
+
+    backend = settings.get("backend", "chroma_http")
+    path = os.path.abspath(settings.get("path", "./CAM_project/chroma_db"))
+
+    if backend == "chroma_http":
+        host = os.getenv("CHROMA_HOST", settings.get("host", "localhost"))
+        port = os.getenv("CHROMA_PORT", str(settings.get("port", 8001)))
+        try:
+            client = chromadb.HttpClient(host=host, port=port)
+            print(f"🌐 Connected to Chroma server at {host}:{port}")
+            return client
+        except Exception as e:
+            print(f"⚠️ Chroma server not available, using in-process client at {path}: {e}")
+
+    # PersistentClient actually persists on chromadb 1.x (Client(Settings(persist_directory)) does not)
+    print(f"💾 Using in-process Chroma at {path}")
+    return chromadb.PersistentClient(path=path)
+
+
+def open_store(name: str, settings: dict, client=None, quantization: str = "none") -> VectorStore:
+    """
+    Open (creating if needed) the collection `name` on the configured backend.
+    `client` reuses an existing Chroma client instead of creating one.
+    """
+    backend = settings.get("backend", "chroma_http")
+
+    if backend == "numpy":
+        path = os.path.abspath(settings.get("numpy_path", "./CAM_project/flat_index"))
+        return NumpyFlatStore(path, name, quantization=quantization)
+
+    if client is None:
+        client = chroma_client(settings)
+    # ✅ Disable Chroma's built-in embedding model since we embed ourselves
+    collection = client.get_or_create_collection(name=name, embedding_function=None)
+    return ChromaStore(collection, backend=backend)
+
+
+def list_collections(settings: dict, client=None) -> list:
+    """Names of all collections on the configured backend."""
+    if settings.get("backend", "chroma_http") == "numpy":
+        path = os.path.abspath(settings.get("numpy_path", "./CAM_project/flat_index"))
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            name for name in os.listdir(path)
+            if os.path.isdir(os.path.join(path, name)) and not name.endswith(".compact")
+        )
+
+    if client is None:
+        client = chroma_client(settings)
+    # chromadb 1.x returns Collection objects; older versions returned names
+    return sorted(c if isinstance(c, str) else c.name for c in client.list_collections())
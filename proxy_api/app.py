@@ -4,9 +4,47 @@ FastAPI entry point for the Context-Augmented Memory Proxy.
 """
 
 # proxy_api/app.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import FastAPI
 from proxy_api.router import router
+from modules import resources
+from modules.maintenance import compaction
+from proxy_api.services import write_behind
 
 app = FastAPI(title="Context Augmented Memory Proxy API")
 app.include_router(router)
 
+
+@app.on_event("startup")
+async def size_worker_threads():
+    # Retrieval, journal writes and fallback calls run on the loop's default
+    # executor; its size caps how many of them can be in flight at once
+    workers = resources.config().get("proxy", {}).get("blocking_workers", 32)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cam-proxy")
+    )
+
+
+@app.on_event("startup")
+def start_maintenance():
+    # Decay scoring + capacity eviction run in a background thread, a page at a time
+    compaction.start_background()
+
+
+@app.on_event("startup")
+def start_write_behind():
+    # Replays journaled memory writes left over from the last run
+    write_behind.start()
+
+
+@app.on_event("shutdown")
+def stop_maintenance():
+    compaction.stop_background()
+
+
+@app.on_event("shutdown")
+def stop_write_behind():
+    write_behind.stop()
+
@@ -1,5 +1,5 @@
 import os
-from anthropic import Anthropic
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +7,8 @@ def ask(prompt: str, api_key: str = None, model: str = "claude-3-5-sonnet") -> s
     key = api_key or os.getenv("ANTHROPIC_API_KEY")
     if not key:
         return "⚠️ Missing Anthropic API key."
+    # SDK imported on first use to keep proxy startup fast
+    from anthropic import Anthropic
     client = Anthropic(api_key=key)
     try:
         response = client.messages.create(
@@ -17,3 +19,26 @@ def ask(prompt: str, api_key: str = None, model: str = "claude-3-5-sonnet") -> s
         return response.content[0].text.strip()
     except Exception as e:
         return f"⚠️ Anthropic Error: {e}"
+
+
+@lru_cache(maxsize=16)
+def _async_client(key: str):
+    # One client per key, so concurrent requests share its connection pool
+    from anthropic import AsyncAnthropic
+    return AsyncAnthropic(api_key=key)
+
+
+async def ask_async(prompt: str, api_key: str = None, model: str = "claude-3-5-sonnet") -> str:
+    """ask() without blocking the event loop."""
+    key = api_key or os.getenv("ANTHROPIC_API_KEY")
+    if not key:
+        return "⚠️ Missing Anthropic API key."
+    try:
+        response = await _async_client(key).messages.create(
+            model=model,
+            max_tokens=500,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.content[0].text.strip()
+    except Exception as e:
+        return f"⚠️ Anthropic Error: {e}"
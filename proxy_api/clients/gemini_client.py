@@ -1,13 +1,23 @@
 # proxy_api/clients/gemini_client.py
 """
 Client for Google Gemini models.
+
+The SDK keeps its API key in process-global state (genai.configure), so a
+call must never overlap with a call configured for a different key:
+- ask() holds a lock around configure + request
+- ask_async() lets any number of calls with the *same* key run together and
+  makes a call with another key wait until those have finished
 """
+import asyncio
 import os
-import google.generativeai as genai
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_sync_lock = threading.Lock()
+
+
 def ask(prompt: str, api_key: str = None, model: str = "gemini-1.5-flash") -> str:
     """
     Sends a text prompt to Gemini and returns its response.
@@ -16,10 +26,69 @@ def ask(prompt: str, api_key: str = None, model: str = "gemini-1.5-flash") -> st
     if not key:
         return "⚠️ Missing Gemini API key."
 
+    # SDK imported on first use to keep proxy startup fast
+    import google.generativeai as genai
+
+    try:
+        with _sync_lock:
+            genai.configure(api_key=key)
+            model_client = genai.GenerativeModel(model)
+            response = model_client.generate_content(prompt)
+        return response.text.strip()
+    except Exception as e:
+        return f"⚠️ Gemini Error: {e}"
+
+
+class _KeyGate:
+    """Admits concurrent holders of one key at a time; switching keys waits for the current holders."""
+
+    def __init__(self):
+        self._changed = None  # asyncio.Condition, created on the running loop
+        self.key = None
+        self.active = 0
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    async def acquire(self, key: str, configure):
+        changed = self._condition()
+        async with changed:
+            await changed.wait_for(lambda: self.active == 0 or self.key == key)
+            if self.key != key:
+                configure(api_key=key)
+                self.key = key
+            self.active += 1
+
+    async def release(self):
+        changed = self._condition()
+        async with changed:
+            self.active -= 1
+            if self.active == 0:
+                changed.notify_all()
+
+
+_gate = _KeyGate()
+
+
+async def ask_async(prompt: str, api_key: str = None, model: str = "gemini-1.5-flash") -> str:
+    """
+    ask() without blocking the event loop (the SDK's generate_content_async).
+    """
+    key = api_key or os.getenv("GEMINI_API_KEY")
+    if not key:
+        return "⚠️ Missing Gemini API key."
+
+    import google.generativeai as genai
+
     try:
-        genai.configure(api_key=key)
-        model_client = genai.GenerativeModel(model)
-        response = model_client.generate_content(prompt)
+        await _gate.acquire(key, genai.configure)
+        try:
+            model_client = genai.GenerativeModel(model)
+            response = await model_client.generate_content_async(prompt)
+        finally:
+            await _gate.release()
         return response.text.strip()
     except Exception as e:
         return f"⚠️ Gemini Error: {e}"
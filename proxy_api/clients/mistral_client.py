@@ -1,6 +1,6 @@
-from mistralai import Mistral
 from dotenv import load_dotenv
 import os
+from functools import lru_cache
 
 load_dotenv()
 
@@ -14,6 +14,9 @@ def ask(prompt: str, api_key: str = None, model: str = "mistral-large-latest") -
     if not key:
         return "⚠️ Missing Mistral API key."
 
+    # SDK imported on first use to keep proxy startup fast
+    from mistralai import Mistral
+
     try:
         client = Mistral(api_key=key)
 
@@ -23,7 +26,33 @@ def ask(prompt: str, api_key: str = None, model: str = "mistral-large-latest") -
         )
 
         # Extract the content properly
-        content = response.choices[0].message["content"]
+        content = response.choices[0].message.content
+        return content.strip()
+
+    except Exception as e:
+        return f"⚠️ Mistral Error: {e}"
+
+
+@lru_cache(maxsize=16)
+def _client(key: str):
+    from mistralai import Mistral
+    return Mistral(api_key=key)
+
+
+async def ask_async(prompt: str, api_key: str = None, model: str = "mistral-large-latest") -> str:
+    """
+    ask() without blocking the event loop (the SDK's complete_async).
+    """
+    key = api_key or os.getenv("MISTRAL_API_KEY")
+    if not key:
+        return "⚠️ Missing Mistral API key."
+
+    try:
+        response = await _client(key).chat.complete_async(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        content = response.choices[0].message.content
         return content.strip()
 
     except Exception as e:
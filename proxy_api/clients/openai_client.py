@@ -1,5 +1,6 @@
 import os
-from openai import OpenAI
+from functools import lru_cache
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,3 +18,25 @@ def ask(prompt: str, api_key: str = None, model: str = "gpt-4o-mini", temperatur
         return response.choices[0].message.content.strip()
     except Exception as e:
         return f"⚠️ OpenAI Error: {e}"
+
+
+@lru_cache(maxsize=16)
+def _async_client(key: str) -> AsyncOpenAI:
+    # One client per key, so concurrent requests share its connection pool
+    return AsyncOpenAI(api_key=key)
+
+
+async def ask_async(prompt: str, api_key: str = None, model: str = "gpt-4o-mini", temperature: float = 0.7) -> str:
+    """ask() without blocking the event loop."""
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    if not key:
+        return "⚠️ Missing OpenAI API key."
+    try:
+        response = await _async_client(key).chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        return f"⚠️ OpenAI Error: {e}"
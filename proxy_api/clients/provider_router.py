@@ -1,6 +1,7 @@
 """
 Routes LLM requests to the correct provider client
 based on API key prefix or model name.
+ask() blocks; ask_async() is the variant for the async proxy path.
 """
 
 import os
@@ -39,3 +40,19 @@ def ask(prompt: str, api_key: str = None, model: str = "gpt-4o-mini") -> str:
         return gemini_client.ask(prompt, api_key=api_key, model=model)
     else:
         return openai_client.ask(prompt, api_key=api_key, model=model)
+
+
+_CLIENTS = {
+    "anthropic": anthropic_client,
+    "mistral": mistral_client,
+    "gemini": gemini_client,
+    "openai": openai_client,
+}
+
+
+async def ask_async(prompt: str, api_key: str = None, model: str = "gpt-4o-mini") -> str:
+    """
+    Routes the prompt to the appropriate provider without blocking the event loop.
+    """
+    client = _CLIENTS.get(detect_provider(api_key, model), openai_client)
+    return await client.ask_async(prompt, api_key=api_key, model=model)
@@ -1,15 +1,27 @@
 # proxy_api/router.py
 
+import asyncio
+
 from fastapi import APIRouter, Request
 from proxy_api.clients import provider_router
-from proxy_api.services.context_injector import inject_context_if_relevant, store_to_memory
-from proxy_api.services.normalize_output import normalize_response, fallback_normalize
-from modules import auto_tagger, memory
-from maintenance.alert import log_alert
+from proxy_api.services import write_behind
+from proxy_api.services.context_injector import inject_context_async
+from proxy_api.utils.fallback_llm import recover_response_format
+from modules import context_packer, dedup, embedding, enrichment, llm_cache, memory, resources, retrieval_cache
+from modules.maintenance import compaction
+from modules.maintenance.alert import log_alert
 
 router = APIRouter()
 
 
+def resolve_namespace(request: Request, body: dict):
+    """
+    Tenant namespace for a request: `X-CAM-Namespace` header, then the
+    `namespace` body field, then OpenAI's `user` field (None = default).
+    """
+    return request.headers.get("x-cam-namespace") or body.get("namespace") or body.get("user")
+
+
 @router.post("/v1/chat/completions")
 async def chat_completions(request: Request):
     body = await request.json()
@@ -18,21 +30,28 @@ async def chat_completions(request: Request):
     api_key = body.get("api_key")
     messages = body.get("messages", [])
     user_prompt = messages[-1]["content"] if messages else ""
+    namespace = resolve_namespace(request, body)
+    session_id = body.get("session_id")
 
-    print(f"🧠 Incoming chat via proxy (model: {model})")
+    print(f"🧠 Incoming chat via proxy (model: {model}, namespace: {namespace or 'default'})")
+
+    # Blocking work (retrieval, fallback LLM, journal writes) runs on worker
+    # threads and the provider call is awaited, so the event loop keeps
+    # serving other requests meanwhile
 
     # Step 1 — Inject memory context before prompt
-    full_prompt = inject_context_if_relevant(user_prompt)
+    full_prompt = await inject_context_async(user_prompt, namespace=namespace, model=model)
 
     # Step 2 — Route to appropriate provider
     provider = body.get("provider") or provider_router.detect_provider(api_key, model)
-    llm_output = provider_router.ask(full_prompt, api_key=api_key, model=model)
+    llm_output = await provider_router.ask_async(full_prompt, api_key=api_key, model=model)
 
-    # Step 3 — Normalize response structure
-    normalized = normalize_response(llm_output)
-    if not normalized:
+    # Step 3 — Recover empty / malformed output
+    cleaned_text = llm_output
+    if not llm_output:
         print("⚠️ Output normalization failed. Running fallback model...")
-        normalized = fallback_normalize(llm_output, user_prompt, model=model, provider=provider)
+        recovered = await asyncio.to_thread(recover_response_format, llm_output)
+        cleaned_text = recovered["response"]
 
         # ✅ Trigger admin alert log
         log_alert({
@@ -43,18 +62,17 @@ async def chat_completions(request: Request):
             "raw_output": llm_output,
         })
 
-    # Step 4 — Extract cleaned text + metadata
-    cleaned_text = normalized.get("text", llm_output)
-    metadata = normalized.get("metadata", {})
-
-    # Auto-tag fallback if none set
-    if not metadata.get("tag"):
-        metadata["tag"] = auto_tagger.auto_tag(user_prompt)
-
-    # Step 5 — Store in memory
-    store_to_memory(user_prompt, cleaned_text, tag=metadata["tag"], continued=metadata.get("topic_continued", True))
-
-    # Step 6 — Return OpenAI-style response
+    # Step 4 — Queue for memory (tagging, embedding and storage run after the response)
+    await asyncio.to_thread(
+        write_behind.submit,
+        user_prompt,
+        cleaned_text,
+        topic_continued=True,
+        namespace=namespace,
+        session_id=session_id,
+    )
+
+    # Step 5 — Return OpenAI-style response
     return {
         "id": "cmpl-proxy-001",
         "object": "chat.completion",
@@ -71,12 +89,12 @@ async def chat_completions(request: Request):
 
 # --- Memory Debug Endpoint ---
 @router.get("/v1/memory/debug")
-async def memory_debug():
+def memory_debug(namespace: str = None):
     """
     Preview a few memory records from Chroma.
     """
     try:
-        data = memory.collection.get(limit=5)
+        data = memory.get_store(namespace).get(where=memory.namespace_filter(namespace), limit=5)
         return {
             "status": "OK",
             "count": len(data["ids"]),
@@ -91,3 +109,32 @@ async def memory_debug():
         }
     except Exception as e:
         return {"status": "ERROR", "message": str(e)}
+
+
+# --- Memory Stats Endpoint ---
+@router.get("/v1/memory/stats")
+async def memory_stats():
+    """
+    Counters from the write and embedding paths.
+    """
+    return {
+        "dedup": dedup.stats(),
+        "embedding_cache": embedding.cache_stats(),
+        "embedding_batching": embedding.batching_stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "context_packing": context_packer.stats(),
+        "enrichment": enrichment.stats(),
+        "llm_cache": llm_cache.stats(),
+        "config": resources.get("config_service").stats(),
+        "maintenance": compaction.stats(),
+        "write_behind": write_behind.stats(),
+    }
+
+
+# --- Write-behind Queue Endpoint ---
+@router.get("/v1/memory/queue")
+async def memory_queue():
+    """
+    Depth and lag of the post-response memory write queue.
+    """
+    return write_behind.stats()
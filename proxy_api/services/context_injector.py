@@ -5,6 +5,7 @@ Retrieves relevant memory, augments user prompts,
 and stores new conversations to Chroma automatically.
 """
 
+import asyncio
 import sys, os
 from datetime import datetime
 from nanoid import generate
@@ -12,20 +13,23 @@ from nanoid import generate
 # Ensure modules path is visible
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from modules import memory, retrieval, auto_tagger, usefulness_filter
+from modules import memory, retrieval, embedding, context_packer, enrichment
 
 
-def inject_context_if_relevant(user_prompt: str) -> str:
+def inject_context_if_relevant(user_prompt: str, namespace: str = None, model: str = None) -> str:
     """
     Retrieves relevant memory context for a given user prompt
     and returns an augmented prompt.
+    The context is packed into `context_packing.max_tokens` of `model`'s tokenizer.
     """
     print(f"🔍 Checking for relevant context for: {user_prompt}")
 
-    context = retrieval.retrieve_context(user_prompt)
+    result = retrieval.retrieve(user_prompt, namespace=namespace, model=model)
+    context = result.context
 
     if context:
-        print("📚 Retrieved context found — augmenting prompt...")
+        context_packer.record(result.tokens)
+        print(f"📚 Retrieved context found — augmenting prompt with {result.tokens} context tokens...")
         augmented = f"Context:\n{context}\n\nUser: {user_prompt}"
         return augmented
 
@@ -33,31 +37,56 @@ def inject_context_if_relevant(user_prompt: str) -> str:
     return user_prompt
 
 
-def store_to_memory(user_prompt: str, llm_output: str, topic_continued: str = "False"):
+async def inject_context_async(user_prompt: str, namespace: str = None, model: str = None) -> str:
     """
-    Stores a user prompt + model response to Chroma memory if useful.
+    inject_context_if_relevant() on a worker thread: retrieval's embedding
+    and vector store calls block, so they stay off the event loop.
     """
-    if not usefulness_filter.is_useful(user_prompt):
-        print("🚫 Skipped storing trivial or meta prompt.")
-        return
+    return await asyncio.to_thread(inject_context_if_relevant, user_prompt, namespace=namespace, model=model)
 
-    episode_id = generate(size=12)
-    timestamp = datetime.now().isoformat()
-    tag = auto_tagger.auto_tag(user_prompt)
 
+def memory_metadata(user_prompt: str, tag: str, topic_continued="False", session_id: str = None,
+                    timestamp: str = None, labels: enrichment.Enrichment = None) -> dict:
+    """
+    Metadata stored alongside a conversation turn.
+    `labels` (the prompt's enrichment) adds its intent and topic.
+    """
     metadata = {
-        "timestamp": timestamp,
+        "timestamp": timestamp or datetime.now().isoformat(),
         "user_prompt": user_prompt,
         "tag": tag,
-        "topic_continued": topic_continued,
+        "topic_continued": str(topic_continued),
     }
+    if labels is not None:
+        metadata["intent"] = labels.intent
+        metadata["topic"] = labels.topic
+    if session_id:
+        metadata["session_id"] = session_id
+    return metadata
+
+
+def store_to_memory(user_prompt: str, llm_output: str, tag: str = None, topic_continued: str = "False",
+                    namespace: str = None, session_id: str = None):
+    """
+    Stores a user prompt + model response to Chroma memory if useful.
+    """
+    labels = enrichment.enrich(user_prompt)
+    if not labels.useful:
+        print("🚫 Skipped storing trivial or meta prompt.")
+        return
+
+    episode_id = generate(size=12)
+    tag = tag or labels.tag
 
-    try:
-        memory.collection.add(
-            ids=[episode_id],
-            documents=[llm_output],
-            metadatas=[metadata],
-        )
+    result = memory.store_many([{
+        "id": episode_id,
+        "document": llm_output,
+        "metadata": memory_metadata(user_prompt, tag, topic_continued, session_id, labels=labels),
+        "embedding": embedding.get_embedding(llm_output),
+    }], namespace=namespace)
+    if episode_id in result.written:
         print(f"🧠 Stored episode {episode_id} (tag={tag}, continued={topic_continued})")
-    except Exception as e:
-        print(f"⚠️ Failed to store memory: {e}")
+    elif episode_id in result.merged:
+        print(f"♻️ Episode merged into existing memory {result.merged[episode_id]}")
+    else:
+        print(f"⚠️ Failed to store memory: {result.failed.get(episode_id, 'unknown error')}")
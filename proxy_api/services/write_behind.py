@@ -0,0 +1,369 @@
+# proxy_api/services/write_behind.py
+"""
+Write-behind queue for post-response memory storage.
+
+chat_completions enqueues each (prompt, output) pair and returns; worker
+threads drain the queue in batches: one enrichment call per prompt (usefulness,
+tag, intent, topic), one
+batched embedding call and one store_many() per namespace.
+
+Durability: every job is appended to a local journal before it is queued.
+A checkpoint file records the highest sequence number below which every job
+has been stored, so on startup the journal is replayed from there. Jobs that
+keep failing are moved to a dead-letter file instead of blocking the queue.
+
+Config: `write_behind` in config.json.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional
+
+from nanoid import generate
+
+from modules import embedding, enrichment, memory, resources
+from proxy_api.services.context_injector import memory_metadata, store_to_memory
+
+JOURNAL = "journal.jsonl"
+CHECKPOINT = "checkpoint.json"
+DEAD_LETTER = "dead_letter.jsonl"
+
+
+def _settings() -> dict:
+    return resources.config().get("write_behind", {})
+
+
+class WriteBehindQueue:
+    """Journaled job queue drained by background worker threads."""
+
+    def __init__(self, path: str, workers: int = 1, batch_size: int = 32, max_wait_ms: float = 200,
+                 max_retries: int = 3, fsync: bool = False):
+        self.path = os.path.abspath(path)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_retries = max_retries
+        self.fsync = fsync
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self._journal = None
+        self._last_seq = 0
+        self._committed_seq = 0
+        self._inflight = {}  # seq -> enqueued_at, for jobs not yet stored
+        self.stats_counters = {"enqueued": 0, "stored": 0, "skipped": 0, "merged": 0, "failed": 0,
+                               "dead_lettered": 0, "replayed": 0, "batches": 0}
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # --- Journal ---
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self._file(CHECKPOINT)) as f:
+                return int(json.load(f)["seq"])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _write_checkpoint(self, seq: int):
+        tmp = self._file(CHECKPOINT + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"seq": seq, "updated_at": time.time()}, f)
+        os.replace(tmp, self._file(CHECKPOINT))
+
+    def _append(self, entry: dict):
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _replay(self) -> List[dict]:
+        """Journal entries written after the last checkpoint."""
+        self._committed_seq = self._read_checkpoint()
+        self._last_seq = self._committed_seq
+        pending = []
+        if not os.path.exists(self._file(JOURNAL)):
+            return pending
+        with open(self._file(JOURNAL), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                self._last_seq = max(self._last_seq, entry["seq"])
+                if entry["seq"] > self._committed_seq:
+                    pending.append(entry)
+        return pending
+
+    def _commit(self, seqs: List[int]):
+        """Mark jobs done and advance the checkpoint past every finished job."""
+        with self._lock:
+            for seq in seqs:
+                self._inflight.pop(seq, None)
+            committed = min(self._inflight) - 1 if self._inflight else self._last_seq
+            if committed <= self._committed_seq:
+                return
+            self._committed_seq = committed
+            self._write_checkpoint(committed)
+
+            # Everything journaled is stored: start a fresh journal instead of growing forever
+            # (unless stop() has already closed it)
+            if not self._inflight and self._journal is not None:
+                self._journal.close()
+                self._journal = open(self._file(JOURNAL), "w", encoding="utf-8")
+
+    # --- Public API ---
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            pending = self._replay()
+            self._journal = open(self._file(JOURNAL), "a", encoding="utf-8")
+            for entry in pending:
+                self._inflight[entry["seq"]] = entry["enqueued_at"]
+                self._queue.put(entry)
+            self.stats_counters["replayed"] += len(pending)
+
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"cam-write-behind-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        if pending:
+            print(f"🔁 Replaying {len(pending)} journaled memory writes")
+        print(f"📮 Write-behind queue started ({self.workers} worker(s), journal {self.path})")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop after draining what is queued (or after `timeout`; the journal keeps the rest)."""
+        deadline = time.monotonic() + timeout
+        while self.depth() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0.1))
+        with self._lock:
+            self._threads = []
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def enqueue(self, job: dict) -> Optional[int]:
+        """
+        Journal a job and queue it for the workers; returns its sequence
+        number, or None once the queue is stopped (the caller stores it itself).
+        """
+        with self._lock:
+            if self._journal is None:
+                return None
+            self._last_seq += 1
+            entry = {"seq": self._last_seq, "enqueued_at": time.time(), "job": job}
+            self._append(entry)
+            self._inflight[entry["seq"]] = entry["enqueued_at"]
+            self.stats_counters["enqueued"] += 1
+        self._queue.put(entry)
+        return entry["seq"]
+
+    def depth(self) -> int:
+        """Jobs enqueued but not yet stored (including the batch being processed)."""
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> dict:
+        with self._lock:
+            oldest = min(self._inflight.values()) if self._inflight else None
+            result = dict(self.stats_counters)
+            result.update({
+                "depth": len(self._inflight),
+                "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "committed_seq": self._committed_seq,
+                "last_seq": self._last_seq,
+                "workers_alive": sum(t.is_alive() for t in self._threads),
+            })
+        return result
+
+    # --- Workers ---
+
+    def _next_batch(self) -> List[dict]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch: List[dict]):
+        """Store a batch, retrying what failed; jobs that keep failing go to the dead-letter file."""
+        pending = batch
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                failures = self._process(pending)
+            except Exception as e:
+                failures = [(entry, str(e)) for entry in pending]
+            if not failures:
+                break
+            print(f"⚠️ {len(failures)} of {len(pending)} write-behind jobs failed "
+                  f"(attempt {attempt}/{self.max_retries}): {failures[0][1]}")
+            if attempt == self.max_retries:
+                self._dead_letter(failures)
+            else:
+                pending = [entry for entry, _ in failures]
+                time.sleep(min(2 ** attempt, 30))
+        # Stored or dead-lettered: either way the journal no longer needs them
+        self._commit([entry["seq"] for entry in batch])
+
+    def _dead_letter(self, failures: List[tuple]):
+        """Append (entry, error) pairs to the dead-letter file."""
+        with self._lock:
+            with open(self._file(DEAD_LETTER), "a", encoding="utf-8") as f:
+                for entry, error in failures:
+                    f.write(json.dumps({**entry, "error": error, "failed_at": time.time()}) + "\n")
+            self.stats_counters["dead_lettered"] += len(failures)
+        print(f"❌ Moved {len(failures)} memory writes to {self._file(DEAD_LETTER)}")
+
+    def _process(self, batch: List[dict]) -> List[tuple]:
+        """
+        Enrich, embed and store a batch. Returns (entry, error) for the jobs
+        that got no embedding and the records the store rejected.
+        """
+        jobs, labels, entries = [], [], {}
+        for entry in batch:
+            job = entry["job"]
+            job_labels = enrichment.enrich(job["user_prompt"])
+            if job_labels.useful:
+                jobs.append(job)
+                labels.append(job_labels)
+                entries[job["episode_id"]] = entry
+        skipped = len(batch) - len(jobs)
+
+        for job, job_labels in zip(jobs, labels):
+            job["tag"] = job.get("tag") or job_labels.tag
+        vectors = embedding.get_embeddings([job["llm_output"] for job in jobs]) if jobs else []
+
+        by_namespace = defaultdict(list)
+        failures = []
+        for job, job_labels, vector in zip(jobs, labels, vectors):
+            if not vector:
+                # get_embeddings() returns an empty vector for every text whose provider call failed
+                failures.append((entries[job["episode_id"]], "embedding failed (empty vector)"))
+                continue
+            by_namespace[job.get("namespace")].append({
+                "id": job["episode_id"],
+                "document": job["llm_output"],
+                "metadata": memory_metadata(
+                    job["user_prompt"], job["tag"], job.get("topic_continued", "False"),
+                    job.get("session_id"), job.get("timestamp"), labels=job_labels,
+                ),
+                "embedding": vector,
+            })
+
+        stored = merged = 0
+        for namespace, records in by_namespace.items():
+            result = memory.store_many(records, namespace=namespace)
+            stored += len(result.written)
+            merged += len(result.merged)
+            failures.extend((entries[id_], error) for id_, error in result.failed.items() if id_ in entries)
+        failed = len(failures)
+
+        with self._lock:
+            self.stats_counters["batches"] += 1
+            self.stats_counters["stored"] += stored
+            self.stats_counters["merged"] += merged
+            self.stats_counters["failed"] += failed
+            self.stats_counters["skipped"] += skipped
+        print(f"📮 Write-behind batch: {stored} stored, {merged} merged, {skipped} skipped, {failed} failed")
+        return failures
+
+
+_instance: Optional[WriteBehindQueue] = None
+_instance_lock = threading.Lock()
+
+
+def get_queue() -> WriteBehindQueue:
+    """The shared queue, started (and its journal replayed) on first use."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            settings = _settings()
+            _instance = WriteBehindQueue(
+                settings.get("journal_path", "./CAM_project/write_behind"),
+                workers=settings.get("workers", 1),
+                batch_size=settings.get("batch_size", 32),
+                max_wait_ms=settings.get("max_wait_ms", 200),
+                max_retries=settings.get("max_retries", 3),
+                fsync=settings.get("fsync", False),
+            )
+            _instance.start()
+        return _instance
+
+
+def enabled() -> bool:
+    return _settings().get("enabled", True)
+
+
+def start():
+    if enabled():
+        get_queue()
+
+
+def stop():
+    if _instance is not None:
+        _instance.stop()
+
+
+def submit(user_prompt: str, llm_output: str, tag: str = None, topic_continued="False",
+           namespace: str = None, session_id: str = None):
+    """
+    Store a conversation turn after the response has been sent.
+    Falls back to a synchronous store_to_memory() when `write_behind.enabled`
+    is false or the queue has been stopped.
+    """
+    if not enabled():
+        store_to_memory(user_prompt, llm_output, tag=tag, topic_continued=topic_continued,
+                        namespace=namespace, session_id=session_id)
+        return
+
+    seq = get_queue().enqueue({
+        "episode_id": generate(size=12),
+        "timestamp": datetime.now().isoformat(),
+        "user_prompt": user_prompt,
+        "llm_output": llm_output,
+        "tag": tag,
+        "topic_continued": str(topic_continued),
+        "namespace": namespace,
+        "session_id": session_id,
+    })
+    if seq is None:
+        # Shutting down: the queue no longer accepts jobs
+        store_to_memory(user_prompt, llm_output, tag=tag, topic_continued=topic_continued,
+                        namespace=namespace, session_id=session_id)
+
+
+def stats() -> dict:
+    if _instance is None:
+        return {"enabled": enabled(), "running": False}
+    return {"enabled": enabled(), "running": True, **_instance.stats()}
@@ -1,7 +1,15 @@
 # proxy_api/utils/fallback_llm.py
 
+from modules import llm_cache
 from proxy_api.clients import openai_client
 
+
+def _recovered(result: dict) -> bool:
+    # openai_client.ask reports failures as text; those aren't worth keeping
+    return result["response"] != "(Fallback failed)" and not result["response"].startswith("⚠️")
+
+
+@llm_cache.memoize("recover_response_format", model="gpt-4o-mini", store_if=_recovered)
 def recover_response_format(raw) -> dict:
     """
     Uses a lightweight LLM (e.g. GPT-4o mini) to extract useful info
@@ -4,7 +4,7 @@ from datetime import datetime
 import uuid
 import os
 
-from modules import auto_tagger, intent_classifier, topic_extractor
+from modules import enrichment
 
 def generate_session_id():
     """
@@ -19,20 +19,12 @@ def normalize_output(user_prompt: str, llm_response: str, model: str = "unknown"
     timestamp = datetime.utcnow().isoformat()
     episode_id = str(uuid.uuid4())[:12]  # shorter UUID
 
+    # Tag, intent and topic from one enrichment call
     try:
-        tag = auto_tagger.auto_tag(user_prompt)
+        labels = enrichment.enrich(user_prompt)
+        tag, intent, topic = labels.tag, labels.intent, labels.topic
     except Exception:
-        tag = "NONE"
-
-    try:
-        intent = intent_classifier.classify_intent(user_prompt)
-    except Exception:
-        intent = "unknown"
-
-    try:
-        topic = topic_extractor.extract_topic(user_prompt)
-    except Exception:
-        topic = "unknown"
+        tag, intent, topic = "NONE", "unknown", "unknown"
 
     # --- Optionally, fill these in later ---
     usage = {
@@ -27,6 +27,18 @@ for i in {1..10}; do
   sleep 1
 done
 
+# --- Step 2b: Warm start from a snapshot (optional) ---
+if [ -n "$CAM_SNAPSHOT" ]; then
+  echo "📥 Restoring memory snapshot $CAM_SNAPSHOT..."
+  python -m modules.maintenance.snapshot import "$CAM_SNAPSHOT" --if-empty
+fi
+
+# --- Step 2c: Add numeric timestamps to memories written by older versions (once) ---
+if [ ! -f ./CAM_project/.ts_migrated ]; then
+  echo "🕒 Migrating memory timestamps..."
+  python -m modules.maintenance.migrate_timestamps && touch ./CAM_project/.ts_migrated
+fi
+
 # --- Step 3: Start Proxy API ---
 if lsof -i :$PROXY_PORT | grep -q LISTEN; then
   echo "⚠️ Proxy already running on port $PROXY_PORT"
@@ -0,0 +1,76 @@
+# tests/test_config_service.py
+"""
+Live config reloads, validation of edits and the compiled keyword rules.
+"""
+
+import json
+
+import pytest
+
+from modules import config_manager, intent_classifier, keyword_rules, resources
+from modules.config_manager import ConfigService
+
+
+def _write(path, config, mtime):
+    path.write_text(json.dumps(config))
+    # Distinct mtimes, however fast the edits follow each other
+    import os
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, {"config_reload": {"enabled": True, "check_interval_seconds": 0}}, 1_000_000_000)
+    return path
+
+
+def test_edits_are_picked_up_and_invalid_ones_ignored(config_file):
+    service = ConfigService(str(config_file))
+    assert service.current()["retrieval"]["mmr_diversity"] == config_manager.DEFAULT_CONFIG["retrieval"]["mmr_diversity"]
+
+    reload = {"enabled": True, "check_interval_seconds": 0}
+    _write(config_file, {"config_reload": reload, "retrieval": {"mmr_diversity": 0.3}}, 2_000_000_000)
+    assert service.current()["retrieval"]["mmr_diversity"] == 0.3
+    assert service.stats()["version"] == 2
+
+    _write(config_file, {"config_reload": reload, "retrieval": {"mmr_diversity": "high"}}, 3_000_000_000)
+    assert service.current()["retrieval"]["mmr_diversity"] == 0.3
+    assert "retrieval.mmr_diversity" in service.stats()["last_error"]
+
+    _write(config_file, {"config_reload": reload, "retrieval": {"mmr_diversity": 0.5}}, 4_000_000_000)
+    assert service.current()["retrieval"]["mmr_diversity"] == 0.5
+    assert service.stats()["last_error"] is None
+
+
+def test_snapshot_is_read_only(config_file):
+    snapshot = ConfigService(str(config_file)).current()
+
+    with pytest.raises(TypeError):
+        snapshot["retrieval"]["mmr_diversity"] = 1.0
+    assert isinstance(snapshot["intent_classifier"]["query_prefixes"], tuple)
+
+
+def test_heuristics_follow_a_reloaded_rule_list(config_file):
+    service = ConfigService(str(config_file))
+    resources.override("config_service", service)
+    try:
+        assert intent_classifier.heuristic_intent("fetch my notes from yesterday") is None
+
+        rules = dict(config_manager.DEFAULT_CONFIG["intent_classifier"])
+        rules["query_prefixes"] = list(rules["query_prefixes"]) + ["fetch"]
+        _write(config_file, {"config_reload": {"enabled": True, "check_interval_seconds": 0},
+                             "intent_classifier": rules}, 2_000_000_000)
+
+        assert intent_classifier.heuristic_intent("fetch my notes from yesterday") == "query"
+    finally:
+        resources.reset("config_service")
+
+
+def test_keyword_rules_match_whole_words_only():
+    assert keyword_rules.contains_any("I know the answer", ["no"]) is False
+    assert keyword_rules.contains_any("no, that is wrong", ["no"]) is True
+    assert keyword_rules.contains_any("as  we   discussed earlier", ["as we discussed"]) is True
+    assert keyword_rules.starts_with_any("  What is this", ["what"]) is True
+    assert keyword_rules.starts_with_any("whatever works", ["what"]) is False
+    assert keyword_rules.contains_any("anything", []) is False
@@ -0,0 +1,58 @@
+# tests/test_context_packer.py
+"""
+Greedy token-budget packing of retrieved memories.
+
+Token counts are words here, so the expectations don't depend on the
+tokenizer that happens to be installed.
+"""
+
+import pytest
+
+from modules import context_packer
+
+SETTINGS = {"max_tokens": 20, "max_memory_share": 0.5, "min_truncated_tokens": 2, "encoding": "o200k_base"}
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(context_packer, "_settings", lambda: SETTINGS)
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text, model=None: len((text or "").split()))
+
+
+def test_long_memory_is_cut_at_a_sentence_within_its_share():
+    long = "One two three. Four five six seven. Eight nine ten eleven twelve."
+    blocks = [("", "six words in the first memory", None), ("", long, None), ("", "three more words", None)]
+
+    rendered, kept, used = context_packer.pack(blocks)
+
+    assert kept == [0, 1, 2]
+    assert rendered[1] == "One two three. Four five six seven."
+    # 6 + separator + 7 + separator + 3
+    assert used == 18 <= SETTINGS["max_tokens"]
+
+
+def test_memory_that_cannot_be_cut_is_skipped_for_a_shorter_one():
+    blocks = [
+        ("", "a b c d e f g h", 8),
+        ("", "one unbroken sentence of ten words that will not fit", None),
+        ("", "short tail", None),
+    ]
+
+    rendered, kept, used = context_packer.pack(blocks)
+
+    assert kept == [0, 2]
+    assert rendered[-1] == "short tail"
+    assert used == 8 + 1 + 2
+
+
+def test_lone_memory_may_use_the_whole_budget():
+    body = " ".join(["word"] * 18)
+
+    assert context_packer.pack([("", body, 18)])[1] == [0]
+
+
+def test_stored_token_count_is_used_only_for_the_same_encoding():
+    stored = {context_packer.TOKEN_COUNT_KEY: 99, context_packer.TOKEN_ENCODING_KEY: "o200k_base"}
+
+    assert context_packer.document_tokens("three words here", stored) == 99
+    assert context_packer.document_tokens("three words here", {**stored, context_packer.TOKEN_ENCODING_KEY: "cl100k_base"}) == 3
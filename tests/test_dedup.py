@@ -0,0 +1,72 @@
+# tests/test_dedup.py
+"""
+Write-time duplicate merging against a NumpyFlatStore.
+"""
+
+import numpy as np
+import pytest
+
+from modules import dedup
+from modules.vector_store import NumpyFlatStore
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float64)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _record(id_, document, embedding):
+    return {"id": id_, "document": document, "metadata": {"timestamp": f"t-{id_}"}, "embedding": embedding}
+
+
+def _insert(store, records):
+    store.upsert([r["id"] for r in records], [r["document"] for r in records],
+                 [r["metadata"] for r in records], [r["embedding"] for r in records])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NumpyFlatStore(str(tmp_path), "cam_memory")
+
+
+def test_near_duplicates_within_one_batch_are_merged(store, monkeypatch):
+    # An empty store needs no count() round-trip
+    monkeypatch.setattr(store, "count", lambda: pytest.fail("count() called"))
+    records = [
+        _record("a", "the deploy runs on fridays", _unit([1.0, 0.0, 0.0])),
+        _record("b", "deploys run every friday", _unit([1.0, 0.01, 0.0])),
+        _record("c", "unrelated note", _unit([0.0, 1.0, 0.0])),
+    ]
+
+    inserts, merges = dedup.deduplicate(store, records, None, near_similarity=0.97)
+
+    assert [r["id"] for r in inserts] == ["a", "c"]
+    assert merges == {"b": "a"}
+    assert inserts[0]["metadata"]["occurrences"] == 2
+
+
+def test_stored_neighbour_is_compared_by_cosine_not_unit_norm_distance(store):
+    # Same direction, three times the length: squared L2 is large, cosine is 1
+    _insert(store, [_record("old", "the deploy runs on fridays", [3.0, 0.0, 0.0])])
+
+    inserts, merges = dedup.deduplicate(
+        store, [_record("new", "deploys run every friday", _unit([1.0, 0.01, 0.0]))], None, near_similarity=0.97
+    )
+
+    assert inserts == []
+    assert merges == {"new": "old"}
+    assert store.get(ids=["old"])["metadatas"][0]["occurrences"] == 2
+
+
+def test_batch_duplicates_follow_their_first_copy_into_the_store(store):
+    _insert(store, [_record("old", "the deploy runs on fridays", _unit([1.0, 0.0, 0.0]))])
+    records = [
+        _record("a", "the deploy runs on fridays at noon", _unit([1.0, 0.001, 0.0])),
+        _record("b", "deploys run every friday", _unit([1.0, 0.01, 0.0])),
+    ]
+
+    inserts, merges = dedup.deduplicate(store, records, None, near_similarity=0.97)
+
+    assert inserts == []
+    assert merges == {"a": "old", "b": "old"}
+    assert store.get(ids=["old"])["metadatas"][0]["occurrences"] == 3
@@ -0,0 +1,82 @@
+# tests/test_embedding_batcher.py
+"""
+EmbeddingBatcher resolves every waiting caller, whatever the backend returns.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from modules.embedding import EmbeddingBatcher
+from modules.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider
+
+
+class ShortProvider(EmbeddingProvider):
+    """Backend that loses the last vector of every batch."""
+
+    name = "short"
+
+    def embed(self, texts):
+        return [[float(len(t))] for t in texts[:-1]]
+
+
+class FakeEmbeddingsEndpoint:
+    """Stands in for client.embeddings: answers for every input except `drop`."""
+
+    def __init__(self, drop):
+        self.drop = drop
+
+    def create(self, model, input):
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0])
+                for i, text in enumerate(input) if text != self.drop]
+        return SimpleNamespace(data=data)
+
+
+def _embed_concurrently(batcher, texts):
+    """Embed each text from its own thread; returns {text: vector or exception}."""
+    results = {}
+    start = threading.Barrier(len(texts))
+
+    def call(text):
+        start.wait()
+        try:
+            results[text] = batcher.embed(text)
+        except Exception as e:
+            results[text] = e
+
+    threads = [threading.Thread(target=call, args=(text,), daemon=True) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads), "a caller was left waiting"
+    return results
+
+
+def test_short_backend_response_fails_every_caller_in_the_batch():
+    batcher = EmbeddingBatcher(ShortProvider("fake"), max_batch_size=8, max_wait_ms=200)
+
+    results = _embed_concurrently(batcher, ["a", "bb", "ccc"])
+
+    assert len(results) == 3
+    assert all(isinstance(r, ValueError) for r in results.values())
+
+
+def test_backend_exception_fails_every_caller():
+    provider = ShortProvider("fake")
+    provider.embed = lambda texts: (_ for _ in ()).throw(RuntimeError("endpoint down"))
+    batcher = EmbeddingBatcher(provider, max_batch_size=8, max_wait_ms=200)
+
+    with pytest.raises(RuntimeError, match="endpoint down"):
+        batcher.embed("a")
+
+
+def test_fake_openai_endpoint_missing_item_resolves_to_empty_vector():
+    provider = OpenAIEmbeddingProvider(model="text-embedding-3-small")
+    provider._client = SimpleNamespace(embeddings=FakeEmbeddingsEndpoint(drop="bb"))
+    batcher = EmbeddingBatcher(provider, max_batch_size=8, max_wait_ms=200)
+
+    results = _embed_concurrently(batcher, ["a", "bb", "ccc"])
+
+    assert results == {"a": [1.0, 1.0], "bb": [], "ccc": [3.0, 1.0]}
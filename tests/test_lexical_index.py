@@ -0,0 +1,131 @@
+# tests/test_lexical_index.py
+"""
+BM25 index coverage, the lexical fast path's confidence check, sharing logs
+between processes and first-use builds.
+"""
+
+import threading
+
+import pytest
+
+from modules import config_manager, lexical_index, memory, retrieval
+from modules.lexical_index import BM25Index
+
+FAST_PATH = config_manager.DEFAULT_CONFIG["lexical"]
+TOPICS = ("garden tomatoes", "invoice billing", "password reset", "bike repair", "recipe pasta")
+
+
+@pytest.fixture
+def index():
+    bm25 = BM25Index()
+    ids = [f"m{i}" for i in range(100)]
+    texts = [f"note {i} about {TOPICS[i % len(TOPICS)]} and order ZX-{10000 + i}" for i in range(100)]
+    texts[42] = "We spent two weeks in France last summer"
+    bm25.add(ids, texts)
+    return bm25
+
+
+def test_single_rare_term_overlap_is_not_full_coverage(index):
+    ids, scores, coverage = index.search("Who is the president of France?", 5)
+    assert ids[0] == "m42"
+    assert coverage == pytest.approx(0.5)
+    assert not lexical_index.is_confident(scores, coverage, FAST_PATH)
+
+
+def test_exact_code_query_is_confident(index):
+    ids, scores, coverage = index.search("where is order ZX-10007", 5)
+    assert ids[0] == "m7"
+    assert coverage == 1.0
+    assert lexical_index.is_confident(scores, coverage, FAST_PATH)
+
+
+def test_fast_path_declines_one_term_match(index, monkeypatch):
+    monkeypatch.setattr(retrieval.lexical_index, "search", lambda namespace, query, k: index.search(query, k))
+    monkeypatch.setattr(retrieval, "_lexical_settings", lambda: FAST_PATH)
+
+    def fetch(*args, **kwargs):
+        raise AssertionError("fast path served a memory that only shares one term with the query")
+
+    monkeypatch.setattr(retrieval, "_fetch", fetch)
+
+    packing = retrieval._Packing(model=None, token_budget=1500)
+    found = retrieval._lexical_fast_path(
+        "Who is the president of France?", 3, False, "global", True, None, None, packing
+    )
+    assert found is None
+
+
+def test_deletes_from_another_process_reach_a_loaded_index(tmp_path):
+    path = str(tmp_path / "cam_memory__abc.jsonl")
+    proxy = BM25Index(path)
+    proxy.add(["m1", "m2"], ["order ZX-1 shipped", "order ZX-2 delayed"])
+
+    # e.g. `compaction --once` in another process, with its own copy of the index
+    other = BM25Index(path)
+    other.remove(["m1"])
+    assert proxy.search("ZX-1", 5)[0] == []
+
+    # A log rewritten elsewhere is reloaded rather than appended to
+    other.add(["m3"], ["order ZX-3 lost"])
+    other.save()
+    assert proxy.search("ZX-3", 5)[0] == ["m3"]
+    proxy.add(["m4"], ["order ZX-4 returned"])
+    assert sorted(BM25Index(path).search("order", 10)[0]) == ["m2", "m3", "m4"]
+
+
+def test_remove_ids_updates_logs_of_unloaded_namespaces(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexical_index, "_index_dir", lambda: str(tmp_path))
+    kept = BM25Index(str(tmp_path / "cam_memory__b001__111111111111.jsonl"))
+    kept.add(["a1"], ["order ZX-1"])
+    target = BM25Index(str(tmp_path / "cam_memory__b002__222222222222.jsonl"))
+    target.add(["b1", "b2"], ["order ZX-2", "order ZX-3"])
+
+    lexical_index.remove_ids(["a1", "b1"], collection="cam_memory__b002")
+
+    assert BM25Index(kept.path).search("ZX-1", 5)[0] == ["a1"]
+    assert BM25Index(target.path).search("order", 5)[0] == ["b2"]
+
+
+class SlowStore:
+    """Two one-memory pages; the second waits until the test releases it."""
+
+    def __init__(self):
+        self.on_second_page = threading.Event()
+        self.release = threading.Event()
+        self.pages = [(["p1"], ["order ZX-1 shipped"]), (["p2"], ["zebra crossing repaint"])]
+
+    def get(self, where=None, limit=None, offset=0, include=()):
+        page = offset
+        if page == 1:
+            self.on_second_page.set()
+            self.release.wait(5)
+        if page >= len(self.pages):
+            return {"ids": [], "documents": [], "metadatas": []}
+        ids, documents = self.pages[page]
+        return {"ids": ids, "documents": documents, "metadatas": [{}] * len(ids)}
+
+
+def test_search_waits_for_a_first_use_build_instead_of_seeing_it_half_done(tmp_path, monkeypatch):
+    store = SlowStore()
+    monkeypatch.setattr(lexical_index, "_settings", lambda: {})
+    monkeypatch.setattr(lexical_index, "_index_path", lambda namespace: str(tmp_path / f"{namespace}.jsonl"))
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    monkeypatch.setattr(memory, "get_store", lambda namespace: store)
+    monkeypatch.setattr(memory, "namespace_filter", lambda namespace: None)
+
+    builder = threading.Thread(target=lexical_index.get_index, args=("team",), daemon=True)
+    builder.start()
+    assert store.on_second_page.wait(5)
+
+    found = []
+    searcher = threading.Thread(target=lambda: found.append(lexical_index.search("team", "zebra", 5)[0]), daemon=True)
+    searcher.start()
+    searcher.join(0.2)
+    assert searcher.is_alive(), "search answered from a half-built index"
+
+    store.release.set()
+    builder.join(5)
+    searcher.join(5)
+    assert found == [["p2"]]
+    assert sorted(lexical_index.BM25Index(str(tmp_path / "team.jsonl")).search("order zebra", 5)[0]) == ["p1", "p2"]
+    assert [name for name in (p.name for p in tmp_path.iterdir()) if name.endswith(".build")] == []
@@ -0,0 +1,83 @@
+# tests/test_llm_cache.py
+"""
+Memoized auxiliary LLM calls: keys, TTL, the disk tier and single-flight.
+"""
+
+import threading
+import time
+
+import pytest
+
+from modules import llm_cache, resources
+from modules.llm_cache import DiskResultCache, LLMCache
+
+
+@pytest.fixture
+def cache():
+    instance = LLMCache(memory_entries=64, ttl_seconds=60)
+    resources.override("llm_cache", instance)
+    yield instance
+    resources.reset("llm_cache")
+
+
+def test_same_arguments_reuse_the_result_and_failures_are_not_cached(cache):
+    calls = []
+
+    @llm_cache.memoize("tag", model="m", cacheable=lambda prompt, temperature=0: temperature == 0,
+                       store_if=lambda result: result != "NONE")
+    def tag(prompt, temperature=0):
+        calls.append(prompt)
+        if prompt == "boom":
+            raise RuntimeError("provider down")
+        return "NONE" if prompt == "?" else prompt.upper()
+
+    assert tag("work") == tag("work") == "WORK"
+    assert tag("work", temperature=1) == "WORK"
+    assert tag("?") == tag("?") == "NONE"
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            tag("boom")
+
+    assert calls == ["work", "work", "?", "?", "boom", "boom"]
+    assert cache.stats()["tag"]["hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    cache.call("intent", "k", lambda: "fact")
+    later = llm_cache.time.time() + 61
+    monkeypatch.setattr(llm_cache.time, "time", lambda: later)
+
+    assert cache.call("intent", "k", lambda: "query") == "query"
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    LLMCache(disk=DiskResultCache(path)).call("topic", "k", lambda: {"topic": "launch"})
+
+    restarted = LLMCache(disk=DiskResultCache(path))
+    assert restarted.call("topic", "k", lambda: pytest.fail("recomputed")) == {"topic": "launch"}
+    assert restarted.stats()["topic"]["disk_hits"] == 1
+
+
+def test_concurrent_identical_calls_send_one_request(cache):
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "fact"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.call("intent", "same", slow)), daemon=True)
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Give every thread time to reach the in-flight call before it finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["fact"] * 8
+    assert len(calls) == 1
@@ -0,0 +1,46 @@
+# tests/test_local_classifier.py
+"""
+Local intent classification answers before the LLM, and defers to it when unsure.
+"""
+
+import numpy as np
+import pytest
+
+from modules import intent_classifier, local_classifier, resources
+
+pytest.importorskip("sklearn")
+from modules.maintenance import train_classifier  # noqa: E402
+
+FACT = [1.0, 0.0, 0.0]
+QUERY = [0.0, 1.0, 0.0]
+
+
+@pytest.fixture
+def trained():
+    rng = np.random.default_rng(0)
+    vectors = np.vstack([np.array(FACT) + 0.05 * rng.standard_normal((20, 3)),
+                         np.array(QUERY) + 0.05 * rng.standard_normal((20, 3))])
+    model = train_classifier._fit(local_classifier.features(vectors), ["fact"] * 20 + ["query"] * 20)
+    resources.override("local_classifier", {"models": {"intent": model}, "embedding_model": "test"})
+    yield
+    resources.reset("local_classifier")
+
+
+def test_confident_prediction_is_used_and_unsure_one_is_not(trained):
+    assert local_classifier.classify("intent", "my flat is in Berlin", vector=FACT) == "fact"
+    assert local_classifier.classify("intent", "somewhere in between", vector=[1.0, 1.0, 0.0]) is None
+    assert local_classifier.classify("tag", "no model for this head", vector=FACT) is None
+
+
+def test_intent_comes_from_the_local_model_without_an_llm_call(trained, monkeypatch):
+    monkeypatch.setattr(local_classifier.embedding, "get_embedding", lambda text: QUERY)
+    monkeypatch.setattr(intent_classifier, "_llm_intent", lambda prompt: pytest.fail("LLM called"))
+
+    assert intent_classifier.classify_intent("remind me about the dentist appointment") == "query"
+
+
+def test_unsure_model_falls_back_to_the_llm(trained, monkeypatch):
+    monkeypatch.setattr(local_classifier.embedding, "get_embedding", lambda text: [1.0, 1.0, 0.0])
+    monkeypatch.setattr(intent_classifier, "_llm_intent", lambda prompt: "meta")
+
+    assert intent_classifier.classify_intent("remind me about the dentist appointment") == "meta"
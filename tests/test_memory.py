@@ -0,0 +1,16 @@
+# tests/test_memory.py
+"""
+memory.store() keeps failures away from its callers.
+"""
+
+from modules import memory
+
+
+def test_store_failure_is_logged_not_raised(monkeypatch, capsys):
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("vector store unreachable")
+
+    monkeypatch.setattr(memory, "store_many", unavailable)
+
+    assert memory.store("the launch moved to May", {"episode_id": "ep1"}, [0.1, 0.2]) is None
+    assert "Failed to store memory: vector store unreachable" in capsys.readouterr().out
@@ -0,0 +1,85 @@
+# tests/test_provider_clients.py
+"""
+Async provider clients, against fake SDK modules.
+"""
+
+import asyncio
+import sys
+import types
+
+from proxy_api.clients import gemini_client, mistral_client
+
+
+def _fake_genai(monkeypatch):
+    genai = types.ModuleType("google.generativeai")
+    genai.current_key = None
+    genai.mismatches = 0
+
+    def configure(api_key):
+        genai.current_key = api_key
+
+    class GenerativeModel:
+        def __init__(self, model):
+            self.model = model
+
+        async def generate_content_async(self, prompt):
+            key = genai.current_key
+            await asyncio.sleep(0.01)
+            if genai.current_key != key or not prompt.endswith(key):
+                genai.mismatches += 1
+            return types.SimpleNamespace(text=f"answer for {prompt}")
+
+    genai.configure = configure
+    genai.GenerativeModel = GenerativeModel
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    return genai
+
+
+def test_gemini_async_never_mixes_keys(monkeypatch):
+    genai = _fake_genai(monkeypatch)
+    monkeypatch.setattr(gemini_client, "_gate", gemini_client._KeyGate())
+
+    async def run():
+        calls = [
+            gemini_client.ask_async(f"prompt for {key}", api_key=key)
+            for key in ("key-a", "key-b") * 10
+        ]
+        return await asyncio.gather(*calls)
+
+    answers = asyncio.run(run())
+    assert genai.mismatches == 0
+    assert all(not a.startswith("⚠️") for a in answers)
+
+
+def _fake_mistral(monkeypatch):
+    mistralai = types.ModuleType("mistralai")
+
+    class Message:
+        # mistralai 1.x returns objects, which can't be subscripted
+        content = " Bonjour "
+
+    response = types.SimpleNamespace(choices=[types.SimpleNamespace(message=Message())])
+
+    class Chat:
+        def complete(self, **kwargs):
+            return response
+
+        async def complete_async(self, **kwargs):
+            return response
+
+    class Mistral:
+        def __init__(self, api_key):
+            self.chat = Chat()
+
+    mistralai.Mistral = Mistral
+    monkeypatch.setitem(sys.modules, "mistralai", mistralai)
+    mistral_client._client.cache_clear()
+
+
+def test_mistral_reads_message_content(monkeypatch):
+    _fake_mistral(monkeypatch)
+    assert mistral_client.ask("hi", api_key="m-key") == "Bonjour"
+    assert asyncio.run(mistral_client.ask_async("hi", api_key="m-key")) == "Bonjour"
@@ -0,0 +1,45 @@
+# tests/test_rerank_features.py
+"""
+Write-time rerank features and the array reranker built on them.
+"""
+
+import numpy as np
+
+from modules import rerank_features, retrieval
+
+
+def test_extract_flags_naming_and_title_case_and_signs_names():
+    features = rerank_features.extract("My dog is called Rex", {"user_prompt": "what's my dog called?"})
+
+    assert features["rr_flags"] == rerank_features.NAMING | rerank_features.TITLE
+    assert features["rr_entity_sig"] & rerank_features.query_signature("where is Rex") != 0
+    assert rerank_features.extract("the weather was fine")["rr_flags"] == 0
+
+
+def test_legacy_memories_are_featurized_on_the_fly():
+    document = "Anna has a sister named Maria"
+    stored = {"user_prompt": "", **rerank_features.extract(document, {"user_prompt": ""})}
+
+    flags, signatures = rerank_features.feature_arrays([document, document], [stored, {"user_prompt": ""}])
+
+    assert flags.tolist() == [stored["rr_flags"]] * 2
+    assert signatures.tolist() == [stored["rr_entity_sig"]] * 2
+
+
+def test_pronoun_query_prefers_the_memory_naming_someone():
+    results = [
+        ("the weather was fine on monday", 0.20, {}, "m1"),
+        ("My neighbour is called Max", 0.25, {}, "m2"),
+    ]
+
+    assert [r[3] for r in retrieval._rerank_with_pronouns("what is he called", results)] == ["m2", "m1"]
+    assert retrieval._rerank_with_pronouns("what is the neighbour called", results) == results
+
+
+def test_scores_are_boosts_over_distance():
+    flags = np.array([rerank_features.NAMING, 0])
+    signatures = np.zeros(2, dtype=np.int64)
+
+    scores = rerank_features.scores("who is she", [0.0, 0.0], flags, signatures)
+
+    assert scores.tolist() == [rerank_features.NAMING_BOOST, 1.0]
@@ -0,0 +1,86 @@
+# tests/test_retrieval_cache.py
+"""
+Retrieval cache hits, TTL and invalidation (within this process and from
+other processes).
+"""
+
+import multiprocessing
+import os
+
+import pytest
+
+from modules import retrieval_cache
+from modules.retrieval_cache import RetrievalCache
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    path = str(tmp_path / "retrieval_cache.generation")
+    monkeypatch.setattr(retrieval_cache, "_shared_path", lambda: path)
+    monkeypatch.setattr(retrieval_cache, "_shared_size", None)
+    return path
+
+
+def _cached(cache, namespace, query):
+    key = RetrievalCache.key(namespace, query, ())
+    cache.put(key, (f"context for {query}", ["m1"], 10), retrieval_cache.generation(namespace))
+    return key
+
+
+def test_write_in_another_process_invalidates_cached_results(shared):
+    cache = RetrievalCache()
+    key = _cached(cache, "team", "launch date")
+    assert cache.get(key) is not None
+
+    # A forked child has its own generations, like the API server next to the proxy
+    child = multiprocessing.get_context("fork").Process(target=retrieval_cache.bump, args=("team",))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+
+    assert cache.get(key) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_local_write_keeps_other_namespaces_cached(shared):
+    cache = RetrievalCache()
+    team = _cached(cache, "team", "launch date")
+    other = _cached(cache, "other", "launch date")
+
+    retrieval_cache.bump("team")
+
+    assert cache.get(team) is None
+    assert cache.get(other) is not None
+    assert os.path.getsize(shared) == 1
+
+
+def test_exact_hit_ignores_extra_whitespace_but_not_params(shared):
+    cache = RetrievalCache()
+    _cached(cache, "team", "When is the  launch?")
+
+    assert cache.get(RetrievalCache.key("team", " When is the launch? ", ()))[0] == "context for When is the  launch?"
+    assert cache.get(RetrievalCache.key("team", "When is the launch?", ("other params",))) is None
+    assert cache.get(RetrievalCache.key("other", "When is the launch?", ())) is None
+
+
+def test_entries_expire_after_the_ttl(shared, monkeypatch):
+    cache = RetrievalCache(ttl_seconds=60)
+    key = _cached(cache, "team", "launch date")
+    later = retrieval_cache.time.time() + 61
+    monkeypatch.setattr(retrieval_cache.time, "time", lambda: later)
+
+    assert cache.get(key) is None
+
+
+def test_semantic_tier_reuses_a_near_identical_query(shared):
+    cache = RetrievalCache(semantic=True, semantic_similarity=0.98)
+    key = RetrievalCache.key("team", "when is the launch", ())
+    cache.put(key, ("launch context", ["m1"], 10), retrieval_cache.generation("team"), query_vector=[1.0, 0.0])
+
+    similar = RetrievalCache.key("team", "launch date?", ())
+    assert cache.get_similar(similar, [0.999, 0.01])[0] == "launch context"
+    assert cache.get_similar(similar, [0.5, 0.5]) is None
+
+    retrieval_cache.bump("team")
+    assert cache.get_similar(similar, [0.999, 0.01]) is None
+    assert cache.stats()["semantic_hits"] == 1
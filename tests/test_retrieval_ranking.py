@@ -0,0 +1,54 @@
+# tests/test_retrieval_ranking.py
+"""
+Candidate selection after the vector query: overfetch, MMR and recency.
+"""
+
+import time
+
+import numpy as np
+
+from modules import config_manager, retrieval
+
+DEFAULTS = config_manager.DEFAULT_CONFIG["retrieval"]
+
+# Two near-identical memories about the launch, and one about billing
+CANDIDATES = {
+    "launch": ("the launch moved to May", 0.10, {}, np.array([1.0, 0.0], dtype=np.float32)),
+    "launch-copy": ("launch moved to May", 0.11, {}, np.array([0.999, 0.04], dtype=np.float32)),
+    "billing": ("invoices go out monthly", 0.30, {}, np.array([0.0, 1.0], dtype=np.float32)),
+}
+ORDER = ["launch", "launch-copy", "billing"]
+
+
+def _select(settings, n_results=2):
+    return retrieval._select("when is the launch", ORDER, CANDIDATES, n_results, 0.8, settings, retrieval._StageTimer())
+
+
+def test_defaults_keep_plain_relevance_order():
+    assert retrieval._fetch_k(5, DEFAULTS) == 5
+    assert retrieval._fetch_k(5, {}) == 5
+    assert _select(DEFAULTS) == ["launch", "launch-copy"]
+    assert _select({}) == ["launch", "launch-copy"]
+
+
+def test_overfetch_is_capped_by_max_candidates():
+    assert retrieval._fetch_k(5, {"overfetch_factor": 4, "max_candidates": 200}) == 20
+    assert retrieval._fetch_k(100, {"overfetch_factor": 4, "max_candidates": 200}) == 200
+
+
+def test_mmr_skips_a_near_duplicate_when_enabled():
+    assert _select({**DEFAULTS, "mmr_diversity": 0.3}) == ["launch", "billing"]
+
+
+def test_recency_is_off_by_default_and_favours_newer_memories_when_on():
+    now = time.time()
+    dated = {
+        "old": ("the launch moved to May", 0.10, {"ts": now - 365 * 86400}, np.array([1.0, 0.0], dtype=np.float32)),
+        "new": ("the launch moved to June", 0.12, {"ts": now - 86400}, np.array([0.0, 1.0], dtype=np.float32)),
+    }
+
+    def pick(settings):
+        return retrieval._select("when is the launch", ["old", "new"], dated, 2, 0.8, settings, retrieval._StageTimer())
+
+    assert pick(DEFAULTS) == ["old", "new"]
+    assert pick({**DEFAULTS, "recency_weight": 0.2}) == ["new", "old"]
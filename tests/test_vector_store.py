@@ -0,0 +1,138 @@
+# tests/test_vector_store.py
+"""
+NumpyFlatStore upserts, update logging, compaction and sharing one store
+directory between processes.
+"""
+
+import os
+import subprocess
+import threading
+import sys
+
+from modules.vector_store import NumpyFlatStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_repeated_id_in_one_batch_keeps_only_the_last(tmp_path):
+    store = NumpyFlatStore(str(tmp_path), "cam_memory")
+    store.upsert(
+        ids=["a", "b", "a"],
+        documents=["first a", "b", "second a"],
+        metadatas=[{"n": 1}, {"n": 2}, {"n": 3}],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+    )
+
+    assert store.count() == 2
+    hits = store.query([[1.0, 0.0]], n_results=5)
+    assert sorted(hits["ids"][0]) == ["a", "b"]
+    assert store.get(ids=["a"])["documents"] == ["second a"]
+
+    reopened = NumpyFlatStore(str(tmp_path), "cam_memory")
+    assert reopened.count() == 2
+    assert reopened.get(ids=["a"])["metadatas"] == [{"n": 3}]
+
+
+def _rows(n, start=0):
+    ids = [f"m{i}" for i in range(start, start + n)]
+    return ids, [f"doc {i}" for i in ids], [{"i": i} for i in range(start, start + n)], [[1.0, float(i)] for i in range(start, start + n)]
+
+
+def test_second_opener_sees_writes_deletes_and_growth(tmp_path):
+    # Two instances hold separate lock/log handles, like two processes would
+    writer = NumpyFlatStore(str(tmp_path), "cam_memory")
+    reader = NumpyFlatStore(str(tmp_path), "cam_memory")
+    assert reader.count() == 0
+
+    writer.upsert(*_rows(3))
+    assert reader.count() == 3
+    assert reader.get(ids=["m1"])["documents"] == ["doc m1"]
+
+    writer.delete(ids=["m0"])
+    writer.upsert(*_rows(2000, start=3))  # past the first capacity of 1024 rows
+    assert reader.count() == 2002
+    hits = reader.query([[1.0, 1500.0]], n_results=1, include=["distances"])
+    assert hits["ids"][0] == ["m1500"]
+    assert hits["distances"][0][0] < 1e-3
+
+    reader.upsert(["m1"], ["changed"], [{"i": -1}], [[0.0, 1.0]])
+    assert writer.get(ids=["m1"])["documents"] == ["changed"]
+    assert writer.query([[0.0, 1.0]], n_results=1)["ids"][0] == ["m1"]
+
+
+def test_second_opener_reloads_after_compaction(tmp_path):
+    first = NumpyFlatStore(str(tmp_path), "cam_memory")
+    second = NumpyFlatStore(str(tmp_path), "cam_memory")
+    first.upsert(*_rows(10))
+    first.delete(ids=[f"m{i}" for i in range(5)])
+    assert second.count() == 5
+
+    first.compact()
+    first.upsert(*_rows(1, start=20))
+    assert second.count() == 6
+    assert sorted(second.get()["ids"]) == ["m20", "m5", "m6", "m7", "m8", "m9"]
+    assert second.query([[1.0, 20.0]], n_results=1)["ids"][0] == ["m20"]
+
+
+def test_writes_from_another_process(tmp_path):
+    store = NumpyFlatStore(str(tmp_path), "cam_memory")
+    store.upsert(*_rows(2))
+
+    script = (
+        "import sys; from modules.vector_store import NumpyFlatStore; "
+        "s = NumpyFlatStore(sys.argv[1], 'cam_memory'); "
+        "s.upsert(['x'], ['from child'], [{}], [[5.0, 5.0]]); s.delete(ids=['m0'])"
+    )
+    subprocess.run([sys.executable, "-c", script, str(tmp_path)], cwd=ROOT, check=True, capture_output=True)
+
+    assert sorted(store.get()["ids"]) == ["m1", "x"]
+    assert store.query([[5.0, 5.0]], n_results=1)["ids"][0] == ["x"]
+
+
+def test_update_logs_only_the_changed_metadata(tmp_path):
+    store = NumpyFlatStore(str(tmp_path), "cam_memory")
+    store.upsert(["a"], ["a long document " * 50], [{"namespace": "n", "access_count": 0}], [[1.0, 0.0]])
+    store.update(ids=["a"], metadatas=[{"access_count": 3}])
+
+    with open(os.path.join(store.path, "records.jsonl")) as f:
+        last = f.readlines()[-1]
+    assert "document" not in last and "namespace" not in last
+
+    reopened = NumpyFlatStore(str(tmp_path), "cam_memory")
+    assert reopened.get(ids=["a"])["metadatas"] == [{"namespace": "n", "access_count": 3}]
+    assert reopened.get(ids=["a"])["documents"] == ["a long document " * 50]
+
+
+def test_compaction_copies_without_the_lock_and_keeps_concurrent_writes(tmp_path, monkeypatch):
+    store = NumpyFlatStore(str(tmp_path), "cam_memory")
+    store.upsert(*_rows(10))
+    store.delete(ids=["m0", "m1"])
+
+    def concurrent_writes():
+        store.upsert(["late"], ["written during compaction"], [{}], [[9.0, 9.0]])
+        store.update(ids=["m2"], metadatas=[{"hot": True}])
+        store.delete(ids=["m3"])
+
+    original_upsert = NumpyFlatStore.upsert
+    finished = []
+
+    def upsert(self, *args, **kwargs):
+        original_upsert(self, *args, **kwargs)
+        if self is not store and not finished:
+            writer = threading.Thread(target=concurrent_writes)
+            writer.start()
+            writer.join(timeout=5)
+            finished.append(not writer.is_alive())
+
+    monkeypatch.setattr(NumpyFlatStore, "upsert", upsert)
+    store.compact()
+
+    assert finished == [True]
+    assert sorted(store.get()["ids"]) == sorted(["late"] + [f"m{i}" for i in range(2, 10) if i != 3])
+    assert store.get(ids=["m2"])["metadatas"] == [{"i": 2, "hot": True}]
+    assert store.query([[9.0, 9.0]], n_results=1)["ids"][0] == ["late"]
+
+    reopened = NumpyFlatStore(str(tmp_path), "cam_memory")
+    assert reopened.count() == 8
+    with open(os.path.join(store.path, "records.jsonl")) as f:
+        assert not any('"m0"' in line or '"m1"' in line for line in f)
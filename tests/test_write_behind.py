@@ -0,0 +1,174 @@
+# tests/test_write_behind.py
+"""
+Write-behind queue: journal replay after a crash, and failed writes ending
+up retried or dead-lettered instead of silently committed.
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from modules import enrichment, memory
+from proxy_api.services import write_behind
+from proxy_api.services.write_behind import DEAD_LETTER, WriteBehindQueue
+
+LABELS = enrichment.Enrichment(tag="fact", intent="fact", topic="pets", useful=True, source="rules")
+
+
+def _job(i: int) -> dict:
+    return {
+        "episode_id": f"ep{i}",
+        "timestamp": "2026-01-01T00:00:00",
+        "user_prompt": f"my dog number {i} is called Rex",
+        "llm_output": f"Noted, dog {i} is Rex.",
+        "tag": None,
+        "topic_continued": "False",
+        "namespace": None,
+        "session_id": None,
+    }
+
+
+class FakeStore:
+    """Stands in for memory.store_many(); can reject given ids."""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.stored = []
+
+    def __call__(self, records, namespace=None):
+        result = memory.StoreResult()
+        for record in records:
+            if record["id"] in self.reject:
+                result.failed[record["id"]] = "store rejected"
+            else:
+                self.stored.append(record["id"])
+                result.written.append(record["id"])
+        return result
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = FakeStore()
+    monkeypatch.setattr(write_behind.enrichment, "enrich", lambda text: LABELS)
+    monkeypatch.setattr(write_behind.embedding, "get_embeddings", lambda texts: [[1.0, 0.0] for _ in texts])
+    monkeypatch.setattr(write_behind.memory, "store_many", fake)
+    monkeypatch.setattr(write_behind.time, "sleep", lambda seconds: None)
+    return fake
+
+
+def _drain(q: WriteBehindQueue, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while q.depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert q.depth() == 0
+
+
+def _dead_letters(path) -> list:
+    file = os.path.join(path, DEAD_LETTER)
+    if not os.path.exists(file):
+        return []
+    with open(file) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replays_journal_after_crash(tmp_path, store):
+    # No workers: jobs are journaled but never processed, as if the process died
+    crashed = WriteBehindQueue(str(tmp_path), workers=0)
+    crashed.start()
+    for i in range(3):
+        crashed.enqueue(_job(i))
+    crashed._journal.close()
+
+    restarted = WriteBehindQueue(str(tmp_path), workers=1, max_wait_ms=0)
+    restarted.start()
+    try:
+        _drain(restarted)
+        assert sorted(store.stored) == ["ep0", "ep1", "ep2"]
+        assert restarted.stats()["replayed"] == 3
+        assert restarted.stats()["committed_seq"] == 3
+    finally:
+        restarted.stop()
+
+    # Everything is committed, so a further restart replays nothing
+    again = WriteBehindQueue(str(tmp_path), workers=0)
+    again.start()
+    assert again.stats()["replayed"] == 0
+    again.stop()
+
+
+def test_failed_embedding_batch_is_dead_lettered_not_committed_as_stored(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(write_behind.embedding, "get_embeddings", lambda texts: [[] for _ in texts])
+    q = WriteBehindQueue(str(tmp_path), workers=0, max_retries=2)
+    q.start()
+    batch = [q._queue.get_nowait() for _ in (q.enqueue(_job(0)), q.enqueue(_job(1)))]
+
+    q._run(batch)
+
+    assert store.stored == []
+    assert [entry["job"]["episode_id"] for entry in _dead_letters(tmp_path)] == ["ep0", "ep1"]
+    assert "embedding" in _dead_letters(tmp_path)[0]["error"]
+    assert q.stats()["dead_lettered"] == 2
+    q.stop()
+
+
+def test_embedding_failure_is_retried(tmp_path, store, monkeypatch):
+    calls = []
+
+    def flaky(texts):
+        calls.append(texts)
+        return [[] for _ in texts] if len(calls) == 1 else [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(write_behind.embedding, "get_embeddings", flaky)
+    q = WriteBehindQueue(str(tmp_path), workers=0, max_retries=3)
+    q.start()
+    q.enqueue(_job(0))
+
+    q._run([q._queue.get_nowait()])
+
+    assert store.stored == ["ep0"]
+    assert _dead_letters(tmp_path) == []
+    q.stop()
+
+
+def test_records_rejected_by_store_are_dead_lettered(tmp_path, store):
+    store.reject = {"ep1"}
+    q = WriteBehindQueue(str(tmp_path), workers=0, max_retries=2)
+    q.start()
+    for i in range(3):
+        q.enqueue(_job(i))
+
+    q._run([q._queue.get_nowait() for _ in range(3)])
+
+    assert sorted(store.stored) == ["ep0", "ep2"]
+    assert [entry["job"]["episode_id"] for entry in _dead_letters(tmp_path)] == ["ep1"]
+    assert q.depth() == 0
+    q.stop()
+
+
+def test_enqueue_after_stop_is_rejected(tmp_path, store):
+    q = WriteBehindQueue(str(tmp_path), workers=1)
+    q.start()
+    q.stop(timeout=1.0)
+    assert q.enqueue(_job(0)) is None
+
+
+def test_only_the_jobs_without_an_embedding_are_retried(tmp_path, store, monkeypatch):
+    calls = []
+
+    def one_text_fails(texts):
+        calls.append(list(texts))
+        return [[] if text == "Noted, dog 1 is Rex." else [1.0, 0.0] for text in texts]
+
+    monkeypatch.setattr(write_behind.embedding, "get_embeddings", one_text_fails)
+    q = WriteBehindQueue(str(tmp_path), workers=0, max_retries=2)
+    q.start()
+    batch = [q._queue.get_nowait() for _ in (q.enqueue(_job(0)), q.enqueue(_job(1)), q.enqueue(_job(2)))]
+
+    q._run(batch)
+
+    assert sorted(store.stored) == ["ep0", "ep2"]
+    assert calls[1] == ["Noted, dog 1 is Rex."]
+    assert [entry["job"]["episode_id"] for entry in _dead_letters(tmp_path)] == ["ep1"]
+    q.stop()